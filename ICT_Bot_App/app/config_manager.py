@@ -1,10 +1,18 @@
+import copy
 import json
 import os
+import contextvars
+from contextlib import contextmanager
+
+# Các giá trị ghi đè tạm thời (key dạng 'trading.take_profit_rr'), riêng cho từng thread/tiến trình
+_overrides: contextvars.ContextVar[dict | None] = contextvars.ContextVar('config_overrides', default=None)
 
 class ConfigManager:
     def __init__(self, config_path='config.json'):
         self.config_path = config_path
         self.config = self.load_config()
+        # Tăng mỗi lần cấu hình bị sửa (set): tiến trình con so version để biết cấu hình đã đổi
+        self.version = 0
 
     def load_config(self):
         """Tải cấu hình từ file JSON."""
@@ -23,6 +31,9 @@ class ConfigManager:
         Lấy một giá trị từ cấu hình, hỗ trợ key lồng nhau (e.g., 'mt5.login').
         Luôn trả về giá trị mặc định nếu key không tồn tại hoặc đường dẫn không hợp lệ.
         """
+        overrides = _overrides.get()
+        if overrides and key in overrides:
+            return overrides[key]
         keys = key.split('.')
         value = self.config
         try:
@@ -36,6 +47,18 @@ class ConfigManager:
         except (KeyError, TypeError):
             return default
 
+    @contextmanager
+    def overrides(self, values: dict):
+        """
+        Ghi đè tạm thời các key (e.g., {'trading.take_profit_rr': 3.0}) trong khối with
+        mà không sửa cấu hình chung, dùng cho các lần chạy backtest với tham số khác nhau.
+        """
+        token = _overrides.set({**(_overrides.get() or {}), **values})
+        try:
+            yield self
+        finally:
+            _overrides.reset(token)
+
     def set(self, key, value):
         """Đặt một giá trị trong cấu hình, hỗ trợ key lồng nhau."""
         keys = key.split('.')
@@ -43,6 +66,19 @@ class ConfigManager:
         for k in keys[:-1]:
             d = d.setdefault(k, {})
         d[keys[-1]] = value
+        self.version += 1
+
+    def snapshot(self) -> tuple[int, dict]:
+        """(version, bản sao cấu hình) để gửi sang tiến trình con (không gồm các giá trị overrides)."""
+        return self.version, copy.deepcopy(self.config)
+
+    def apply_snapshot(self, snapshot: tuple[int, dict]) -> bool:
+        """Dùng cấu hình từ snapshot() của tiến trình chính nếu khác version hiện tại. Trả về True nếu cấu hình đã đổi."""
+        version, config = snapshot
+        if version == self.version:
+            return False
+        self.version, self.config = version, config
+        return True
 
 # Tạo một instance duy nhất để sử dụng trong toàn bộ ứng dụng
 config_manager = ConfigManager()
@@ -7,7 +7,7 @@ import random
 from PySide6.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QTabWidget,
     QPushButton, QLabel, QTextEdit, QTableWidget, QTableWidgetItem, QHeaderView,
-    QFormLayout, QLineEdit, QDoubleSpinBox, QComboBox, QGroupBox, QMessageBox,
+    QFormLayout, QLineEdit, QDoubleSpinBox, QSpinBox, QComboBox, QGroupBox, QMessageBox,
     QDateEdit, QProgressBar, QCheckBox, QCompleter
 )
 from PySide6.QtCore import QTimer, QThread, QDate, Qt, Signal
@@ -17,6 +17,7 @@ from app.worker import BotWorker, BacktestWorker
 from app.config_manager import config_manager
 from trading_core.time_filter import get_kill_zone_status, get_all_kill_zones_with_utc7
 from trading_core.connectors import get_connector
+from trading_core.analysis_cache import analysis_cache
 
 class MainWindow(QMainWindow):
     def __init__(self):
@@ -260,10 +261,20 @@ class MainWindow(QMainWindow):
         self.sl_buffer_spinbox.setRange(0, 500)
         self.sl_buffer_spinbox.setValue(float(config_manager.get('trading.sl_buffer_points', 50.0) or 50.0))
 
+        self.min_fvg_gap_spinbox = QDoubleSpinBox()
+        self.min_fvg_gap_spinbox.setRange(0, 10000)
+        self.min_fvg_gap_spinbox.setValue(float(config_manager.get('trading.min_fvg_gap_points', 0.0) or 0.0))
+
+        self.max_positions_spinbox = QSpinBox()
+        self.max_positions_spinbox.setRange(1, 20)
+        self.max_positions_spinbox.setValue(int(config_manager.get('trading.max_open_positions', 1) or 1))
+
         risk_layout.addRow("Cặp giao dịch:", self.symbol_input)
         risk_layout.addRow("Rủi ro mỗi lệnh:", self.risk_spinbox)
         risk_layout.addRow("Take Profit (R:R):", self.tp_rr_spinbox)
         risk_layout.addRow("SL Buffer (points):", self.sl_buffer_spinbox)
+        risk_layout.addRow("FVG tối thiểu (points):", self.min_fvg_gap_spinbox)
+        risk_layout.addRow("Số lệnh mở tối đa (backtest):", self.max_positions_spinbox)
         layout.addWidget(risk_group)
 
         # Modules
@@ -273,8 +284,11 @@ class MainWindow(QMainWindow):
         self.ote_checkbox.setChecked(bool(config_manager.get('trading.ote_enabled', True)))
         self.partial_profit_checkbox = QCheckBox("Bật Chốt lời từng phần (Partial Profits)")
         self.partial_profit_checkbox.setChecked(bool(config_manager.get('trading.partial_profits_enabled', False)))
+        self.fvg_skip_filled_checkbox = QCheckBox("Bỏ qua FVG đã bị lấp hoàn toàn")
+        self.fvg_skip_filled_checkbox.setChecked(bool(config_manager.get('trading.fvg_skip_filled', True)))
         adv_layout.addWidget(self.ote_checkbox)
         adv_layout.addWidget(self.partial_profit_checkbox)
+        adv_layout.addWidget(self.fvg_skip_filled_checkbox)
         layout.addWidget(adv_group)
 
         self.save_config_button = QPushButton("LƯU TẤT CẢ CẤU HÌNH")
@@ -514,11 +528,17 @@ class MainWindow(QMainWindow):
             config_manager.set('trading.risk_percent_per_trade', self.risk_spinbox.value())
             config_manager.set('trading.take_profit_rr', self.tp_rr_spinbox.value())
             config_manager.set('trading.sl_buffer_points', self.sl_buffer_spinbox.value())
+            config_manager.set('trading.min_fvg_gap_points', self.min_fvg_gap_spinbox.value())
+            config_manager.set('trading.max_open_positions', self.max_positions_spinbox.value())
             config_manager.set('trading.ote_enabled', self.ote_checkbox.isChecked())
             config_manager.set('trading.partial_profits_enabled', self.partial_profit_checkbox.isChecked())
+            config_manager.set('trading.fvg_skip_filled', self.fvg_skip_filled_checkbox.isChecked())
             config_manager.set('mt5.symbol', self.symbol_input.currentText())
             config_manager.set('binance.symbol', self.symbol_input.currentText())
             config_manager.save_config()
+            # Kết quả phân tích đã cache có thể dựa trên cấu hình cũ (tiến trình phân tích của scanner
+            # tự bỏ cache khi thấy version cấu hình mới, xem scanner.analyze_symbol)
+            analysis_cache.invalidate()
             self.append_to_log("Cấu hình đã được lưu thành công!")
         except Exception as e:
             self.append_to_log(f"Lỗi khi lưu cấu hình: {e}")
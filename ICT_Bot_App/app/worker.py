@@ -1,4 +1,5 @@
 from PySide6.QtCore import QThread, Signal
+import asyncio
 import time
 from datetime import datetime
 import traceback
@@ -9,6 +10,10 @@ from trading_core.connectors import get_connector
 from app.signals import WorkerSignals, BacktestSignals
 from app.config_manager import config_manager
 from trading_core.backtester import Backtester
+from trading_core.scanner import MultiSymbolScanner
+from trading_core.connectors.caching_connector import CachingConnector, cached_connector
+from trading_core.connectors.async_connector import ThreadedAsyncConnector, get_async_connector
+from trading_core.prefetch import execute_strategy_async
 
 class BotWorker(QThread):
     def __init__(self):
@@ -16,6 +21,9 @@ class BotWorker(QThread):
         self.signals = WorkerSignals()
         self._is_running = True
         self.connector = None
+        # Chế độ 'trading.async_prefetch': connector async và event loop riêng của worker
+        self.async_connector = None
+        self.loop = None
         
         self.last_trade_close_time = None
         self.previous_position_count = 0
@@ -53,6 +61,20 @@ class BotWorker(QThread):
             return
 
         self.signals.log_message.emit(f"Sử dụng nền tảng: {platform.upper()}")
+        # Ghi nhớ symbol info/số dư/vị thế trong chu kỳ (connector_cache), đặt lệnh thì làm mới
+        self.connector = cached_connector(self.connector)
+        if bool(config_manager.get('trading.async_prefetch', False)):
+            self._start_async(platform)
+        scanner_symbols = config_manager.get('scanner.symbols', []) or []
+        if bool(config_manager.get('scanner.enabled', False)) and scanner_symbols:
+            self.signals.bot_status.emit("Đang chạy")
+            try:
+                self._run_scanner(list(scanner_symbols))
+            except Exception as e:
+                self.signals.log_message.emit(f"\nLỗi trong chế độ quét nhiều cặp: {e}")
+            self._shutdown()
+            return
+
         symbol = self.connector.get_symbol()
         if not symbol: 
             self.signals.log_message.emit("Lỗi: Không thể lấy symbol từ connector.")
@@ -74,6 +96,8 @@ class BotWorker(QThread):
 
         while self._is_running:
             try:
+                if isinstance(self.connector, CachingConnector):
+                    self.connector.begin_cycle()
                 # 1. KIỂM TRA VÀ KHÔI PHỤC KẾT NỐI
                 current_positions = self.connector.get_open_positions()
                 
@@ -131,7 +155,12 @@ class BotWorker(QThread):
 
                 if is_kill_zone_time(signals=self.signals):
                     self.signals.log_message.emit(f"\n[{datetime.now().strftime('%H:%M:%S')}] Đang trong Kill Zone. Bắt đầu quét tín hiệu...")
-                    execute_strategy(self.connector, signals=self.signals) 
+                    if self.async_connector is not None:
+                        self.loop.run_until_complete(execute_strategy_async(self.async_connector, signals=self.signals))
+                    else:
+                        execute_strategy(self.connector, signals=self.signals) 
+                    if isinstance(self.connector, CachingConnector):
+                        self.signals.log_message.emit(self.connector.stats_message())
                 else:
                     self.signals.log_message.emit(f"[{datetime.now().strftime('%H:%M:%S')}] Ngoài giờ Kill Zone. Đang chờ...")
                     self.signals.market_bias.emit("Chưa kích hoạt (Ngoài KZ)")
@@ -143,6 +172,57 @@ class BotWorker(QThread):
                 self.signals.log_message.emit(f"\nLỗi trong vòng lặp chính: {e}")
                 self.msleep(60000)
         
+        self._shutdown()
+
+    def _run_scanner(self, symbols: list[str]) -> None:
+        """Chế độ quét nhiều cặp: mỗi chu kỳ quét đồng thời toàn bộ 'scanner.symbols' (trạng thái lệnh/hạ nhiệt riêng từng cặp)."""
+        interval = float(config_manager.get('scanner.interval_seconds', 60) or 60)
+        analysis_workers = config_manager.get('scanner.analysis_workers', None)
+        scanner = MultiSymbolScanner(self.connector, symbols, io_workers=int(config_manager.get('scanner.io_workers', 8) or 8),
+                                     analysis_workers=None if analysis_workers is None else int(analysis_workers),
+                                     cooldown_period=self.cooldown_period, signals=self.signals)
+        self.signals.log_message.emit(f"Chế độ quét nhiều cặp: {len(scanner.states)} cặp, chu kỳ {interval:.0f} giây.")
+        try:
+            while self._is_running:
+                if is_kill_zone_time(signals=self.signals):
+                    report = scanner.run_cycle()
+                    self.signals.log_message.emit(scanner.stats_message(report, interval))
+                    self.msleep(int(max(0.0, interval - scanner.last_cycle_seconds) * 1000))
+                else:
+                    self.signals.log_message.emit(f"[{datetime.now().strftime('%H:%M:%S')}] Ngoài giờ Kill Zone. Đang chờ...")
+                    self.signals.market_bias.emit("Chưa kích hoạt (Ngoài KZ)")
+                    self.msleep(300000)
+        finally:
+            scanner.close()
+
+    def _start_async(self, platform: str) -> None:
+        """Tải trước dữ liệu mỗi chu kỳ bằng các request đồng thời; lỗi thì quay về chế độ tuần tự."""
+        self.loop = asyncio.new_event_loop()
+        async_connector = get_async_connector(platform, signals=self.signals, connector=self.connector)
+        # Adapter MT5 dùng lại phiên đã kết nối; Binance async cần phiên HTTP riêng
+        if async_connector is not None and (isinstance(async_connector, ThreadedAsyncConnector)
+                                            or self.loop.run_until_complete(async_connector.connect())):
+            self.async_connector = async_connector
+            self.signals.log_message.emit("Bật tải trước dữ liệu đồng thời (async).")
+        else:
+            self.signals.log_message.emit("Không khởi tạo được connector async, dùng chế độ tuần tự.")
+
+    def _stop_async(self) -> None:
+        if self.async_connector is not None:
+            try:
+                if isinstance(self.async_connector, ThreadedAsyncConnector):
+                    self.async_connector.close()
+                else:
+                    self.loop.run_until_complete(self.async_connector.disconnect())
+            except Exception as e:
+                self.signals.log_message.emit(f"Lỗi khi đóng connector async: {e}")
+            self.async_connector = None
+        if self.loop is not None:
+            self.loop.close()
+            self.loop = None
+
+    def _shutdown(self) -> None:
+        self._stop_async()
         self.signals.log_message.emit("Bot đã dừng.")
         self.signals.bot_status.emit("Đã dừng")
         self.signals.market_bias.emit("Đã dừng") 
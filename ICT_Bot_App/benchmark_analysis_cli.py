@@ -0,0 +1,279 @@
+import sys
+import os
+import argparse
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__))))
+
+import numpy as np
+import pandas as pd
+from trading_core.market_structure import find_swings, detect_bos_choch, STRUCTURE_CATEGORIES
+from trading_core.market_structure import detect_liquidity_sweep
+from trading_core.pd_arrays import detect_fvg, detect_order_block, detect_breaker_block, check_displacement
+from typing import cast
+
+
+def make_ohlcv(n: int, seed: int = 42) -> pd.DataFrame:
+    """Sinh dữ liệu OHLCV dạng random walk (làm tròn giá để có các đỉnh/đáy bằng nhau)."""
+    rng = np.random.default_rng(seed)
+    close = 100 + np.cumsum(rng.normal(0, 0.3, n))
+    open_ = np.r_[close[0], close[:-1]] + rng.normal(0, 0.05, n)
+    high = np.maximum(open_, close) + np.abs(rng.normal(0, 0.2, n))
+    low = np.minimum(open_, close) - np.abs(rng.normal(0, 0.2, n))
+    index = pd.date_range('2020-01-01', periods=n, freq='5min', name='timestamp')
+    return pd.DataFrame({
+        'open': open_.round(1), 'high': high.round(1), 'low': low.round(1),
+        'close': close.round(1), 'volume': rng.integers(1, 100, n)
+    }, index=index)
+
+
+# --- Các bản cài đặt cũ, giữ lại làm mốc so sánh ---
+
+def find_swings_rolling_apply(df, swing_length=10):
+    df['swing_high'] = df['high'].rolling(window=swing_length*2+1, center=True).apply(lambda x: x.iloc[swing_length] if x.iloc[swing_length] == x.max() else np.nan)
+    df['swing_low'] = df['low'].rolling(window=swing_length*2+1, center=True).apply(lambda x: x.iloc[swing_length] if x.iloc[swing_length] == x.min() else np.nan)
+    return df
+
+
+def detect_bos_choch_loc(df):
+    df['bos'] = None
+    df['choch'] = None
+    
+    if 'swing_high' not in df.columns or 'swing_low' not in df.columns:
+        df = find_swings(df)
+
+    swing_highs = df[df['swing_high'].notna()]
+    swing_lows = df[df['swing_low'].notna()]
+
+    swing_highs = cast(pd.DataFrame, swing_highs)
+    swing_lows = cast(pd.DataFrame, swing_lows)
+    
+    if swing_highs.empty or swing_lows.empty: return df
+    
+    current_trend = None
+    last_high_val = None
+    last_low_val = None
+    
+    first_high_idx = swing_highs.index[0]
+    first_low_idx = swing_lows.index[0]
+    
+    if first_high_idx < first_low_idx:
+        current_trend = 'down'
+        last_high_val = swing_highs.loc[first_high_idx, 'swing_high']
+    else:
+        current_trend = 'up'
+        last_low_val = swing_lows.loc[first_low_idx, 'swing_low']
+
+    for i in range(1, len(df)):
+        current_idx = df.index[i]
+        current_close = df['close'].iloc[i]
+        
+        if pd.notna(df.loc[current_idx, 'swing_high']):
+            last_high_val = df.loc[current_idx, 'swing_high']
+        
+        if pd.notna(df.loc[current_idx, 'swing_low']):
+            last_low_val = df.loc[current_idx, 'swing_low']
+            
+        if current_trend == 'up':
+            if last_high_val and current_close > last_high_val:
+                df.loc[current_idx, 'bos'] = 'bullish'
+                last_high_val = current_close
+            
+            elif last_low_val and current_close < last_low_val:
+                df.loc[current_idx, 'choch'] = 'bearish'
+                current_trend = 'down'
+                last_low_val = current_close
+
+        elif current_trend == 'down':
+            if last_low_val and current_close < last_low_val:
+                df.loc[current_idx, 'bos'] = 'bearish'
+                last_low_val = current_close
+
+            elif last_high_val and current_close > last_high_val:
+                df.loc[current_idx, 'choch'] = 'bullish'
+                current_trend = 'up'
+                last_high_val = current_close
+
+        elif current_trend is None:
+             if last_high_val and current_close > last_high_val:
+                 current_trend = 'up'
+             elif last_low_val and current_close < last_low_val:
+                 current_trend = 'down'
+                 
+    return df
+
+
+def detect_fvg_loop(df):
+    df['fvg_bullish_high'] = np.nan
+    df['fvg_bullish_low'] = np.nan
+    df['fvg_bearish_high'] = np.nan
+    df['fvg_bearish_low'] = np.nan
+
+    for i in range(2, len(df)):
+        # Bullish FVG
+        if df['high'].iloc[i-2] < df['low'].iloc[i]:
+            df.loc[df.index[i-1], 'fvg_bullish_high'] = df['low'].iloc[i]
+            df.loc[df.index[i-1], 'fvg_bullish_low'] = df['high'].iloc[i-2]
+
+        # Bearish FVG
+        if df['low'].iloc[i-2] > df['high'].iloc[i]:
+            df.loc[df.index[i-1], 'fvg_bearish_high'] = df['low'].iloc[i-2]
+            df.loc[df.index[i-1], 'fvg_bearish_low'] = df['high'].iloc[i]
+
+    return df
+
+
+def detect_order_block_loop(df):
+    df['ob_bullish'] = False
+    df['ob_bearish'] = False
+    df['ob_zone_high'] = np.nan
+    df['ob_zone_low'] = np.nan
+    df['liquidity_sweep'] = 'none'
+    df['has_displacement'] = False
+
+    if 'fvg_bullish_high' not in df.columns:
+        df = detect_fvg(df)
+
+    df_with_swings = find_swings(df.copy())
+
+    for i in range(15, len(df_with_swings)-5): 
+        sweep_type = detect_liquidity_sweep(df_with_swings, i)
+        df.loc[df.index[i], 'liquidity_sweep'] = sweep_type
+
+        if df_with_swings['close'].iloc[i] < df_with_swings['open'].iloc[i]:
+            bos_found = False
+            for j in range(i + 1, min(i + 6, len(df_with_swings))):
+                if 'bos' in df_with_swings.columns and df_with_swings['bos'].iloc[j] == 'bullish':
+                    bos_found = True
+                    break
+            fvg_found = False
+            for k in range(i + 1, min(i + 4, len(df_with_swings))):
+                if pd.notna(df_with_swings['fvg_bullish_high'].iloc[k]):
+                    fvg_found = True
+                    break
+            has_displacement = check_displacement(df_with_swings, i, 'bullish')
+            if bos_found and fvg_found and has_displacement:
+                df.loc[df.index[i], 'ob_bullish'] = True
+                df.loc[df.index[i], 'ob_zone_high'] = df_with_swings['high'].iloc[i]
+                df.loc[df.index[i], 'ob_zone_low'] = df_with_swings['low'].iloc[i]
+                df.loc[df.index[i], 'has_displacement'] = True
+
+        elif df_with_swings['close'].iloc[i] > df_with_swings['open'].iloc[i]:
+            bos_found = False
+            for j in range(i + 1, min(i + 6, len(df_with_swings))):
+                if 'bos' in df_with_swings.columns and df_with_swings['bos'].iloc[j] == 'bearish':
+                    bos_found = True
+                    break
+            fvg_found = False
+            for k in range(i + 1, min(i + 4, len(df_with_swings))):
+                if pd.notna(df_with_swings['fvg_bearish_high'].iloc[k]):
+                    fvg_found = True
+                    break
+            has_displacement = check_displacement(df_with_swings, i, 'bearish')
+            if bos_found and fvg_found and has_displacement:
+                df.loc[df.index[i], 'ob_bearish'] = True
+                df.loc[df.index[i], 'ob_zone_high'] = df_with_swings['high'].iloc[i]
+                df.loc[df.index[i], 'ob_zone_low'] = df_with_swings['low'].iloc[i]
+                df.loc[df.index[i], 'has_displacement'] = True
+                
+    return df
+
+
+def detect_breaker_block_slices(df):
+    df['bb_bullish'] = False
+    df['bb_bearish'] = False
+
+    ob_indices = [i for i in range(len(df)) if df['ob_bullish'].iloc[i] or df['ob_bearish'].iloc[i]]
+
+    for i in ob_indices:
+        ob_row = df.iloc[i]
+        zone_high = ob_row['ob_zone_high']
+        zone_low = ob_row['ob_zone_low']
+
+        if i + 1 >= len(df): continue
+            
+        subset_after_ob = df.iloc[i+1:]
+        
+        if ob_row['ob_bullish']: 
+            broken = subset_after_ob[subset_after_ob['close'] < zone_low]
+            if not broken.empty:
+                df.loc[df.index[i], 'bb_bearish'] = True 
+        
+        elif ob_row['ob_bearish']: 
+            broken = subset_after_ob[subset_after_ob['close'] > zone_high]
+            if not broken.empty:
+                df.loc[df.index[i], 'bb_bullish'] = True 
+    
+    return df
+
+
+def prepare_structure(df: pd.DataFrame) -> pd.DataFrame:
+    """FVG + swings + BOS/CHOCH, đầu vào của detect_order_block."""
+    return detect_bos_choch(find_swings(detect_fvg(df)))
+
+
+def prepare_order_blocks(df: pd.DataFrame) -> pd.DataFrame:
+    """Đầu vào của detect_breaker_block."""
+    return detect_order_block(prepare_structure(df))
+
+
+def as_structure_categories(df: pd.DataFrame) -> pd.DataFrame:
+    """Bản cũ trả về cột object (None); đổi sang categorical để so sánh với bản mới."""
+    dtype = pd.CategoricalDtype(STRUCTURE_CATEGORIES)
+    return df.astype({'bos': dtype, 'choch': dtype})
+
+
+# Tên benchmark -> (hàm mới, hàm cũ, các cột kết quả cần so sánh, bước chuẩn bị dữ liệu)
+BENCHMARKS = {
+    'find_swings': (find_swings, find_swings_rolling_apply, ['swing_high', 'swing_low'], None),
+    'detect_bos_choch': (detect_bos_choch, lambda df: as_structure_categories(detect_bos_choch_loc(df)),
+                         ['bos', 'choch'], find_swings),
+    'detect_fvg': (detect_fvg, detect_fvg_loop,
+                   ['fvg_bullish_high', 'fvg_bullish_low', 'fvg_bearish_high', 'fvg_bearish_low'], None),
+    'detect_order_block': (detect_order_block, detect_order_block_loop,
+                           ['ob_bullish', 'ob_bearish', 'ob_zone_high', 'ob_zone_low',
+                            'liquidity_sweep', 'has_displacement'], prepare_structure),
+    'detect_breaker_block': (detect_breaker_block, detect_breaker_block_slices,
+                             ['bb_bullish', 'bb_bearish'], prepare_order_blocks),
+}
+
+
+def run_benchmark(name: str, sizes: list[int], reference_limit: int) -> None:
+    current, reference, columns, prepare = BENCHMARKS[name]
+    print(f"\n=== {name} ===")
+    print(f"{'Số nến':>10} | {'Mới (s)':>10} | {'Cũ (s)':>10} | {'Tăng tốc':>9} | Kết quả")
+    for n in sizes:
+        df = make_ohlcv(n)
+        if prepare is not None:
+            df = prepare(df)
+
+        t0 = time.perf_counter()
+        new_df = current(df.copy())
+        t_new = time.perf_counter() - t0
+
+        if n > reference_limit:
+            print(f"{n:>10} | {t_new:>10.4f} | {'-':>10} | {'-':>9} | bỏ qua bản cũ")
+            continue
+
+        t0 = time.perf_counter()
+        old_df = reference(df.copy())
+        t_old = time.perf_counter() - t0
+
+        try:
+            pd.testing.assert_frame_equal(new_df[columns], old_df[columns])
+            status = "giống nhau"
+        except AssertionError as e:
+            status = f"KHÁC: {str(e).splitlines()[0]}"
+        speedup = t_old / t_new if t_new > 0 else float('inf')
+        print(f"{n:>10} | {t_new:>10.4f} | {t_old:>10.4f} | {speedup:>8.1f}x | {status}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark các hàm phân tích vector hóa so với bản cài đặt cũ.")
+    parser.add_argument('names', nargs='*', default=list(BENCHMARKS), help=f"Các benchmark cần chạy: {', '.join(BENCHMARKS)}")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000, 1_000_000], help="Số nến của dữ liệu thử")
+    parser.add_argument('--reference-limit', type=int, default=1_000_000, help="Không chạy bản cũ với dữ liệu lớn hơn ngưỡng này")
+    args = parser.parse_args()
+
+    for benchmark_name in args.names:
+        run_benchmark(benchmark_name, args.sizes, args.reference_limit)
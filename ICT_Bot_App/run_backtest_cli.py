@@ -1,9 +1,11 @@
 import sys
 import os
+import argparse
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__))))
 
 from trading_core.backtester import Backtester
+from trading_core.data_source import FileDataSource
 
 class MockSignal:
     def emit(self, *args):
@@ -31,6 +33,11 @@ class NoOpMockSignal(MockSignal):
         pass
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Chạy backtest từ dòng lệnh.")
+    parser.add_argument('--data-dir', default=None, help="Thư mục file CSV/Parquet/.ohlcv theo symbol và timeframe thay cho MT5")
+    parser.add_argument('--point', type=float, default=None, help="Giá trị point của symbol khi dùng --data-dir")
+    args = parser.parse_args()
+
     params = {
         'symbol': 'BTCUSDm',
         'timeframe': 'M5',
@@ -44,7 +51,8 @@ if __name__ == "__main__":
     # Replace the progress signal with a no-op version
     signals.progress = NoOpMockSignal()
     
-    backtester = Backtester(params, signals)
+    data_source = FileDataSource(args.data_dir, {'point': args.point} if args.point else None) if args.data_dir else None
+    backtester = Backtester(params, signals, data_source=data_source)
     
     try:
         backtester.run()
@@ -0,0 +1,52 @@
+import sys
+import os
+import argparse
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__))))
+
+from app.config_manager import config_manager
+from trading_core.connectors import get_connector
+from trading_core.connectors.mock_connector import MockConnector
+from trading_core.scanner import MultiSymbolScanner
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Quét đồng thời nhiều cặp và đo độ trễ mỗi chu kỳ (mặc định không đặt lệnh).")
+    parser.add_argument('--platform', default=None, choices=['mt5', 'binance', 'mock'], help="Nền tảng (mặc định theo config)")
+    parser.add_argument('--data-file', default='mock_data.csv', help="File CSV cho --platform mock")
+    parser.add_argument('--symbols', default=None, help="Danh sách symbol, cách nhau bởi dấu phẩy (mặc định: scanner.symbols trong config)")
+    parser.add_argument('--cycles', type=int, default=1, help="Số chu kỳ quét")
+    parser.add_argument('--interval', type=float, default=None, help="Nhịp quét mong muốn, giây (mặc định: scanner.interval_seconds)")
+    parser.add_argument('--io-workers', type=int, default=None, help="Số thread I/O (mặc định: scanner.io_workers)")
+    parser.add_argument('--analysis-workers', type=int, default=None, help="Số tiến trình phân tích, 0 = phân tích trong thread I/O")
+    parser.add_argument('--trade', action='store_true', help="Đặt lệnh thật khi có tín hiệu")
+    args = parser.parse_args()
+
+    platform = args.platform or config_manager.get('platform', 'mt5')
+    connector = MockConnector(data_file=args.data_file) if platform == 'mock' else get_connector(platform)
+    if connector is None or not connector.connect():
+        print("Không thể kết nối tới nền tảng.")
+        sys.exit(1)
+
+    symbols = [s.strip() for s in args.symbols.split(',') if s.strip()] if args.symbols else list(config_manager.get('scanner.symbols', []) or [])
+    if not symbols:
+        print("Chưa có symbol nào để quét (--symbols hoặc scanner.symbols).")
+        connector.disconnect()
+        sys.exit(1)
+
+    interval = args.interval or float(config_manager.get('scanner.interval_seconds', 60) or 60)
+    analysis_workers = args.analysis_workers if args.analysis_workers is not None else config_manager.get('scanner.analysis_workers', None)
+    scanner = MultiSymbolScanner(connector, symbols,
+                                 io_workers=args.io_workers or int(config_manager.get('scanner.io_workers', 8) or 8),
+                                 analysis_workers=None if analysis_workers is None else int(analysis_workers),
+                                 place_orders=args.trade)
+    try:
+        for cycle in range(args.cycles):
+            report = scanner.run_cycle()
+            print(report.round(1).to_string(index=False))
+            print(scanner.stats_message(report, interval))
+            if cycle + 1 < args.cycles:
+                time.sleep(max(0.0, interval - scanner.last_cycle_seconds))
+    finally:
+        scanner.close()
+        connector.disconnect()
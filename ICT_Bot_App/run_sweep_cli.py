@@ -0,0 +1,73 @@
+import sys
+import os
+import argparse
+import json
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__))))
+
+from trading_core.backtest_sweep import grid_runs, random_runs, run_sweep, RESULT_COLUMNS
+from trading_core.connectors import get_connector
+from trading_core.connectors.mock_connector import MockConnector
+from trading_core.data_source import ConnectorDataSource, FileDataSource
+
+# Ví dụ file không gian tham số (key cấu hình dạng 'trading.take_profit_rr'):
+# {
+#     "trading.take_profit_rr": [1.5, 2.0, 3.0],
+#     "trading.sl_buffer_points": {"min": 20, "max": 80},
+#     "trading.ote_enabled": [true, false],
+#     "kill_zones": [[{"name": "London", "start": [3, 0], "end": [6, 0]}],
+#                    [{"name": "New York", "start": [7, 0], "end": [10, 0]}]]
+# }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Chạy backtest song song trên lưới hoặc mẫu ngẫu nhiên của các tham số cấu hình.")
+    parser.add_argument('space', help="File JSON: key cấu hình -> danh sách giá trị (hoặc {'min', 'max'} khi dùng --random)")
+    parser.add_argument('--random', type=int, default=0, help="Số tổ hợp ngẫu nhiên (0 = chạy toàn bộ lưới)")
+    parser.add_argument('--seed', type=int, default=None, help="Seed cho tìm kiếm ngẫu nhiên")
+    parser.add_argument('--workers', type=int, default=None, help="Số tiến trình (mặc định = số CPU)")
+    parser.add_argument('--platform', default='mt5', choices=['mt5', 'binance', 'mock'], help="Nguồn dữ liệu lịch sử")
+    parser.add_argument('--data-file', default='mock_data.csv', help="File CSV cho --platform mock")
+    parser.add_argument('--data-dir', default=None, help="Thư mục file CSV/Parquet/.ohlcv theo symbol và timeframe (không cần kết nối sàn)")
+    parser.add_argument('--point', type=float, default=None, help="Giá trị point của symbol khi dùng --data-dir")
+    parser.add_argument('--symbol', default='BTCUSDm')
+    parser.add_argument('--timeframe', default=None, help="Khung chính (mặc định theo config)")
+    parser.add_argument('--timeframe-smaller', default=None, help="Khung nhỏ (mặc định theo config)")
+    parser.add_argument('--htf', default='H4', help="Khung HTF")
+    parser.add_argument('--start', default='2024-02-16', help="Ngày bắt đầu (YYYY-MM-DD)")
+    parser.add_argument('--end', default='2024-08-08', help="Ngày kết thúc (YYYY-MM-DD)")
+    parser.add_argument('--rank-by', default='total_pnl', choices=RESULT_COLUMNS, help="Chỉ số dùng để xếp hạng")
+    parser.add_argument('--output', default='backtest_results_sweep.csv', help="File CSV kết quả")
+    parser.add_argument('--top', type=int, default=10, help="Số dòng đầu in ra màn hình")
+    args = parser.parse_args()
+
+    with open(args.space, 'r', encoding='utf-8') as f:
+        space = json.load(f)
+    runs = random_runs(space, args.random, args.seed) if args.random > 0 else grid_runs(space)
+
+    if args.data_dir:
+        data_source = FileDataSource(args.data_dir, {'point': args.point} if args.point else None)
+    else:
+        connector = MockConnector(data_file=args.data_file) if args.platform == 'mock' else get_connector(args.platform)
+        if connector is None or not connector.connect():
+            print("Không thể kết nối để lấy dữ liệu lịch sử.")
+            sys.exit(1)
+        data_source = ConnectorDataSource(connector)
+
+    params = {
+        'symbol': args.symbol,
+        'timeframe': args.timeframe,
+        'timeframe_smaller': args.timeframe_smaller,
+        'htf_timeframe': args.htf,
+        'start_date': args.start,
+        'end_date': args.end,
+    }
+    try:
+        results = run_sweep(params, runs, data_source, max_workers=args.workers, rank_by=args.rank_by)
+    finally:
+        data_source.close()
+
+    if results.empty:
+        sys.exit(1)
+    results.to_csv(args.output, index=False)
+    print(results.head(args.top).to_string(index=False))
+    print(f"\n[INFO] Đã lưu {len(results)} kết quả vào: {args.output}")
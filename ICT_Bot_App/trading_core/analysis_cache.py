@@ -0,0 +1,69 @@
+import threading
+from collections import OrderedDict
+from typing import Any, Callable
+
+
+class AnalysisCache:
+    """
+    Cache kết quả phân tích theo (symbol, timeframe, loại phân tích, nến đã đóng cuối cùng).
+
+    Kết quả chỉ được tính lại khi có nến mới đóng cửa: với khung H1/H4, vòng lặp
+    60 giây của bot sẽ dùng lại kết quả cũ cho tới khi nến tiếp theo đóng.
+    Khi vượt quá `max_entries`, mục ít được dùng gần đây nhất bị loại (LRU).
+    An toàn khi gọi từ nhiều thread (worker và giao diện).
+    """
+
+    def __init__(self, max_entries: int = 32):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[tuple, Any] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, symbol: str, timeframe: str, kind: str, last_closed_bar, compute: Callable[[], Any]) -> Any:
+        """
+        Trả về kết quả đã cache cho khóa, hoặc gọi `compute()` rồi lưu lại.
+        `kind` phân biệt các loại phân tích trên cùng khung thời gian (vd. 'htf_bias', 'main').
+        """
+        key = (symbol, timeframe, kind, last_closed_bar)
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+
+        value = compute()
+
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return value
+
+    def invalidate(self, symbol: str | None = None, timeframe: str | None = None) -> int:
+        """
+        Xóa các mục của symbol/timeframe (None = mọi giá trị), ví dụ khi cấu hình thay đổi.
+        Trả về số mục đã xóa.
+        """
+        with self._lock:
+            keys = [key for key in self._entries
+                    if (symbol is None or key[0] == symbol) and (timeframe is None or key[1] == timeframe)]
+            for key in keys:
+                del self._entries[key]
+            return len(keys)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats_message(self) -> str:
+        """Dòng log thống kê hit/miss của cache."""
+        total = self.hits + self.misses
+        hit_rate = self.hits / total * 100 if total else 0.0
+        return (f"[Cache] Phân tích: {self.hits} hit / {self.misses} miss "
+                f"({hit_rate:.0f}% hit, {len(self)}/{self.max_entries} mục)")
+
+
+# Tạo một instance duy nhất để sử dụng trong toàn bộ ứng dụng
+analysis_cache = AnalysisCache()
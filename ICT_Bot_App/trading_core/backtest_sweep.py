@@ -0,0 +1,186 @@
+import itertools
+import json
+import multiprocessing
+import random
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import shared_memory
+from types import SimpleNamespace
+import numpy as np
+import pandas as pd
+
+from app.config_manager import config_manager
+from trading_core.backtester import Backtester, HTF_WINDOW
+from trading_core.data_source import FrameDataSource, HistoricalDataSource
+from trading_core.ohlcv_store import OHLCV_DTYPE, ohlcv_records, records_frame
+
+RESULT_COLUMNS = ['total_pnl', 'win_rate', 'profit_factor', 'max_drawdown', 'total_trades']
+# Các thuộc tính symbol_info mà chiến lược/backtester có thể đọc (object của MT5 không pickle được)
+SYMBOL_INFO_FIELDS = ('point', 'digits', 'volume_step', 'volume_min', 'volume_max',
+                      'tick_value', 'tick_size', 'trade_tick_value', 'trade_tick_size', 'trade_contract_size')
+
+
+def grid_runs(space: dict) -> list[dict]:
+    """Mọi tổ hợp của không gian tham số {key cấu hình: [giá trị, ...]}."""
+    for key, values in space.items():
+        if not isinstance(values, list):
+            raise ValueError(f"'{key}': tìm kiếm dạng lưới cần danh sách giá trị, khoảng {{'min', 'max'}} chỉ dùng với tìm kiếm ngẫu nhiên")
+    keys = list(space)
+    return [dict(zip(keys, values)) for values in itertools.product(*(space[key] for key in keys))]
+
+
+def random_runs(space: dict, n: int, seed: int | None = None) -> list[dict]:
+    """
+    n tổ hợp ngẫu nhiên: danh sách -> chọn một giá trị,
+    {'min': a, 'max': b} -> số thực phân bố đều trong [a, b].
+    """
+    rng = random.Random(seed)
+    runs = []
+    for _ in range(n):
+        run = {}
+        for key, values in space.items():
+            if isinstance(values, dict):
+                run[key] = rng.uniform(float(values['min']), float(values['max']))
+            else:
+                run[key] = rng.choice(values)
+        runs.append(run)
+    return runs
+
+
+def load_frames(data_source: HistoricalDataSource, symbol: str, timeframes: list[str], start=None, end=None,
+                warmup: int = HTF_WINDOW) -> dict[str, pd.DataFrame]:
+    """Tải dữ liệu một lần ở tiến trình chính cho mọi khung thời gian các lần chạy cần."""
+    frames = {}
+    for timeframe in dict.fromkeys(timeframes):
+        df = data_source.load(symbol, timeframe, start, end, warmup=warmup)
+        if df is not None:
+            frames[timeframe] = df
+    return frames
+
+
+def snapshot_symbol_info(symbol_info: object | None) -> SimpleNamespace | None:
+    """Bản sao pickle được của symbol_info để gửi sang tiến trình con."""
+    if symbol_info is None:
+        return None
+    return SimpleNamespace(**{field: getattr(symbol_info, field) for field in SYMBOL_INFO_FIELDS if hasattr(symbol_info, field)})
+
+
+def share_frames(frames: dict[str, pd.DataFrame]) -> tuple[dict[str, tuple[str, int]], list[shared_memory.SharedMemory]]:
+    """
+    Chép dữ liệu vào shared memory (mỗi khung thời gian một block bản ghi OHLCV_DTYPE).
+    Trả về (timeframe -> (tên block, số nến), các block) để tiến trình chính giải phóng sau khi chạy xong.
+    """
+    specs, blocks = {}, []
+    for timeframe, df in frames.items():
+        records = ohlcv_records(df)
+        block = shared_memory.SharedMemory(create=True, size=max(records.nbytes, 1))
+        np.ndarray(records.shape, dtype=OHLCV_DTYPE, buffer=block.buf)[:] = records
+        specs[timeframe] = (block.name, len(records))
+        blocks.append(block)
+    return specs, blocks
+
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)  # Python 3.13+
+    except TypeError:
+        # Trước 3.13: tiến trình con (spawn) dùng chung resource_tracker với tiến trình chính,
+        # block vẫn chỉ bị xóa khi tiến trình chính gọi unlink()
+        return shared_memory.SharedMemory(name=name)
+
+
+# Dữ liệu của tiến trình con, nạp một lần trong _init_worker và dùng cho mọi lần chạy
+_worker_state: dict = {}
+
+
+def _init_worker(specs: dict[str, tuple[str, int]], symbol_info: object | None) -> None:
+    frames = {}
+    for timeframe, (name, length) in specs.items():
+        block = _attach(name)
+        frames[timeframe] = records_frame(np.ndarray((length,), dtype=OHLCV_DTYPE, buffer=block.buf))
+        block.close()
+    _worker_state.update(frames=frames, symbol_info=symbol_info)
+
+
+def _run_backtest(params: dict, overrides: dict) -> dict:
+    data_source = FrameDataSource(_worker_state['frames'], _worker_state['symbol_info'])
+    with config_manager.overrides(overrides):
+        backtester = Backtester(params, data_source=data_source)
+        backtester.run()
+    if backtester.results is None:
+        return {'error': "Dữ liệu không đủ để chạy backtest."}
+    return backtester.results
+
+
+def rank_results(results: pd.DataFrame, rank_by: str = 'total_pnl') -> pd.DataFrame:
+    """Xếp hạng kết quả; max_drawdown càng nhỏ càng tốt, các chỉ số khác càng lớn càng tốt."""
+    if results.empty or rank_by not in results.columns:
+        return results
+    ranked = results.sort_values(rank_by, ascending=(rank_by == 'max_drawdown'), na_position='last', kind='stable')
+    ranked = ranked.reset_index(drop=True)
+    ranked.insert(0, 'rank', np.arange(1, len(ranked) + 1))
+    return ranked
+
+
+def run_sweep(params: dict, runs: list[dict], data_source: HistoricalDataSource, max_workers: int | None = None,
+              rank_by: str = 'total_pnl', signals=None) -> pd.DataFrame:
+    """
+    Chạy Backtester cho từng bộ ghi đè cấu hình trong `runs` trên ProcessPoolExecutor.
+    Dữ liệu OHLCV được tải một lần từ `data_source` (khoảng ngày của params cộng warm-up)
+    và chia sẻ qua shared memory.
+    Trả về bảng kết quả đã xếp hạng (một dòng mỗi lần chạy).
+    """
+    def log(message: str) -> None:
+        if signals:
+            signals.log_message.emit(message)
+        else:
+            print(message)
+
+    timeframe = params.get('timeframe') or config_manager.get('trading.timeframe', 'H1')
+    timeframe_smaller = params.get('timeframe_smaller') or config_manager.get('trading.timeframe_smaller', 'M15')
+    htf_timeframe = params.get('htf_timeframe', 'H4')
+    params = {**params, 'timeframe': timeframe, 'timeframe_smaller': timeframe_smaller, 'htf_timeframe': htf_timeframe}
+
+    symbol = params.get('symbol', 'BTCUSDm')
+    start = pd.Timestamp(params['start_date']) if params.get('start_date') else None
+    end = pd.Timestamp(params['end_date']) + pd.Timedelta(days=1) - pd.Timedelta(seconds=1) if params.get('end_date') else None
+    frames = load_frames(data_source, symbol, [timeframe, timeframe_smaller, htf_timeframe], start, end)
+    missing = [tf for tf in (timeframe, timeframe_smaller, htf_timeframe) if tf not in frames]
+    if missing:
+        log(f"[Sweep] Không tải được dữ liệu khung {', '.join(missing)}.")
+        return pd.DataFrame()
+    # Connector của nguồn dữ liệu cho symbol info
+    connector = data_source.get_connector(symbol, frames, end=end)
+    symbol_info = snapshot_symbol_info(connector.get_symbol_info() if connector else None)
+    # Nến D1/W1 cho PDH/PDL/PWH/PWL, cùng khoảng Backtester._liquidity_levels tải (từ 2 tuần trước nến khung chính đầu tiên)
+    main_index = frames[timeframe].index
+    level_start = main_index[0] - pd.Timedelta(weeks=2) if len(main_index) else start
+    for level_timeframe in ('D1', 'W1'):
+        if level_timeframe not in frames:
+            df = data_source.load(symbol, level_timeframe, level_start, end)
+            if df is not None and not df.empty:
+                frames[level_timeframe] = df
+
+    log(f"[Sweep] {len(runs)} lần chạy, dữ liệu: " + ", ".join(f"{tf}={len(df)}" for tf, df in frames.items()))
+    specs, blocks = share_frames(frames)
+    del frames
+    rows = []
+    try:
+        with ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context('spawn'),
+                                 initializer=_init_worker, initargs=(specs, symbol_info)) as executor:
+            futures = {executor.submit(_run_backtest, params, run): i for i, run in enumerate(runs)}
+            for done, future in enumerate(as_completed(futures), 1):
+                i = futures[future]
+                row = {'run': i}
+                row.update({key: json.dumps(value) if isinstance(value, (list, dict)) else value for key, value in runs[i].items()})
+                try:
+                    row.update(future.result())
+                except Exception as e:
+                    row['error'] = str(e)
+                rows.append(row)
+                log(f"[Sweep] {done}/{len(runs)} xong (lần chạy #{i})")
+    finally:
+        for block in blocks:
+            block.close()
+            block.unlink()
+
+    return rank_results(pd.DataFrame(rows), rank_by)
@@ -1,18 +1,123 @@
 from datetime import datetime, date
+import numpy as np
 import pandas as pd
 from trading_core.connectors import get_connector
-from trading_core.strategy import evaluate_signal
-from trading_core.market_structure import detect_bos_choch, find_swings, get_htf_bias
-from trading_core.pd_arrays import detect_fvg, detect_order_block, detect_breaker_block
+from trading_core.strategy import evaluate_signal, get_fvg_gap_filter, calculate_partial_orders
+from trading_core.incremental_analyzer import IncrementalAnalyzer
+from trading_core.data_source import ConnectorDataSource, HistoricalDataSource
+from trading_core.signal_cache import SIGNAL_COLUMNS, empty_signals, signal_cache, signal_cache_key
 from trading_core.config_loader import TIMEFRAME, TIMEFRAME_SMALLER, TAKE_PROFIT_RR
-from trading_core.time_filter import is_kill_zone_time
+from trading_core.liquidity_levels import LiquidityLevels
+from trading_core.time_filter import kill_zone_mask, silver_bullet_mask
+from trading_core.timeframes import closed_bar_positions, timeframe_delta
+from app.config_manager import config_manager
+
+# Số nến mỗi analyzer giữ lại; khung nhỏ/HTF cần đủ chừng đó nến trước ngày bắt đầu
+MAIN_WINDOW = 201
+SMALL_WINDOW = 100
+HTF_WINDOW = 200
+
+
+# Số phần tử tối đa của một khối (số lệnh x số nến) khi tìm điểm chạm SL/TP hàng loạt
+RESOLVE_BLOCK_ELEMENTS = 4_000_000
+
+
+def resolve_exit_positions(high: np.ndarray, low: np.ndarray, start, is_long, sl, tp) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Tìm cho mọi lệnh cùng lúc nến đầu tiên (từ vị trí start) chạm SL hoặc TP.
+
+    Mỗi vòng xét một khối nến phía trước của mọi lệnh chưa có kết quả (ma trận lệnh x nến),
+    khối tăng gấp đôi sau mỗi vòng nên chi phí tỉ lệ với khoảng cách tới điểm chạm.
+    Cùng một nến chạm cả hai thì coi như SL trước; TP = NaN nghĩa là chỉ có SL.
+    Trả về (vị trí nến thoát, True nếu thoát ở TP); lệnh chưa chạm có vị trí = len(high).
+    """
+    n = len(high)
+    start = np.asarray(start, dtype=np.int64)
+    is_long = np.asarray(is_long, dtype=bool)
+    sl = np.asarray(sl, dtype=np.float64)
+    tp = np.asarray(tp, dtype=np.float64)
+    exit_pos = np.full(len(start), n, dtype=np.int64)
+    is_tp = np.zeros(len(start), dtype=bool)
+
+    offset = start.copy()
+    pending = np.flatnonzero(start < n)
+    size = 16
+    while pending.size:
+        cols = offset[pending, None] + np.arange(size)
+        valid = cols < n
+        np.minimum(cols, n - 1, out=cols)
+        high_block, low_block = high[cols], low[cols]
+        long_rows = is_long[pending, None]
+        sl_col, tp_col = sl[pending, None], tp[pending, None]
+        sl_hit = np.where(long_rows, low_block <= sl_col, high_block >= sl_col) & valid
+        tp_hit = np.where(long_rows, high_block >= tp_col, low_block <= tp_col) & valid
+        hit = sl_hit | tp_hit
+
+        found = hit.any(axis=1)
+        first = hit.argmax(axis=1)[found]
+        rows = pending[found]
+        exit_pos[rows] = offset[rows] + first
+        is_tp[rows] = ~sl_hit[found, first]
+
+        offset[pending] += size
+        pending = pending[~found]
+        pending = pending[offset[pending] < n]
+        if pending.size:
+            size = min(size * 2, max(16, RESOLVE_BLOCK_ELEMENTS // pending.size))
+    return exit_pos, is_tp
+
+
+def resolve_exits(df: pd.DataFrame, entry_times, sides, sl, tp) -> pd.DataFrame:
+    """
+    Kết quả của một loạt lệnh trên nến OHLC `df`: mỗi lệnh bắt đầu được xét từ nến đầu tiên
+    mở cửa tại/sau entry_time, sides là 'LONG'/'SHORT' (hoặc 'long'/'short').
+    Trả về DataFrame (exit_time, exit_price, close_reason) theo thứ tự đầu vào;
+    lệnh chưa chạm SL/TP có exit_time = NaT, exit_price = NaN, close_reason = None.
+    """
+    entry_times = pd.DatetimeIndex(pd.to_datetime(entry_times))
+    is_long = np.char.upper(np.asarray(sides, dtype=str)) == 'LONG'
+    sl = np.asarray(sl, dtype=np.float64)
+    tp = np.asarray(tp, dtype=np.float64)
+    start = df.index.searchsorted(entry_times, side='left')
+    exit_pos, is_tp = resolve_exit_positions(df['high'].to_numpy(dtype=np.float64), df['low'].to_numpy(dtype=np.float64),
+                                             start, is_long, sl, tp)
+
+    closed = exit_pos < len(df)
+    exit_time = pd.Series(pd.NaT, index=range(len(exit_pos)), dtype=df.index.dtype)
+    exit_time[closed] = df.index[exit_pos[closed]]
+    return pd.DataFrame({
+        'exit_time': exit_time.to_numpy(),
+        'exit_price': np.where(closed, np.where(is_tp, tp, sl), np.nan),
+        'close_reason': np.where(closed, np.where(is_tp, 'TP', 'SL'), None),
+    })
+
+
+def rescore_trades(trades: list[dict], df: pd.DataFrame, timeframe: str) -> pd.DataFrame:
+    """
+    Tính lại điểm thoát của danh sách lệnh (định dạng Backtester.trades) trên nến `df`,
+    vd. với khung nhỏ hơn hoặc SL/TP đã chỉnh. Lệnh vào lúc đóng nến `timeframe` mở tại entry_time;
+    pnl tính lại theo quantity của lệnh.
+    """
+    result = pd.DataFrame(trades)
+    if result.empty:
+        return result
+    active_from = pd.to_datetime(result['entry_time']) + timeframe_delta(timeframe)
+    exits = resolve_exits(df, active_from, result['side'], result['sl'], result['tp'])
+    for col in exits.columns:
+        result[col] = exits[col].to_numpy()
+    if 'quantity' in result.columns:
+        direction = np.where(result['side'].str.upper() == 'LONG', 1.0, -1.0)
+        result['pnl'] = (result['exit_price'] - result['entry_price']) * result['quantity'] * direction
+    return result
+
 
 class Backtester:
-    def __init__(self, params: dict, signals=None):
+    def __init__(self, params: dict, signals=None, connector=None, data_source: HistoricalDataSource | None = None):
         self.params = params
         self.signals = signals
         self.symbol = params.get('symbol', 'BTCUSDm')
         self.timeframe = params.get('timeframe', TIMEFRAME)
+        self.timeframe_smaller = params.get('timeframe_smaller', TIMEFRAME_SMALLER)
         
         start_date_param = params.get('start_date')
         end_date_param = params.get('end_date')
@@ -30,84 +135,140 @@ class Backtester:
         self.balance = 10000.0 
         self.initial_balance = self.balance
         self.trades = []
+        self.results = None
+        self.entry_count = 0
         
         self.last_trade_close_time = None
         self.cooldown_period = pd.Timedelta(minutes=30)
         
-        self.connector = get_connector('mt5') 
-        if self.connector:
-             self.connector.connect()
+        # Nguồn dữ liệu: file offline (FileDataSource) hoặc connector dựng sẵn (vd. sweep tham số), mặc định là MT5
+        self.connector = None
+        if data_source is None:
+            connector = connector if connector is not None else get_connector('mt5')
+            if connector:
+                connector.connect()
+                data_source = ConnectorDataSource(connector)
+        self.data_source = data_source
 
     def run(self):
-        if not self.connector:
+        if not self.data_source:
             if self.signals: self.signals.log_message.emit("Không thể kết nối để lấy dữ liệu lịch sử.")
             return
 
         if self.signals: self.signals.log_message.emit(f"Đang tải dữ liệu lịch sử cho {self.symbol}...")
         
         htf_timeframe = self.params.get('htf_timeframe', 'H4')
-        
-        df_main = self.connector.fetch_ohlcv(self.timeframe, limit=50000) 
-        df_small = self.connector.fetch_ohlcv(TIMEFRAME_SMALLER, limit=50000)
-        df_htf = self.connector.fetch_ohlcv(htf_timeframe, limit=50000)
+
+        start_ts = pd.to_datetime(self.start_date).replace(tzinfo=None)
+        end_ts = pd.to_datetime(self.end_date).replace(tzinfo=None) + pd.Timedelta(days=1) - pd.Timedelta(seconds=1)
+
+        # Khung chính dùng MAIN_WINDOW nến đầu của khoảng ngày làm warm-up (vòng lặp bắt đầu từ nến thứ 200)
+        df_main = self.data_source.load(self.symbol, self.timeframe, start_ts, end_ts)
+        df_small = self.data_source.load(self.symbol, self.timeframe_smaller, start_ts, end_ts, warmup=SMALL_WINDOW)
+        df_htf = self.data_source.load(self.symbol, htf_timeframe, start_ts, end_ts, warmup=HTF_WINDOW)
 
         if df_main is None or df_small is None or df_htf is None:
              if self.signals: self.signals.log_message.emit("Không tải được toàn bộ dữ liệu.")
              return
 
-        df_main.index = pd.to_datetime(df_main.index).tz_localize(None)
-        df_small.index = pd.to_datetime(df_small.index).tz_localize(None)
-        df_htf.index = pd.to_datetime(df_htf.index).tz_localize(None)
+        self.connector = self.data_source.get_connector(
+            self.symbol, {self.timeframe: df_main, self.timeframe_smaller: df_small, htf_timeframe: df_htf}, end=end_ts)
 
-        start_ts = pd.to_datetime(self.start_date).replace(tzinfo=None)
-        end_ts = pd.to_datetime(self.end_date).replace(tzinfo=None) + pd.Timedelta(days=1) - pd.Timedelta(seconds=1)
-        
-        df_main = df_main[(df_main.index >= start_ts) & (df_main.index <= end_ts)]
-        
         if len(df_main) < 200:
              if self.signals: self.signals.log_message.emit("Dữ liệu không đủ để chạy backtest.")
              return
 
-        if self.signals: self.signals.log_message.emit(f"Bắt đầu mô phỏng trên {len(df_main)} cây nến...")
+        # Khung dùng để khớp SL/TP bên trong mỗi nến chính (mặc định là khung nhỏ).
+        # Nếu không có dữ liệu hoặc khung này lớn hơn khung chính thì khớp trên chính nến khung chính.
+        exit_timeframe = self.params.get('exit_timeframe', self.timeframe_smaller)
+        df_exit = {self.timeframe: df_main, self.timeframe_smaller: df_small}.get(exit_timeframe)
+        if df_exit is None:
+            df_exit = self.data_source.load(self.symbol, exit_timeframe, start_ts, end_ts)
+        if df_exit is None or df_exit.empty or \
+                timeframe_delta(exit_timeframe, df_exit.index) > timeframe_delta(self.timeframe, df_main.index):
+            exit_timeframe, df_exit = self.timeframe, df_main
+        self._exit_index = df_exit.index
+        self._exit_high = df_exit['high'].to_numpy(dtype=np.float64)
+        self._exit_low = df_exit['low'].to_numpy(dtype=np.float64)
+        # exit_end[i]: số nến khung thoát lệnh đã đóng khi nến chính i đóng
+        exit_end = closed_bar_positions(df_main.index, self.timeframe, df_exit.index, exit_timeframe)
+        max_open_positions = max(1, int(config_manager.get('trading.max_open_positions', 1)))
 
-        open_positions = []
-        
+        candidates = self._load_candidates(df_main, df_small, df_htf, htf_timeframe)
+        if self.signals: self.signals.log_message.emit(f"Mô phỏng lệnh trên {len(candidates)} tín hiệu ứng viên...")
+        self._replay(candidates, df_main, exit_end, max_open_positions)
+        self._report_results()
+
+    def _load_candidates(self, df_main: pd.DataFrame, df_small: pd.DataFrame, df_htf: pd.DataFrame, htf_timeframe: str) -> pd.DataFrame:
+        """Bảng tín hiệu ứng viên của toàn bộ khoảng ngày, lấy từ signal_cache nếu được bật và đã có."""
+        if not bool(config_manager.get('signal_cache.enabled', False)):
+            return self._scan_signals(df_main, df_small, df_htf, htf_timeframe)
+
+        symbol_info = self.connector.get_symbol_info() if self.connector else None
+        key = signal_cache_key([df_main, df_small, df_htf], {
+            'symbol': self.symbol, 'timeframe': self.timeframe, 'timeframe_smaller': self.timeframe_smaller,
+            'htf_timeframe': htf_timeframe, 'point': getattr(symbol_info, 'point', None),
+        })
+        candidates = signal_cache.load(key)
+        if candidates is not None:
+            if self.signals: self.signals.log_message.emit(f"Dùng bảng tín hiệu đã lưu ({len(candidates)} tín hiệu).")
+            return candidates
+        candidates = self._scan_signals(df_main, df_small, df_htf, htf_timeframe)
+        signal_cache.save(key, candidates)
+        return candidates
+
+    def _liquidity_levels(self, df_main: pd.DataFrame, df_small: pd.DataFrame) -> LiquidityLevels:
+        """Mức thanh khoản HTF cho cả khoảng backtest: nến D1/W1 của nguồn dữ liệu nếu có, nếu không thì gộp từ khung nhỏ."""
+        start = df_main.index[0] - pd.Timedelta(weeks=2)
+        daily = self.data_source.load(self.symbol, 'D1', start, df_main.index[-1])
+        weekly = self.data_source.load(self.symbol, 'W1', start, df_main.index[-1])
+        return LiquidityLevels(df_small, daily=daily, weekly=weekly)
+
+    def _scan_signals(self, df_main: pd.DataFrame, df_small: pd.DataFrame, df_htf: pd.DataFrame, htf_timeframe: str) -> pd.DataFrame:
+        """
+        Bước 1: chạy phân tích ICT/Quant trên mọi nến khung chính (không phụ thuộc lệnh đang mở,
+        cooldown hay kill zone), trả về các nến có tín hiệu: (timestamp, side, entry, sl, reason).
+        """
+        if self.signals: self.signals.log_message.emit(f"Tìm tín hiệu trên {len(df_main)} cây nến...")
+
+        # Engine phân tích tăng dần: mỗi vòng lặp chỉ nạp thêm nến mới thay vì
+        # phân tích lại toàn bộ cửa sổ 200 nến của từng khung thời gian.
+        min_gap_points, point_value = get_fvg_gap_filter(self.connector)
+        min_fvg_gap = min_gap_points * point_value
+        main_analyzer = IncrementalAnalyzer(window=MAIN_WINDOW, min_fvg_gap=min_fvg_gap)
+        small_analyzer = IncrementalAnalyzer(window=SMALL_WINDOW, is_ltf=True, min_fvg_gap=min_fvg_gap)
+        htf_analyzer = IncrementalAnalyzer(window=HTF_WINDOW, swing_length=5 if htf_timeframe.upper() == 'D1' else 10, min_fvg_gap=min_fvg_gap)
+        main_analyzer.extend(df_main, 0, 200)
+        # Vị trí kết thúc (không gồm) của các nến khung nhỏ/HTF đã đóng khi mỗi nến khung chính đóng
+        small_end = closed_bar_positions(df_main.index, self.timeframe, df_small.index, self.timeframe_smaller)
+        htf_end = closed_bar_positions(df_main.index, self.timeframe, df_htf.index, htf_timeframe)
+        small_pos = 0
+        htf_pos = 0
+        # Khung Silver Bullet của mọi nến khung nhỏ, tính một lần thay vì đổi múi giờ ở từng nến
+        small_silver_bullet = silver_bullet_mask(df_small.index)[1]
+        # PDH/PDL/PWH/PWL và high/low các phiên tại lúc mỗi nến chính đóng (không gọi connector, không nhìn trước)
+        levels = self._liquidity_levels(df_main, df_small)
+        main_delta = timeframe_delta(self.timeframe, df_main.index)
+
+        try:
+            trading_mode = str(config_manager.get('trading.trading_mode', 'ICT')).upper()
+        except Exception:
+            trading_mode = 'ICT'
+
+        rows = []
         for i in range(200, len(df_main)):
             if self.signals and i % 20 == 0:
                 self.signals.progress.emit(int((i / len(df_main)) * 100))
 
             current_idx = df_main.index[i]
-            
-            # --- Quản lý vị thế ---
-            positions_to_close = [pos for pos in open_positions if self._check_exit_conditions(pos, df_main.iloc[i])[0] is not None]
-            for pos in positions_to_close:
-                exit_price, close_reason = self._check_exit_conditions(pos, df_main.iloc[i])
-                if exit_price and close_reason:
-                    self._close_position(pos, exit_price, close_reason, current_idx)
-            open_positions = [p for p in open_positions if p not in positions_to_close]
-
-            # --- Logic vào lệnh ---
-            if self.last_trade_close_time:
-                current_ts = pd.to_datetime(current_idx).replace(tzinfo=None)
-                if current_ts - self.last_trade_close_time.replace(tzinfo=None) < self.cooldown_period:
-                    continue
-            
-            if open_positions: continue
-            if not is_kill_zone_time(timestamp=current_idx, signals=self.signals): continue
-            
-            try:
-                df_main_slice = df_main.iloc[i-200:i+1]
-                df_small_slice = df_small[df_small.index <= current_idx].tail(100)
-                df_htf_slice = df_htf[df_htf.index <= current_idx].tail(200)
 
-                if len(df_small_slice) < 50 or len(df_htf_slice) < 50 or not isinstance(df_main_slice, pd.DataFrame) or not isinstance(df_small_slice, pd.DataFrame) or not isinstance(df_htf_slice, pd.DataFrame):
-                    continue
+            main_analyzer.extend(df_main, i, i + 1)
+            small_pos = self._feed_analyzer(small_analyzer, df_small, small_pos, int(small_end[i]))
+            htf_pos = self._feed_analyzer(htf_analyzer, df_htf, htf_pos, int(htf_end[i]))
 
-                try:
-                    from app.config_manager import config_manager
-                    trading_mode = str(config_manager.get('trading.trading_mode', 'ICT')).upper()
-                except Exception:
-                    trading_mode = 'ICT'
+            try:
+                if min(len(small_analyzer), 100) < 50 or min(len(htf_analyzer), 200) < 50:
+                    continue
 
                 if trading_mode == 'QUANT':
                     from trading_core.quant_strategy import calculate_quant_signals
@@ -115,7 +276,7 @@ class Backtester:
                     sma_s = int(config_manager.get('trading.quant_sma_slow', 50))
                     rsi_p = int(config_manager.get('trading.quant_rsi_period', 14))
                     
-                    df_quant = calculate_quant_signals(df_main_slice.copy(), sma_f, sma_s, rsi_p)
+                    df_quant = calculate_quant_signals(df_main.iloc[i-200:i+1].copy(), sma_f, sma_s, rsi_p)
                     latest_sig = df_quant['quant_signal'].iloc[-1]
                     
                     if latest_sig != 0:
@@ -137,59 +298,102 @@ class Backtester:
                         if signal == 'long': sl -= sl_buffer_value
                         else: sl += sl_buffer_value
                         
-                        self._open_position(signal, entry, sl, reason, current_idx, open_positions)
+                        rows.append((current_idx, signal, float(entry), float(sl), reason))
                     continue
 
                 # ICT Mode
-                df_main_analyzed = self._analyze_dataframe(df_main_slice.copy())
-                df_small_analyzed = self._analyze_dataframe(df_small_slice.copy(), is_ltf=True)
-                
-                htf_df_analyzed = self._analyze_dataframe(df_htf_slice.copy())
-                if isinstance(htf_df_analyzed, pd.DataFrame):
-                    htf_bias = get_htf_bias(htf_df_analyzed, htf_label=htf_timeframe)
-                else:
-                    htf_bias = 'neutral'
+                df_main_analyzed = main_analyzer.frame()
+                df_small_analyzed = small_analyzer.frame()
+                df_small_analyzed['silver_bullet'] = small_silver_bullet[small_pos - len(df_small_analyzed):small_pos]
+                htf_bias = htf_analyzer.bias()
 
-                signal, entry, sl, reason = evaluate_signal(df_main_analyzed, df_small_analyzed, htf_bias, self.connector, signals=self.signals)
+                signal, entry, sl, reason = evaluate_signal(df_main_analyzed, df_small_analyzed, htf_bias, self.connector, signals=self.signals,
+                                                            htf_levels=levels.at(current_idx + main_delta),
+                                                            poi_index=main_analyzer.last_poi_index,
+                                                            open_gaps=small_analyzer.last_open_gaps)
 
                 if signal != 'none' and entry is not None and sl is not None:
-                    self._open_position(signal, entry, sl, reason, current_idx, open_positions)
+                    rows.append((current_idx, signal, float(entry), float(sl), reason))
             
             except Exception as e:
                 if self.signals:
                     self.signals.log_message.emit(f"[ERROR] at {current_idx}: {e}")
-        
-        self._report_results()
 
-    def _analyze_dataframe(self, df: pd.DataFrame, is_ltf=False) -> pd.DataFrame:
-        df_fvg = detect_fvg(df.copy())
-        df_swings = find_swings(df_fvg)
-        df_bos = detect_bos_choch(df_swings)
-        if not is_ltf:
-            df_ob = detect_order_block(df_bos)
-            return detect_breaker_block(df_ob)
-        return df_bos
-
-    def _check_exit_conditions(self, pos, candle):
-        if pos['side'] == 'LONG':
-            if candle['low'] <= pos['sl']: return pos['sl'], "SL"
-            if candle['high'] >= pos['tp']: return pos['tp'], "TP"
-        else: # SHORT
-            if candle['high'] >= pos['sl']: return pos['sl'], "SL"
-            if candle['low'] <= pos['tp']: return pos['tp'], "TP"
-        return None, None
-        
-    def _open_position(self, signal, entry, sl, reason, idx, open_positions):
+        if not rows:
+            return empty_signals()
+        candidates = pd.DataFrame.from_records(rows, columns=['timestamp'] + SIGNAL_COLUMNS)
+        return candidates.set_index('timestamp')
+
+    def _replay(self, candidates: pd.DataFrame, df_main: pd.DataFrame, exit_end: np.ndarray, max_open_positions: int) -> None:
+        """
+        Bước 2: mô phỏng lệnh trên bảng tín hiệu — đóng lệnh theo điểm chạm SL/TP đã tìm sẵn,
+        rồi lọc tín hiệu theo cooldown, số lệnh đang mở và kill zone trước khi vào lệnh.
+        """
+        open_positions = []
+        bars = df_main.index.get_indexer(candidates.index)
+        in_kill_zone = kill_zone_mask(candidates.index)[0]
+        for current_idx, bar, kill_zone, signal, entry, sl, reason in zip(candidates.index, bars, in_kill_zone, candidates['side'],
+                                                                          candidates['entry'], candidates['sl'], candidates['reason']):
+            if bar < 0:
+                continue
+            bar_end = int(exit_end[bar])
+            open_positions = self._close_reached(open_positions, bar_end)
+
+            if self.last_trade_close_time:
+                current_ts = pd.to_datetime(current_idx).replace(tzinfo=None)
+                if current_ts - self.last_trade_close_time.replace(tzinfo=None) < self.cooldown_period:
+                    continue
+            
+            if len({pos['entry_id'] for pos in open_positions}) >= max_open_positions: continue
+            if not kill_zone: continue
+
+            self._open_position(signal, entry, sl, reason, current_idx, open_positions, bar_end)
+
+        self._close_reached(open_positions, int(exit_end[-1]))
+
+    def _close_reached(self, open_positions: list[dict], bar_end: int) -> list[dict]:
+        """Đóng (theo thứ tự thời gian) các lệnh có điểm chạm SL/TP trước vị trí bar_end, trả về các lệnh còn mở."""
+        closing = sorted((pos for pos in open_positions if pos['exit_pos'] < bar_end), key=lambda pos: pos['exit_pos'])
+        for pos in closing:
+            self._close_position(pos, pos['exit_price'], pos['close_reason'], self._exit_index[pos['exit_pos']])
+        return [pos for pos in open_positions if pos['exit_pos'] >= bar_end]
+
+    def _feed_analyzer(self, analyzer: IncrementalAnalyzer, df: pd.DataFrame, pos: int, end: int) -> int:
+        """Nạp các nến df.iloc[pos:end] mà analyzer chưa có, trả về vị trí mới."""
+        if end - pos > analyzer.max_bars:
+            # Chỉ cửa sổ cuối ảnh hưởng tới kết quả, bỏ qua phần lịch sử quá xa
+            analyzer.reset()
+            pos = end - analyzer.max_bars
+        analyzer.extend(df, pos, end)
+        return max(pos, end)
+
+    def _open_position(self, signal, entry, sl, reason, idx, open_positions, start_pos):
         sl_dist = abs(entry - sl)
         if sl_dist == 0: return
 
-        tp = entry + (sl_dist * float(TAKE_PROFIT_RR)) if signal == 'long' else entry - (sl_dist * float(TAKE_PROFIT_RR))
         quantity = (self.balance * 0.01) / sl_dist
+        if bool(config_manager.get('trading.partial_profits_enabled', False)):
+            # Mỗi phần chốt lời là một lệnh riêng (cùng SL, TP riêng) như khi chạy live
+            legs = calculate_partial_orders(quantity, entry, sl, signal, self.connector)
+        else:
+            take_profit_rr = float(config_manager.get('trading.take_profit_rr', TAKE_PROFIT_RR))
+            tp = entry + (sl_dist * take_profit_rr) if signal == 'long' else entry - (sl_dist * take_profit_rr)
+            legs = [{'quantity': quantity, 'tp': tp, 'label': 'FULL'}]
 
-        open_positions.append({
-            'entry_time': idx, 'side': signal.upper(), 'entry_price': entry, 
-            'sl': sl, 'tp': tp, 'quantity': quantity, 'reason': reason or 'N/A'
-        })
+        self.entry_count += 1
+        tps = np.array([leg['tp'] for leg in legs], dtype=np.float64)
+        exit_pos, is_tp = resolve_exit_positions(self._exit_high, self._exit_low, np.full(len(legs), start_pos),
+                                                 np.full(len(legs), signal == 'long'), np.full(len(legs), sl), tps)
+        for leg, leg_exit, leg_tp in zip(legs, exit_pos.tolist(), is_tp.tolist()):
+            # Chưa chạm SL/TP: vị trí = số nến, lệnh giữ mở tới hết dữ liệu
+            closed = leg_exit < len(self._exit_index)
+            exit_price = (leg['tp'] if leg_tp else sl) if closed else None
+            close_reason = ("TP" if leg_tp else "SL") if closed else None
+            open_positions.append({
+                'entry_id': self.entry_count, 'entry_time': idx, 'side': signal.upper(), 'entry_price': entry,
+                'sl': sl, 'tp': leg['tp'], 'quantity': leg['quantity'], 'label': leg['label'], 'reason': reason or 'N/A',
+                'exit_pos': leg_exit, 'exit_price': exit_price, 'close_reason': close_reason
+            })
         if self.signals: self.signals.log_message.emit(f"OPEN {signal.upper()} @ {entry:.5f} | Reason: {reason}")
     
     def _close_position(self, pos, exit_price, reason, idx):
@@ -199,7 +403,8 @@ class Backtester:
 
         trade_record = {
             'entry_time': str(pos['entry_time']), 'side': pos['side'], 'entry_price': pos['entry_price'], 
-            'exit_price': exit_price, 'sl': pos['sl'], 'tp': pos['tp'], 'pnl': pnl, 'reason': pos.get('reason', 'N/A')
+            'exit_price': exit_price, 'sl': pos['sl'], 'tp': pos['tp'], 'pnl': pnl, 'reason': pos.get('reason', 'N/A'),
+            'exit_time': str(idx), 'close_reason': reason, 'label': pos.get('label', 'FULL'), 'quantity': pos['quantity']
         }
         self.trades.append(trade_record)
         if self.signals: 
@@ -233,8 +438,9 @@ class Backtester:
             'profit_factor': profit_factor, 'max_drawdown': max_dd,
             'total_trades': len(self.trades)
         }
+        self.results = results
         
         if self.signals: self.signals.finished.emit(results)
         
-        if self.connector:
-            self.connector.disconnect()
+        if self.data_source:
+            self.data_source.close()
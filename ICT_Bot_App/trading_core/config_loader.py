@@ -40,6 +40,8 @@ ENABLE_LOGGING = False # Tắt log để tăng tốc độ backtest
 
 # --- Cấu hình Chiến lược Nâng cao ---
 SL_BUFFER_POINTS = _safe_float(config_manager.get('trading.sl_buffer_points', 50.0), 50.0) # Đơn vị: points
+MIN_FVG_GAP_POINTS = _safe_float(config_manager.get('trading.min_fvg_gap_points', 0.0), 0.0) # FVG nhỏ hơn bị bỏ qua, 0 = giữ tất cả
+FVG_SKIP_FILLED = config_manager.get('trading.fvg_skip_filled', True) # Bỏ qua FVG đã bị lấp hoàn toàn khi tìm POI/điểm vào lệnh
 
 # --- Cấu hình OTE (Optimal Trade Entry) ---
 OTE_ENABLED = config_manager.get('trading.ote_enabled', True)  # Bật/tắt OTE filter
@@ -52,6 +54,7 @@ PARTIAL_TP1_RR = _safe_float(config_manager.get('trading.partial_tp1_rr', 1.0),
 PARTIAL_TP2_PERCENT = _safe_float(config_manager.get('trading.partial_tp2_percent', 25.0), 25.0)  # % đóng tại TP2
 PARTIAL_TP2_RR = _safe_float(config_manager.get('trading.partial_tp2_rr', 2.0), 2.0)  # R:R cho TP2
 PARTIAL_TP3_RR = _safe_float(config_manager.get('trading.partial_tp3_rr', 3.0), 3.0)  # R:R cho TP3 (25% còn lại)
+MAX_OPEN_POSITIONS = int(_safe_float(config_manager.get('trading.max_open_positions', 1), 1))  # Số lệnh (entry) mở cùng lúc tối đa trong backtest
 
 # --- Cấu hình Nền tảng ---
 PLATFORM = str(config_manager.get('platform', 'mt5'))
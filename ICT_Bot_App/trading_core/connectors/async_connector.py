@@ -0,0 +1,227 @@
+import asyncio
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
+
+from .base_connector import BaseConnector
+
+
+class AsyncBaseConnector(ABC):
+    """Phiên bản asyncio của BaseConnector: các lệnh gọi tới sàn là coroutine nên có thể chạy đồng thời."""
+
+    @abstractmethod
+    async def connect(self) -> bool:
+        pass
+
+    @abstractmethod
+    async def disconnect(self) -> None:
+        pass
+
+    @abstractmethod
+    def get_symbol(self) -> str:
+        pass
+
+    @abstractmethod
+    async def get_account_balance(self) -> float | None:
+        pass
+
+    @abstractmethod
+    async def get_symbol_info(self) -> object | None:
+        pass
+
+    @abstractmethod
+    async def fetch_ohlcv(self, timeframe: str, limit: int) -> pd.DataFrame | None:
+        pass
+
+    @abstractmethod
+    async def place_order(self, order_type: str, quantity: float, sl_price: float, tp_price: float, comment: str = "") -> str | int | None:
+        pass
+
+    @abstractmethod
+    async def get_open_positions(self) -> list | None:
+        pass
+
+
+class ThreadedAsyncConnector(AsyncBaseConnector):
+    """
+    Bọc một connector đồng bộ (MT5, mock): mỗi lệnh gọi chạy trên thread pool riêng,
+    nên nhiều lệnh gọi có thể chờ sàn cùng lúc mà không chặn event loop.
+    """
+
+    def __init__(self, connector: BaseConnector, max_workers: int = 8):
+        self.connector = connector
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='async-connector')
+
+    async def _call(self, func, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, lambda: func(*args, **kwargs))
+
+    async def connect(self) -> bool:
+        return await self._call(self.connector.connect)
+
+    async def disconnect(self) -> None:
+        await self._call(self.connector.disconnect)
+        self.close()
+
+    def close(self) -> None:
+        """Giải phóng thread pool nhưng giữ kết nối của connector được bọc (khi connector đó còn được dùng ở nơi khác)."""
+        self._executor.shutdown(wait=False)
+
+    def get_symbol(self) -> str:
+        return self.connector.get_symbol()
+
+    async def get_account_balance(self) -> float | None:
+        return await self._call(self.connector.get_account_balance)
+
+    async def get_symbol_info(self) -> object | None:
+        return await self._call(self.connector.get_symbol_info)
+
+    async def fetch_ohlcv(self, timeframe: str, limit: int) -> pd.DataFrame | None:
+        return await self._call(self.connector.fetch_ohlcv, timeframe, limit)
+
+    async def place_order(self, order_type: str, quantity: float, sl_price: float, tp_price: float, comment: str = "") -> str | int | None:
+        return await self._call(self.connector.place_order, order_type, quantity, sl_price, tp_price, comment=comment)
+
+    async def get_open_positions(self) -> list | None:
+        return await self._call(self.connector.get_open_positions)
+
+
+class AsyncMT5Connector(ThreadedAsyncConnector):
+    """MetaTrader5 chỉ có API đồng bộ: dùng MT5Connector trên thread pool."""
+
+    def __init__(self, signals=None, connector: BaseConnector | None = None, max_workers: int = 8):
+        if connector is None:
+            from .mt5_connector import MT5Connector
+            connector = MT5Connector(signals=signals)
+        super().__init__(connector, max_workers=max_workers)
+
+
+class AsyncBinanceConnector(AsyncBaseConnector):
+    """Binance Futures qua ccxt.async_support (một phiên HTTP dùng chung cho các request đồng thời)."""
+
+    def __init__(self, signals=None):
+        import ccxt.async_support as ccxt_async  # type: ignore
+        from ..config_loader import BINANCE_API_KEY, BINANCE_SECRET_KEY, BINANCE_SYMBOL
+
+        self.exchange = ccxt_async.binance({
+            'apiKey': BINANCE_API_KEY,
+            'secret': BINANCE_SECRET_KEY,
+            'options': {'defaultType': 'future'},
+            'enableRateLimit': True,
+        })
+        self.symbol = BINANCE_SYMBOL
+        self.signals = signals
+
+    def log(self, message: str) -> None:
+        """Gửi log thông qua signal nếu có, nếu không thì print."""
+        if self.signals:
+            self.signals.log_message.emit(message)
+        else:
+            print(message)
+
+    async def connect(self) -> bool:
+        self.log("Đang kết nối tới Binance (async)...")
+        try:
+            await self.exchange.load_markets()
+            self.log("Kết nối Binance thành công.")
+            return True
+        except Exception as e:
+            self.log(f"Kết nối Binance thất bại: {e}")
+            return False
+
+    async def disconnect(self) -> None:
+        self.log("Ngắt kết nối Binance.")
+        await self.exchange.close()
+
+    def get_symbol(self) -> str:
+        return str(self.symbol)
+
+    async def get_account_balance(self) -> float | None:
+        try:
+            balance_data = await self.exchange.fetch_balance()
+            usdt_balance = balance_data.get('total', {}).get('USDT')
+            if usdt_balance is None:
+                self.log("[Binance] Không tìm thấy số dư USDT.")
+                return None
+            if self.signals:
+                self.signals.account_summary.emit({'balance': float(usdt_balance), 'pnl': 0.0})
+            return float(usdt_balance)
+        except Exception as e:
+            self.log(f"[Binance] Lỗi khi lấy số dư tài khoản: {e}")
+            return None
+
+    async def get_symbol_info(self) -> object | None:
+        from .binance_connector import BinanceConnector
+        try:
+            # Thông tin thị trường đã được tải trong connect(), không cần request
+            market = self.exchange.market(self.symbol)
+            if market is None:
+                self.log(f"[Binance] Không tìm thấy thông tin thị trường cho symbol: {self.symbol}")
+                return None
+            return BinanceConnector.BinanceSymbolInfo(market)
+        except Exception as e:
+            self.log(f"[Binance] Lỗi khi lấy thông tin symbol: {e}")
+            return None
+
+    async def fetch_ohlcv(self, timeframe: str, limit: int) -> pd.DataFrame | None:
+        from .binance_connector import ohlcv_frame
+        try:
+            return ohlcv_frame(await self.exchange.fetch_ohlcv(self.symbol, timeframe, limit=limit))
+        except Exception as e:
+            self.log(f"[Binance] Lỗi khi lấy dữ liệu OHLCV: {e}")
+            return None
+
+    async def place_order(self, order_type: str, quantity: float, sl_price: float, tp_price: float, comment: str = "") -> str | int | None:
+        try:
+            side = 'buy' if order_type == 'long' else 'sell'
+            market_order = await self.exchange.create_market_order(self.symbol, side, quantity)
+            order_id = market_order.get('id')
+            self.log(f"[Binance] Đã đặt lệnh market {side} {quantity} {self.symbol}. ID: {order_id}")
+            if order_id:
+                # SL và TP độc lập với nhau nên gửi đồng thời
+                await asyncio.gather(
+                    self.exchange.create_order(self.symbol, 'STOP_MARKET', side, quantity, price=None,
+                                               params={'stopPrice': sl_price, 'reduceOnly': True, 'closePosition': True}),
+                    self.exchange.create_order(self.symbol, 'TAKE_PROFIT_MARKET', side, quantity, price=None,
+                                               params={'stopPrice': tp_price, 'reduceOnly': True, 'closePosition': True}),
+                )
+                self.log(f"[Binance] Đã đặt SL tại {sl_price}, TP tại {tp_price}.")
+
+            if self.signals:
+                self.signals.new_position.emit({
+                    'id': str(order_id),
+                    'symbol': self.symbol,
+                    'side': order_type.upper(),
+                    'quantity': quantity,
+                    'entry_price': market_order.get('price', 0),
+                    'sl': sl_price,
+                    'tp': tp_price,
+                    'reason': comment or 'N/A',
+                    'status': 'OPEN'
+                })
+            return order_id
+        except Exception as e:
+            self.log(f"[Binance] Lỗi khi đặt lệnh: {e}")
+            return None
+
+    async def get_open_positions(self) -> list | None:
+        try:
+            positions = await self.exchange.fetch_positions([self.symbol])
+            return [p for p in positions if float(p.get('contracts', 0) or 0) != 0]
+        except Exception as e:
+            self.log(f"[Binance] Lỗi khi kiểm tra vị thế: {e}")
+            return None
+
+
+def get_async_connector(platform_name: str, signals=None, connector: BaseConnector | None = None) -> AsyncBaseConnector | None:
+    """
+    Connector async theo nền tảng. Với MT5 có thể truyền connector đồng bộ đã kết nối để dùng lại phiên;
+    connector đồng bộ của nền tảng khác (mock) được bọc bằng ThreadedAsyncConnector.
+    """
+    if platform_name == 'binance':
+        return AsyncBinanceConnector(signals=signals)
+    if platform_name == 'mt5':
+        return AsyncMT5Connector(signals=signals, connector=connector)
+    if connector is not None:
+        return ThreadedAsyncConnector(connector)
+    return None
@@ -33,6 +33,20 @@ class BaseConnector(ABC):
         """Lấy dữ liệu OHLCV (Open, High, Low, Close, Volume) của symbol."""
         pass
 
+    def fetch_ohlcv_since(self, timeframe: str, since: pd.Timestamp, limit: int) -> pd.DataFrame | None:
+        """
+        Lấy tối đa `limit` nến có timestamp >= since (dùng cho kho nến cục bộ).
+        Mặc định lọc từ fetch_ohlcv; connector có API lấy theo thời gian nên ghi đè để chỉ tải phần đuôi.
+        Bản mặc định chỉ thấy `limit` nến cuối: nếu `since` cũ hơn thế, các nến giữa `since` và nến đầu
+        tiên trả về bị thiếu, kết quả được đánh dấu df.attrs['incomplete'] = True.
+        """
+        df = self.fetch_ohlcv(timeframe, limit)
+        if df is None:
+            return None
+        result = df[df.index >= since].iloc[:limit]
+        result.attrs['incomplete'] = bool(len(df)) and df.index[0] > since
+        return result
+
     @abstractmethod
     def place_order(self, order_type: str, quantity: float, sl_price: float, tp_price: float, comment: str = "") -> str | int | None:
         """Đặt một lệnh giao dịch."""
@@ -3,6 +3,13 @@ import pandas as pd
 from .base_connector import BaseConnector
 from ..config_loader import BINANCE_API_KEY, BINANCE_SECRET_KEY, BINANCE_SYMBOL
 
+def ohlcv_frame(ohlcv: list) -> pd.DataFrame:
+    """Chuyển kết quả fetch_ohlcv của ccxt ([ms, o, h, l, c, v], ...) sang DataFrame có index timestamp."""
+    df = pd.DataFrame(ohlcv, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
+    df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
+    df.set_index('timestamp', inplace=True) # Đặt timestamp làm index
+    return df[['open', 'high', 'low', 'close', 'volume']]
+
 class BinanceConnector(BaseConnector):
     def __init__(self, signals=None):
         self.exchange = ccxt.binance({
@@ -86,10 +93,16 @@ class BinanceConnector(BaseConnector):
     def fetch_ohlcv(self, timeframe: str, limit: int) -> pd.DataFrame | None:
         try:
             ohlcv = self.exchange.fetch_ohlcv(self.symbol, timeframe, limit=limit)
-            df = pd.DataFrame(ohlcv, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
-            df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
-            df.set_index('timestamp', inplace=True) # Đặt timestamp làm index
-            return df[['open', 'high', 'low', 'close', 'volume']]
+            return ohlcv_frame(ohlcv)
+        except Exception as e:
+            self.log(f"[Binance] Lỗi khi lấy dữ liệu OHLCV: {e}")
+            return None
+
+    def fetch_ohlcv_since(self, timeframe: str, since: pd.Timestamp, limit: int) -> pd.DataFrame | None:
+        try:
+            since_ms = int(pd.Timestamp(since).value // 10**6)
+            ohlcv = self.exchange.fetch_ohlcv(self.symbol, timeframe, since=since_ms, limit=limit)
+            return ohlcv_frame(ohlcv)
         except Exception as e:
             self.log(f"[Binance] Lỗi khi lấy dữ liệu OHLCV: {e}")
             return None
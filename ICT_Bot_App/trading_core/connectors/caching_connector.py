@@ -0,0 +1,150 @@
+import copy
+import threading
+import time
+from collections import Counter
+from typing import Any, Callable
+import pandas as pd
+
+from app.config_manager import config_manager
+from .base_connector import BaseConnector
+
+# Thời gian sống mặc định (giây) của từng loại dữ liệu: symbol info gần như không đổi trong phiên,
+# số dư/vị thế chỉ dùng lại trong một chu kỳ (begin_cycle() xóa sớm hơn nếu chu kỳ mới bắt đầu)
+DEFAULT_TTLS = {
+    'get_symbol_info': 4 * 3600.0,
+    'get_account_balance': 60.0,
+    'get_open_positions': 60.0,
+}
+# Các mục chỉ có giá trị trong một chu kỳ và có thể đổi sau khi đặt lệnh
+CYCLE_METHODS = ('get_account_balance', 'get_open_positions')
+
+
+class CachingConnector(BaseConnector):
+    """
+    Bọc một connector và ghi nhớ các lệnh gọi metadata (symbol info, số dư, vị thế) theo TTL riêng từng loại.
+
+    Trong một chu kỳ execute_strategy, get_symbol_info được gọi từ evaluate_signal, calculate_position_size,
+    calculate_partial_orders...; qua lớp này chỉ lần đầu đi tới sàn. Số dư và vị thế bị xóa khi
+    begin_cycle() hoặc sau place_order; kết quả None (lỗi/mất kết nối) không được cache.
+    Đếm số round trip thật tới sàn và số lần dùng cache, theo chu kỳ hiện tại và cộng dồn.
+    """
+
+    def __init__(self, connector: BaseConnector, ttls: dict[str, float] | None = None):
+        self.connector = connector
+        self.ttls = {**DEFAULT_TTLS, **(ttls or {})}
+        self._entries: dict[str, tuple[float, Any]] = {}
+        self._lock = threading.Lock()
+        self.round_trips: Counter = Counter()
+        self.hits: Counter = Counter()
+        self.cycle_round_trips: Counter = Counter()
+        self.cycle_hits: Counter = Counter()
+
+    def __copy__(self) -> 'CachingConnector':
+        # Bản sao (scanner sao chép connector cho từng symbol) dùng bản sao connector bên trong và cache riêng
+        return CachingConnector(copy.copy(self.connector), self.ttls)
+
+    def _remote(self, method: str, func: Callable[[], Any]) -> Any:
+        with self._lock:
+            self.round_trips[method] += 1
+            self.cycle_round_trips[method] += 1
+        return func()
+
+    def _cached(self, method: str, func: Callable[[], Any]) -> Any:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(method)
+            if entry is not None and now - entry[0] < self.ttls.get(method, 0.0):
+                self.hits[method] += 1
+                self.cycle_hits[method] += 1
+                return entry[1]
+        value = self._remote(method, func)
+        if value is not None:
+            with self._lock:
+                self._entries[method] = (now, value)
+        return value
+
+    def invalidate(self, *methods: str) -> None:
+        """Xóa các mục đã cache của các phương thức (không truyền = xóa hết)."""
+        with self._lock:
+            for method in methods or list(self._entries):
+                self._entries.pop(method, None)
+
+    def begin_cycle(self) -> None:
+        """Bắt đầu chu kỳ mới: bỏ số dư/vị thế của chu kỳ trước và đặt lại bộ đếm của chu kỳ."""
+        self.invalidate(*CYCLE_METHODS)
+        with self._lock:
+            self.cycle_round_trips.clear()
+            self.cycle_hits.clear()
+
+    @property
+    def symbol(self) -> str:
+        return self.connector.symbol
+
+    @symbol.setter
+    def symbol(self, value: str) -> None:
+        # Đổi symbol (vd. scanner sao chép connector cho từng cặp) thì dữ liệu cũ không còn đúng
+        self.connector.symbol = value
+        self.invalidate()
+
+    def connect(self) -> bool:
+        self.invalidate()
+        return self.connector.connect()
+
+    def disconnect(self) -> None:
+        self.invalidate()
+        self.connector.disconnect()
+
+    def get_symbol(self) -> str:
+        return self.connector.get_symbol()
+
+    def get_account_balance(self) -> float | None:
+        return self._cached('get_account_balance', self.connector.get_account_balance)
+
+    def get_symbol_info(self) -> object | None:
+        return self._cached('get_symbol_info', self.connector.get_symbol_info)
+
+    def get_open_positions(self) -> list | None:
+        return self._cached('get_open_positions', self.connector.get_open_positions)
+
+    def fetch_ohlcv(self, timeframe: str, limit: int) -> pd.DataFrame | None:
+        return self._remote('fetch_ohlcv', lambda: self.connector.fetch_ohlcv(timeframe, limit))
+
+    def fetch_ohlcv_since(self, timeframe: str, since: pd.Timestamp, limit: int) -> pd.DataFrame | None:
+        return self._remote('fetch_ohlcv', lambda: self.connector.fetch_ohlcv_since(timeframe, since, limit))
+
+    def place_order(self, order_type: str, quantity: float, sl_price: float, tp_price: float, comment: str = "") -> str | int | None:
+        try:
+            return self._remote('place_order', lambda: self.connector.place_order(order_type, quantity, sl_price, tp_price, comment=comment))
+        finally:
+            # Lệnh mới (kể cả khi lỗi giữa chừng) làm số dư/vị thế đã cache không còn đúng
+            self.invalidate(*CYCLE_METHODS)
+
+    def get_all_tradable_symbols(self) -> list[str]:
+        return self._remote('get_all_tradable_symbols', self.connector.get_all_tradable_symbols)
+
+    def stats_message(self) -> str:
+        """Dòng log số round trip tới sàn và số lần dùng cache của chu kỳ hiện tại (kèm tổng cộng dồn)."""
+        with self._lock:
+            cycle_trips = sum(self.cycle_round_trips.values())
+            details = ", ".join(f"{method} {count}" for method, count in sorted(self.cycle_round_trips.items()))
+            cycle_hits = sum(self.cycle_hits.values())
+            total_trips, total_hits = sum(self.round_trips.values()), sum(self.hits.values())
+        return (f"[Cache] Connector: {cycle_trips} round trip ({details or 'không có'}), {cycle_hits} lần dùng cache "
+                f"| cộng dồn {total_trips} round trip / {total_hits} hit")
+
+
+def cached_connector(connector: BaseConnector) -> BaseConnector:
+    """Bọc connector bằng CachingConnector nếu 'connector_cache.enabled' (TTL lấy từ connector_cache.*_ttl_seconds)."""
+    if isinstance(connector, CachingConnector) or not bool(config_manager.get('connector_cache.enabled', True)):
+        return connector
+    ttls = {}
+    for method, key in (('get_symbol_info', 'symbol_info_ttl_seconds'),
+                        ('get_account_balance', 'balance_ttl_seconds'),
+                        ('get_open_positions', 'positions_ttl_seconds')):
+        value = config_manager.get(f'connector_cache.{key}', None)
+        if value is not None:
+            try:
+                ttls[method] = float(value)
+            except (ValueError, TypeError):
+                pass
+    return CachingConnector(connector, ttls)
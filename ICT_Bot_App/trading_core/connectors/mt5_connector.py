@@ -2,7 +2,7 @@ import MetaTrader5 as mt5 # type: ignore
 import pandas as pd
 import pytz
 import os # Thêm import os
-from datetime import datetime
+from datetime import datetime, timedelta
 from .base_connector import BaseConnector
 from ..config_loader import MT5_LOGIN, MT5_PASSWORD, MT5_SERVER, MT5_PATH, MT5_SYMBOL
 
@@ -62,26 +62,45 @@ class MT5Connector(BaseConnector):
             return None
         return s_info # MetaTrader5.symbol_info trả về một object có các thuộc tính cần thiết
 
+    tf_map = {
+        'M1': mt5.TIMEFRAME_M1, 'M5': mt5.TIMEFRAME_M5, 'M15': mt5.TIMEFRAME_M15,
+        'H1': mt5.TIMEFRAME_H1, 'H4': mt5.TIMEFRAME_H4, 'D1': mt5.TIMEFRAME_D1,
+        'W1': mt5.TIMEFRAME_W1,
+        # Add old keys for compatibility if needed, but new UI uses the above
+        '1m': mt5.TIMEFRAME_M1, '5m': mt5.TIMEFRAME_M5, '15m': mt5.TIMEFRAME_M15,
+        '1h': mt5.TIMEFRAME_H1, '4h': mt5.TIMEFRAME_H4, '1d': mt5.TIMEFRAME_D1,
+    }
+
+    def _rates_to_df(self, rates) -> pd.DataFrame | None:
+        if rates is None:
+            self.log(f"[MT5] Không lấy được dữ liệu cho {self.symbol}. Lỗi: {mt5.last_error()}")
+            return None
+
+        df = pd.DataFrame(rates)
+        if df.empty:
+            return pd.DataFrame(columns=['open', 'high', 'low', 'close', 'volume'], index=pd.DatetimeIndex([], name='timestamp'))
+        df['timestamp'] = pd.to_datetime(df['time'], unit='s')
+        df.set_index('timestamp', inplace=True) # Đặt timestamp làm index
+        df.rename(columns={'tick_volume': 'volume'}, inplace=True)
+        return df[['open', 'high', 'low', 'close', 'volume']]
+
     def fetch_ohlcv(self, timeframe: str, limit: int) -> pd.DataFrame | None:
         try:
-            tf_map = {
-                'M1': mt5.TIMEFRAME_M1, 'M5': mt5.TIMEFRAME_M5, 'M15': mt5.TIMEFRAME_M15,
-                'H1': mt5.TIMEFRAME_H1, 'H4': mt5.TIMEFRAME_H4, 'D1': mt5.TIMEFRAME_D1,
-                'W1': mt5.TIMEFRAME_W1,
-                # Add old keys for compatibility if needed, but new UI uses the above
-                '1m': mt5.TIMEFRAME_M1, '5m': mt5.TIMEFRAME_M5, '15m': mt5.TIMEFRAME_M15,
-                '1h': mt5.TIMEFRAME_H1, '4h': mt5.TIMEFRAME_H4, '1d': mt5.TIMEFRAME_D1,
-            }
-            rates = mt5.copy_rates_from_pos(self.symbol, tf_map[timeframe], 0, limit)
-            if rates is None:
-                self.log(f"[MT5] Không lấy được dữ liệu cho {self.symbol}. Lỗi: {mt5.last_error()}")
-                return None
-            
-            df = pd.DataFrame(rates)
-            df['timestamp'] = pd.to_datetime(df['time'], unit='s')
-            df.set_index('timestamp', inplace=True) # Đặt timestamp làm index
-            df.rename(columns={'tick_volume': 'volume'}, inplace=True)
-            return df[['open', 'high', 'low', 'close', 'volume']]
+            rates = mt5.copy_rates_from_pos(self.symbol, self.tf_map[timeframe], 0, limit)
+            return self._rates_to_df(rates)
+        except Exception as e:
+            self.log(f"[MT5] Lỗi khi lấy dữ liệu OHLCV: {e}")
+            return None
+
+    def fetch_ohlcv_since(self, timeframe: str, since: pd.Timestamp, limit: int) -> pd.DataFrame | None:
+        try:
+            # Thời gian nến MT5 là giờ server tính như UTC; date_to lùi về tương lai để
+            # không bỏ sót nến cuối khi giờ server đi trước UTC.
+            date_from = self.timezone.localize(pd.Timestamp(since).to_pydatetime())
+            date_to = datetime.now(self.timezone) + timedelta(days=1)
+            rates = mt5.copy_rates_range(self.symbol, self.tf_map[timeframe], date_from, date_to)
+            df = self._rates_to_df(rates)
+            return None if df is None else df.iloc[:limit]
         except Exception as e:
             self.log(f"[MT5] Lỗi khi lấy dữ liệu OHLCV: {e}")
             return None
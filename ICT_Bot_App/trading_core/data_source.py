@@ -0,0 +1,205 @@
+import os
+from abc import ABC, abstractmethod
+from types import SimpleNamespace
+import numpy as np
+import pandas as pd
+
+from .connectors.base_connector import BaseConnector
+from .ohlcv_store import OHLCV_COLUMNS, OHLCVStore, load_ohlcv
+
+# Số nến tối đa lấy qua connector cho một lần backtest
+CONNECTOR_HISTORY_LIMIT = 50000
+CSV_CHUNK_SIZE = 100_000
+
+
+def _naive_index(df: pd.DataFrame) -> pd.DataFrame:
+    df.index = pd.to_datetime(df.index).tz_localize(None)
+    df.index.name = 'timestamp'
+    return df
+
+
+def slice_range(df: pd.DataFrame, start=None, end=None, warmup: int = 0) -> pd.DataFrame:
+    """Các nến trong [start, end] cộng thêm `warmup` nến ngay trước start (index đã sắp xếp)."""
+    index = df.index
+    lo = int(index.searchsorted(pd.Timestamp(start), side='left')) if start is not None else 0
+    hi = int(index.searchsorted(pd.Timestamp(end), side='right')) if end is not None else len(df)
+    return df.iloc[max(0, lo - warmup):hi]
+
+
+class FrameConnector(BaseConnector):
+    """Connector chỉ đọc trên các DataFrame đã tải sẵn (backtest offline, sweep tham số)."""
+
+    def __init__(self, symbol: str, frames: dict[str, pd.DataFrame], symbol_info: object | None):
+        self.symbol = symbol
+        self.frames = frames
+        self.symbol_info = symbol_info
+
+    def connect(self) -> bool:
+        return True
+
+    def disconnect(self) -> None:
+        pass
+
+    def get_symbol(self) -> str:
+        return self.symbol
+
+    def get_account_balance(self) -> float | None:
+        return None
+
+    def get_symbol_info(self) -> object | None:
+        return self.symbol_info
+
+    def fetch_ohlcv(self, timeframe: str, limit: int) -> pd.DataFrame | None:
+        df = self.frames.get(timeframe)
+        return None if df is None else df.iloc[-limit:].copy()
+
+    def place_order(self, order_type: str, quantity: float, sl_price: float, tp_price: float, comment: str = "") -> str | int | None:
+        return None
+
+    def get_open_positions(self) -> list | None:
+        return []
+
+    def get_all_tradable_symbols(self) -> list[str]:
+        return [self.symbol]
+
+
+class HistoricalDataSource(ABC):
+    """Nguồn dữ liệu lịch sử cho Backtester."""
+
+    @abstractmethod
+    def load(self, symbol: str, timeframe: str, start=None, end=None, warmup: int = 0) -> pd.DataFrame | None:
+        """
+        Các nến OHLCV trong [start, end] cộng `warmup` nến trước start,
+        cùng định dạng với `connector.fetch_ohlcv` (index 'timestamp' không có múi giờ).
+        """
+        pass
+
+    @abstractmethod
+    def get_connector(self, symbol: str, frames: dict[str, pd.DataFrame], end=None) -> BaseConnector | None:
+        """Connector mà chiến lược dùng trong lúc backtest (symbol info, nến D1/W1)."""
+        pass
+
+    def close(self) -> None:
+        """Giải phóng tài nguyên sau khi backtest xong."""
+        pass
+
+
+class ConnectorDataSource(HistoricalDataSource):
+    """Lấy lịch sử qua connector (MT5/Binance), qua kho nến cục bộ nếu được bật."""
+
+    def __init__(self, connector: BaseConnector):
+        self.connector = connector
+
+    def load(self, symbol: str, timeframe: str, start=None, end=None, warmup: int = 0) -> pd.DataFrame | None:
+        df = load_ohlcv(self.connector, timeframe, limit=CONNECTOR_HISTORY_LIMIT)
+        if df is None:
+            return None
+        return slice_range(_naive_index(df), start, end, warmup)
+
+    def get_connector(self, symbol: str, frames: dict[str, pd.DataFrame], end=None) -> BaseConnector | None:
+        return self.connector
+
+    def close(self) -> None:
+        self.connector.disconnect()
+
+
+class FrameDataSource(HistoricalDataSource):
+    """Dữ liệu đã nằm sẵn trong bộ nhớ (timeframe -> DataFrame), vd. trong tiến trình con của sweep."""
+
+    def __init__(self, frames: dict[str, pd.DataFrame], symbol_info: object | None = None):
+        self.frames = frames
+        self.symbol_info = symbol_info
+
+    def load(self, symbol: str, timeframe: str, start=None, end=None, warmup: int = 0) -> pd.DataFrame | None:
+        df = self.frames.get(timeframe)
+        return None if df is None else slice_range(df, start, end, warmup)
+
+    def get_connector(self, symbol: str, frames: dict[str, pd.DataFrame], end=None) -> BaseConnector | None:
+        return FrameConnector(symbol, {**self.frames, **frames}, self.symbol_info)
+
+
+class FileDataSource(HistoricalDataSource):
+    """
+    Thư mục file dữ liệu theo symbol/timeframe, đặt tên giống kho nến (vd. 'BTCUSDm_M5.parquet'):
+    '.ohlcv' (kho nến), '.parquet' hoặc '.csv' (cột 'timestamp' + OHLCV, sắp xếp theo thời gian).
+
+    Không đọc gì khi khởi tạo; mỗi lần load chỉ đọc các cột OHLCV và phần dữ liệu trong
+    khoảng thời gian cần (parquet: lọc theo timestamp, csv: đọc từng đoạn và dừng sau `end`).
+    """
+
+    def __init__(self, directory: str, symbol_info: dict | None = None):
+        self.directory = directory
+        self._store = OHLCVStore(directory)
+        self.symbol_info = SimpleNamespace(**symbol_info) if symbol_info else None
+
+    def _path(self, symbol: str, timeframe: str) -> str | None:
+        base = os.path.splitext(self._store.path(symbol, timeframe))[0]
+        for ext in ('.ohlcv', '.parquet', '.csv'):
+            if os.path.exists(base + ext):
+                return base + ext
+        return None
+
+    def load(self, symbol: str, timeframe: str, start=None, end=None, warmup: int = 0) -> pd.DataFrame | None:
+        path = self._path(symbol, timeframe)
+        if path is None:
+            return None
+        if path.endswith('.ohlcv'):
+            return self._store.load(symbol, timeframe, start=start, end=end, warmup=warmup)
+        if path.endswith('.parquet'):
+            return self._read_parquet(path, start, end, warmup)
+        return self._read_csv(path, start, end, warmup)
+
+    def _read_parquet(self, path: str, start, end, warmup: int) -> pd.DataFrame:
+        import pyarrow.parquet as pq  # type: ignore  # chỉ cần khi dùng file parquet
+
+        filters = []
+        if start is not None:
+            start = pd.Timestamp(start)
+            if warmup:
+                # Đọc riêng cột timestamp để biết thời điểm của nến warm-up đầu tiên
+                stamps = pq.read_table(path, columns=['timestamp']).column('timestamp').to_numpy()
+                lo = int(np.searchsorted(stamps, start.to_datetime64(), side='left'))
+                start = pd.Timestamp(stamps[max(0, lo - warmup)]) if len(stamps) else start
+            filters.append(('timestamp', '>=', start))
+        if end is not None:
+            filters.append(('timestamp', '<=', pd.Timestamp(end)))
+
+        schema_names = pq.read_schema(path).names
+        columns = ['timestamp'] + [col for col in OHLCV_COLUMNS if col in schema_names]
+        df = pq.read_table(path, columns=columns, filters=filters or None).to_pandas()
+        if 'timestamp' in df.columns:
+            df = df.set_index('timestamp')
+        return _naive_index(df[[col for col in OHLCV_COLUMNS if col in df.columns]])
+
+    def _read_csv(self, path: str, start, end, warmup: int) -> pd.DataFrame:
+        start = pd.Timestamp(start) if start is not None else None
+        end = pd.Timestamp(end) if end is not None else None
+        warm: pd.DataFrame | None = None
+        parts = []
+        reader = pd.read_csv(path, usecols=lambda col: col == 'timestamp' or col in OHLCV_COLUMNS,
+                             parse_dates=['timestamp'], index_col='timestamp', chunksize=CSV_CHUNK_SIZE)
+        with reader:
+            for chunk in reader:
+                if end is not None and len(chunk) and chunk.index[0] > end:
+                    break
+                if start is not None:
+                    if warmup:
+                        before = chunk[chunk.index < start]
+                        if len(before):
+                            warm = (before if warm is None else pd.concat([warm, before])).iloc[-warmup:]
+                    chunk = chunk[chunk.index >= start]
+                if end is not None:
+                    chunk = chunk[chunk.index <= end]
+                if len(chunk):
+                    parts.append(chunk)
+
+        if warm is not None:
+            parts.insert(0, warm)
+        if not parts:
+            return pd.DataFrame(columns=OHLCV_COLUMNS, index=pd.DatetimeIndex([], name='timestamp'))
+        df = pd.concat(parts)
+        return _naive_index(df[[col for col in OHLCV_COLUMNS if col in df.columns]])
+
+    def get_connector(self, symbol: str, frames: dict[str, pd.DataFrame], end=None) -> BaseConnector | None:
+        # Nến D1/W1 cho PDH/PDL/PWH/PWL được Backtester tải riêng và tra cứu theo từng nến (liquidity_levels)
+        return FrameConnector(symbol, frames, self.symbol_info)
@@ -0,0 +1,159 @@
+from bisect import bisect_left, bisect_right
+import numpy as np
+
+# Số nến sau nến giữa của FVG mới bắt đầu xét lấp gap (nến thứ 3 của bộ 3 nến chỉ chạm mép gap)
+FVG_MITIGATION_DELAY = 2
+
+
+def fvg_fill_ratio(high, low, deepest, bullish: bool):
+    """
+    Tỉ lệ gap [low, high] đã bị lấp khi giá đi sâu nhất tới `deepest` (NaN = chưa có nến nào):
+    0 = chưa chạm, (0, 1) = lấp một phần, 1 = lấp hoàn toàn. Bullish FVG bị lấp từ trên xuống, bearish từ dưới lên.
+    """
+    with np.errstate(invalid='ignore', divide='ignore'):
+        filled = (high - deepest) if bullish else (deepest - low)
+        ratio = np.clip(filled / (high - low), 0.0, 1.0)
+    return np.where(np.isnan(deepest), 0.0, ratio)
+
+
+def fvg_mitigation_arrays(high: np.ndarray, low: np.ndarray, bullish_high: np.ndarray, bullish_low: np.ndarray,
+                          bearish_high: np.ndarray, bearish_low: np.ndarray) -> dict:
+    """
+    Mức lấp gap của mọi FVG trong frame tính tới nến cuối (NaN ở nến không có FVG):
+    'fvg_bullish_mitigation' / 'fvg_bearish_mitigation' theo fvg_fill_ratio. Giá sâu nhất sau gap là
+    min low (max high) trượt từ cuối frame về, bỏ qua NaN, nên cả frame chỉ tốn một lượt.
+    """
+    n = len(high)
+    deepest_low = np.full(n, np.nan)
+    deepest_high = np.full(n, np.nan)
+    if n > FVG_MITIGATION_DELAY:
+        deepest_low[:-FVG_MITIGATION_DELAY] = np.fmin.accumulate(low[::-1])[::-1][FVG_MITIGATION_DELAY:]
+        deepest_high[:-FVG_MITIGATION_DELAY] = np.fmax.accumulate(high[::-1])[::-1][FVG_MITIGATION_DELAY:]
+    bullish = np.where(np.isnan(bullish_high), np.nan, fvg_fill_ratio(bullish_high, bullish_low, deepest_low, True))
+    bearish = np.where(np.isnan(bearish_high), np.nan, fvg_fill_ratio(bearish_high, bearish_low, deepest_high, False))
+    return {'fvg_bullish_mitigation': bullish, 'fvg_bearish_mitigation': bearish}
+
+
+class FairValueGap:
+    """Một FVG đang theo dõi: vị trí nến giữa, hướng, biên gap và giá sâu nhất đã đi vào gap."""
+
+    __slots__ = ('position', 'direction', 'high', 'low', 'deepest')
+
+    def __init__(self, position: int, direction: str, high: float, low: float):
+        self.position = position
+        self.direction = direction
+        self.high = high
+        self.low = low
+        self.deepest = np.nan
+
+    @property
+    def mitigation(self) -> float:
+        return float(fvg_fill_ratio(self.high, self.low, self.deepest, self.direction == 'bullish'))
+
+    def __repr__(self) -> str:
+        return f"FairValueGap({self.position}, {self.direction}, {self.low}-{self.high}, mitigation={self.mitigation:.2f})"
+
+
+class FvgRegistry:
+    """
+    Tập FVG còn hiệu lực, cập nhật theo từng nến mới: nến đi vào gap làm gap bị lấp một phần,
+    gap bị lấp hoàn toàn bị bỏ khỏi tập. Mỗi hướng được sắp theo mép mà giá chạm trước
+    (bullish: high, bearish: low) nên một nến chỉ phải xét các gap nó thực sự chạm tới (tìm nhị phân).
+    """
+
+    def __init__(self):
+        self._keys: dict[str, list[float]] = {'bullish': [], 'bearish': []}
+        self._gaps: dict[str, list[FairValueGap]] = {'bullish': [], 'bearish': []}
+        self._by_position: dict[tuple[int, str], FairValueGap] = {}
+
+    def __len__(self) -> int:
+        return len(self._by_position)
+
+    def add(self, position: int, direction: str, high: float, low: float) -> FairValueGap:
+        """Thêm FVG vừa xác nhận (nến giữa ở `position`); nến sau đó mới được tính là lấp gap."""
+        gap = FairValueGap(position, direction, high, low)
+        key = high if direction == 'bullish' else low
+        pos = bisect_right(self._keys[direction], key)
+        self._keys[direction].insert(pos, key)
+        self._gaps[direction].insert(pos, gap)
+        self._by_position[(position, direction)] = gap
+        return gap
+
+    def update(self, high: float, low: float) -> list[FairValueGap]:
+        """Áp một nến mới vào các gap đang mở. Trả về các gap vừa bị lấp hoàn toàn (đã bị bỏ khỏi tập)."""
+        filled = []
+        if low == low:
+            # Bullish gap bị chạm khi low của nến < high của gap: các gap cuối danh sách (high lớn nhất)
+            gaps = self._gaps['bullish']
+            start = bisect_right(self._keys['bullish'], low)
+            for gap in gaps[start:]:
+                if not gap.deepest <= low:
+                    gap.deepest = low
+                if low <= gap.low:
+                    filled.append(gap)
+        if high == high:
+            # Bearish gap bị chạm khi high của nến > low của gap: các gap đầu danh sách
+            gaps = self._gaps['bearish']
+            stop = bisect_left(self._keys['bearish'], high)
+            for gap in gaps[:stop]:
+                if not gap.deepest >= high:
+                    gap.deepest = high
+                if high >= gap.high:
+                    filled.append(gap)
+        if filled:
+            self._remove(filled)
+        return filled
+
+    def _remove(self, gaps: list[FairValueGap]) -> None:
+        removed = {id(gap) for gap in gaps}
+        for direction in ('bullish', 'bearish'):
+            kept = [k for k, gap in enumerate(self._gaps[direction]) if id(gap) not in removed]
+            if len(kept) != len(self._gaps[direction]):
+                self._keys[direction] = [self._keys[direction][k] for k in kept]
+                self._gaps[direction] = [self._gaps[direction][k] for k in kept]
+        for gap in gaps:
+            self._by_position.pop((gap.position, gap.direction), None)
+
+    def prune(self, before: int) -> None:
+        """Bỏ các gap có nến giữa trước vị trí `before` (dữ liệu đã bị loại khỏi bộ đệm)."""
+        old = [gap for gap in self._by_position.values() if gap.position < before]
+        if old:
+            self._remove(old)
+
+    def get(self, position: int, direction: str) -> FairValueGap | None:
+        """Gap còn mở tại nến giữa `position`, None nếu không có hoặc đã bị lấp hoàn toàn."""
+        return self._by_position.get((position, direction))
+
+    def active(self, direction: str) -> list[FairValueGap]:
+        """Các gap còn mở của một hướng, sắp theo mép giá chạm trước (bullish: high tăng dần, bearish: low tăng dần)."""
+        return list(self._gaps[direction])
+
+    def latest(self, direction: str) -> FairValueGap | None:
+        """Gap còn mở được tạo gần nhất của một hướng."""
+        gaps = self._gaps[direction]
+        return max(gaps, key=lambda gap: gap.position) if gaps else None
+
+
+class OpenGaps:
+    """
+    Ảnh chụp các FVG còn mở của một frame (lấy từ FvgRegistry khi dựng frame): dòng của nến giữa
+    và biên gap theo từng hướng, sắp theo dòng. Tra cứu gap mới nhất không phải quét các dòng của frame.
+    """
+
+    def __init__(self, gaps: dict[str, list[tuple[int, float, float]]]):
+        self._gaps = gaps
+
+    @classmethod
+    def from_registry(cls, registry: FvgRegistry, start: int, length: int) -> 'OpenGaps':
+        """Gap còn mở có nến giữa nằm trong frame [start, start + length) (vị trí tuyệt đối như registry)."""
+        gaps = {}
+        for direction in ('bullish', 'bearish'):
+            # Dòng đầu frame không có FVG (không có nến trước trong frame)
+            gaps[direction] = sorted((gap.position - start, gap.high, gap.low) for gap in registry.active(direction)
+                                     if 1 <= gap.position - start < length)
+        return cls(gaps)
+
+    def latest(self, direction: str, start_row: int = 0) -> tuple[int, float, float] | None:
+        """(dòng, high, low) của gap còn mở mới nhất có dòng >= start_row, None nếu không có."""
+        gaps = self._gaps[direction]
+        return gaps[-1] if gaps and gaps[-1][0] >= start_row else None
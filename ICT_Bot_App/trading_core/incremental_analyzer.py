@@ -0,0 +1,485 @@
+import numpy as np
+import pandas as pd
+
+from .market_structure import STRUCTURE_CATEGORIES, structure_labels, structure_state_arrays
+from .pd_arrays import displacement_arrays, order_block_arrays, breaker_arrays, breaker_break_times
+from .poi_index import PoiIndex
+from .fvg_registry import FvgRegistry, OpenGaps, fvg_fill_ratio
+
+# Các cột OHLCV được lưu trong bộ đệm. Cột khác của nguồn dữ liệu bị bỏ qua.
+OHLCV_COLUMNS = ['open', 'high', 'low', 'close', 'volume']
+
+
+class _GrowableArray:
+    """Mảng NumPy tự giãn dung lượng, append O(1) khấu hao."""
+
+    __slots__ = ('data', 'size')
+
+    def __init__(self, dtype, capacity: int = 256):
+        self.data = np.empty(capacity, dtype=dtype)
+        self.size = 0
+
+    def append(self, value) -> None:
+        if self.size == len(self.data):
+            grown = np.empty(len(self.data) * 2, dtype=self.data.dtype)
+            grown[:self.size] = self.data[:self.size]
+            self.data = grown
+        self.data[self.size] = value
+        self.size += 1
+
+    def pop(self) -> None:
+        self.size -= 1
+
+    def drop_head(self, count: int) -> None:
+        keep = self.size - count
+        self.data[:keep] = self.data[count:self.size]
+        self.size = keep
+
+    def view(self, start: int, stop: int) -> np.ndarray:
+        return self.data[start:stop]
+
+
+class IncrementalAnalyzer:
+    """
+    Engine phân tích tăng dần (bar-by-bar) cho một symbol/timeframe.
+
+    Mỗi lần nạp một nến đã đóng, engine chỉ cập nhật các đặc trưng không phụ
+    thuộc vào cửa sổ (FVG của nến giữa, swing của nến cách `swing_length` nến)
+    với chi phí O(1). Khi cần DataFrame đã phân tích, `frame()` dựng lại đúng
+    kết quả của `analyze_dataframe(df.iloc[-window:])` (cùng hiệu ứng biên của
+    cửa sổ: swing bị che ở đầu cửa sổ, máy trạng thái BOS/CHOCH khởi động từ
+    đầu cửa sổ...) bằng các phép toán vector trên mảng NumPy.
+
+    Máy trạng thái BOS/CHOCH được "khởi động ấm": lần chạy mới chỉ chạy từng
+    nến cho tới khi trạng thái trùng với lần chạy trước, sau đó sao chép kết
+    quả đã có, nên chi phí khấu hao không phụ thuộc vào độ dài cửa sổ.
+    """
+
+    def __init__(self, window: int = 200, swing_length: int = 10, is_ltf: bool = False,
+                 max_bars: int | None = None, min_fvg_gap: float = 0.0):
+        self.window = window
+        self.swing_length = swing_length
+        self.is_ltf = is_ltf
+        # Độ rộng FVG tối thiểu theo giá (= min_gap_points * point_value của detect_fvg)
+        self.min_fvg_gap = min_fvg_gap
+        min_bars = 2 * (window + 2 * swing_length)
+        self.max_bars = max(max_bars if max_bars is not None else 4 * window, min_bars)
+        self.reset()
+
+    # ------------------------------------------------------------------
+    # Nạp dữ liệu
+    # ------------------------------------------------------------------
+    def reset(self) -> None:
+        """Xóa toàn bộ dữ liệu và trạng thái đã lưu."""
+        self._offset = 0  # chỉ số tuyệt đối của phần tử đầu tiên trong bộ đệm
+        self._timestamps = _GrowableArray('int64')
+        self._columns: dict[str, _GrowableArray] = {}
+        self._fvg_bullish_high = _GrowableArray('float64')
+        self._fvg_bullish_low = _GrowableArray('float64')
+        self._fvg_bearish_high = _GrowableArray('float64')
+        self._fvg_bearish_low = _GrowableArray('float64')
+        self._swing_high = _GrowableArray('float64')
+        self._swing_low = _GrowableArray('float64')
+        self._index_name = None
+        self._index_tz = None
+        self._index_unit = 'ns'
+        self._structure_cache = None
+        self._source = None
+        # FVG chưa bị lấp hoàn toàn, cập nhật theo từng nến (None = dựng lại từ bộ đệm khi cần, sau _pop)
+        self._fvg_registry: FvgRegistry | None = FvgRegistry()
+        # Chỉ mục POI (OB/FVG/BB) và FVG còn mở của lần frame() gần nhất, dùng cho evaluate_signal
+        self.last_poi_index: PoiIndex | None = None
+        self.last_open_gaps: OpenGaps | None = None
+
+    def __len__(self) -> int:
+        return self._timestamps.size
+
+    @property
+    def last_timestamp(self) -> pd.Timestamp | None:
+        if not len(self):
+            return None
+        return self._to_timestamp(int(self._timestamps.data[len(self) - 1]))
+
+    def append(self, timestamp, open_: float, high: float, low: float, close: float,
+               volume: float = 0.0) -> None:
+        """Nạp một nến đã đóng (phải mới hơn nến cuối cùng đã nạp)."""
+        ts = pd.Timestamp(timestamp)
+        if not len(self) and not self._columns:
+            self._index_tz = ts.tz
+            self._index_unit = getattr(ts, 'unit', 'ns')
+            for col in OHLCV_COLUMNS:
+                self._columns[col] = _GrowableArray('float64')
+        self._push(self._to_int(ts), (open_, high, low, close, volume))
+
+    def extend(self, df: pd.DataFrame, start: int = 0, stop: int | None = None) -> None:
+        """
+        Nạp tuần tự các nến df.iloc[start:stop] (index là timestamp).
+        Mảng NumPy của df được giữ lại, nên gọi lặp lại với cùng một df theo
+        từng đoạn nhỏ (như trong backtest) không phải chuyển đổi lại dữ liệu.
+        """
+        if df is None or df.empty:
+            return
+        if not len(self) and not self._columns:
+            self._index_name = df.index.name
+            self._index_tz = getattr(df.index, 'tz', None)
+            self._index_unit = getattr(df.index, 'unit', 'ns')
+            for col in OHLCV_COLUMNS:
+                if col in df.columns:
+                    self._columns[col] = _GrowableArray(df[col].to_numpy().dtype)
+        if self._source is None or self._source[0] is not df:
+            self._source = (df, self._index_to_int(df.index), [df[col].to_numpy() for col in self._columns])
+        _, stamps, values = self._source
+        stop = len(df) if stop is None else min(stop, len(df))
+        for k in range(start, stop):
+            self._push(int(stamps[k]), tuple(v[k] for v in values))
+
+    def update(self, df: pd.DataFrame) -> None:
+        """
+        Đồng bộ với một DataFrame vừa fetch từ connector (live).
+        Nến trùng timestamp với nến cuối chỉ được thay thế khi giá trị khác (nến đang hình thành);
+        nến đã đóng giữ nguyên nên registry FVG và cache BOS/CHOCH được dùng tiếp.
+        Các nến mới hơn được nạp thêm. Nếu có khoảng trống thì nạp lại từ đầu.
+        """
+        if df is None or df.empty:
+            return
+        if not len(self):
+            self.extend(df)
+            return
+        stamps = self._index_to_int(df.index)
+        last = int(self._timestamps.data[len(self) - 1])
+        pos = int(np.searchsorted(stamps, last))
+        if pos == len(stamps):
+            return
+        if pos == 0 and stamps[0] > last:
+            self.reset()
+            self.extend(df)
+            return
+        if stamps[pos] == last:
+            if self._same_as_last(df, pos):
+                pos += 1
+            else:
+                self._pop()
+        if pos < len(stamps):
+            self.extend(df, pos)
+
+    def _same_as_last(self, df: pd.DataFrame, pos: int) -> bool:
+        """Nến df.iloc[pos] có cùng giá trị (NaN coi như bằng nhau) với nến cuối đang lưu không."""
+        j = len(self) - 1
+        for col, buffer in self._columns.items():
+            stored = buffer.data[j]
+            value = df[col].iat[pos]
+            if not (stored == value or (pd.isna(stored) and pd.isna(value))):
+                return False
+        return True
+
+    def _push(self, stamp: int, values: tuple) -> None:
+        if len(self) and stamp <= int(self._timestamps.data[len(self) - 1]):
+            raise ValueError("IncrementalAnalyzer chỉ nhận nến mới hơn nến cuối cùng.")
+        if len(self) >= self.max_bars:
+            self._drop_head(self.max_bars // 2)
+
+        self._timestamps.append(stamp)
+        for buffer, value in zip(self._columns.values(), values):
+            buffer.append(value)
+        for buffer in (self._fvg_bullish_high, self._fvg_bullish_low,
+                       self._fvg_bearish_high, self._fvg_bearish_low,
+                       self._swing_high, self._swing_low):
+            buffer.append(np.nan)
+
+        j = len(self) - 1
+        high = self._columns['high'].data
+        low = self._columns['low'].data
+
+        # FVG của nến giữa (j-1) được xác nhận khi nến j đóng
+        if j >= 2:
+            self._confirm_fvg(j)
+
+        # Swing của nến (j - swing_length) được xác nhận khi đủ nến bên phải
+        length = self.swing_length
+        center = j - length
+        if center >= length:
+            if high[center] == high[center - length:j + 1].max():
+                self._swing_high.data[center] = high[center]
+            if low[center] == low[center - length:j + 1].min():
+                self._swing_low.data[center] = low[center]
+
+    def _confirm_fvg(self, j: int) -> None:
+        """Áp nến j vào các FVG đang mở rồi ghi FVG của nến giữa j-1 (nếu có) vào bộ đệm và registry."""
+        high = self._columns['high'].data
+        low = self._columns['low'].data
+        registry = self._fvg_registry
+        if registry is not None:
+            registry.update(high[j], low[j])
+        min_gap = self.min_fvg_gap
+        if high[j - 2] < low[j] and (min_gap <= 0 or low[j] - high[j - 2] >= min_gap):
+            self._fvg_bullish_high.data[j - 1] = low[j]
+            self._fvg_bullish_low.data[j - 1] = high[j - 2]
+            if registry is not None:
+                registry.add(self._offset + j - 1, 'bullish', low[j], high[j - 2])
+        if low[j - 2] > high[j] and (min_gap <= 0 or low[j - 2] - high[j] >= min_gap):
+            self._fvg_bearish_high.data[j - 1] = low[j - 2]
+            self._fvg_bearish_low.data[j - 1] = high[j]
+            if registry is not None:
+                registry.add(self._offset + j - 1, 'bearish', low[j - 2], high[j])
+
+    @property
+    def fvg_registry(self) -> FvgRegistry:
+        """Các FVG còn mở tính tới nến cuối (vị trí là chỉ số tuyệt đối của nến giữa)."""
+        if self._fvg_registry is None:
+            # Sau khi bỏ nến cuối (_pop), dựng lại bằng cách nạp lại các nến trong bộ đệm
+            self._fvg_registry = FvgRegistry()
+            for j in range(2, len(self)):
+                self._confirm_fvg(j)
+        return self._fvg_registry
+
+    def _pop(self) -> None:
+        """Bỏ nến cuối cùng và hoàn tác các đặc trưng mà nến đó đã xác nhận."""
+        j = len(self) - 1
+        for buffer in self._all_buffers():
+            buffer.pop()
+        if j >= 2:
+            for buffer in (self._fvg_bullish_high, self._fvg_bullish_low,
+                           self._fvg_bearish_high, self._fvg_bearish_low):
+                buffer.data[j - 1] = np.nan
+        center = j - self.swing_length
+        if center >= 0:
+            self._swing_high.data[center] = np.nan
+            self._swing_low.data[center] = np.nan
+        self._structure_cache = None
+        self._fvg_registry = None
+
+    def _drop_head(self, count: int) -> None:
+        for buffer in self._all_buffers():
+            buffer.drop_head(count)
+        self._offset += count
+        if self._fvg_registry is not None:
+            self._fvg_registry.prune(self._offset)
+
+    def _all_buffers(self) -> list:
+        return [self._timestamps, *self._columns.values(),
+                self._fvg_bullish_high, self._fvg_bullish_low,
+                self._fvg_bearish_high, self._fvg_bearish_low,
+                self._swing_high, self._swing_low]
+
+    # ------------------------------------------------------------------
+    # Chuyển đổi timestamp
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _to_int(ts: pd.Timestamp) -> int:
+        if ts.tz is not None:
+            ts = ts.tz_convert('UTC').tz_localize(None)
+        return int(ts.as_unit('ns').value)
+
+    def _to_timestamp(self, value: int) -> pd.Timestamp:
+        ts = pd.Timestamp(value, unit='ns')
+        if self._index_tz is not None:
+            ts = ts.tz_localize('UTC').tz_convert(self._index_tz)
+        return ts
+
+    @staticmethod
+    def _index_to_int(index: pd.Index) -> np.ndarray:
+        index = pd.DatetimeIndex(index)
+        if index.tz is not None:
+            index = index.tz_convert('UTC').tz_localize(None)
+        return index.as_unit('ns').asi8
+
+    def _build_index(self, start: int, stop: int) -> pd.DatetimeIndex:
+        values = self._timestamps.view(start, stop).view('M8[ns]')
+        index = pd.DatetimeIndex(values, name=self._index_name)
+        if self._index_tz is not None:
+            index = index.tz_localize('UTC').tz_convert(self._index_tz)
+        return index.as_unit(self._index_unit)
+
+    # ------------------------------------------------------------------
+    # Phân tích cửa sổ
+    # ------------------------------------------------------------------
+    def _window_bounds(self, length: int | None) -> tuple[int, int]:
+        length = self.window if length is None else length
+        stop = len(self)
+        return max(0, stop - length), stop
+
+    def _window_swings(self, start: int, stop: int) -> tuple[np.ndarray, np.ndarray]:
+        """Swing như find_swings trên cửa sổ: che `swing_length` nến đầu cửa sổ."""
+        swing_high = self._swing_high.view(start, stop).copy()
+        swing_low = self._swing_low.view(start, stop).copy()
+        swing_high[:self.swing_length] = np.nan
+        swing_low[:self.swing_length] = np.nan
+        return swing_high, swing_low
+
+    def _structure(self, start: int, stop: int, swing_high: np.ndarray,
+                   swing_low: np.ndarray) -> list:
+        """
+        Máy trạng thái của detect_bos_choch trên cửa sổ [start, stop).
+        Trả về list nhãn theo vị trí: None hoặc (cột, hướng), ví dụ ('bos', 'bullish').
+        """
+        n = stop - start
+        labels: list = [None] * n
+        high_pos = np.flatnonzero(~np.isnan(swing_high))
+        low_pos = np.flatnonzero(~np.isnan(swing_low))
+        if not len(high_pos) or not len(low_pos):
+            self._structure_cache = None
+            return labels
+
+        closes = self._columns['close'].view(start, stop).tolist()
+        highs = swing_high.tolist()
+        lows = swing_low.tolist()
+
+        if high_pos[0] < low_pos[0]:
+            trend, last_high, last_low = 'down', highs[high_pos[0]], None
+        else:
+            trend, last_high, last_low = 'up', None, lows[low_pos[0]]
+
+        states: list = [None] * n
+        states[0] = (trend, last_high, last_low)
+
+        # Đoạn [shared_from, shared_to] (chỉ số tuyệt đối) có cùng dữ liệu đầu vào
+        # với lần chạy trước, nên có thể sao chép kết quả khi trạng thái trùng nhau.
+        abs_start = self._offset + start
+        cache = self._structure_cache
+        shared_from = abs_start + self.swing_length
+        shared_to = -1
+        if cache is not None and cache[0] <= abs_start:
+            shared_to = cache[1] - self.swing_length
+
+        p = 1
+        while p < n:
+            high_val = highs[p]
+            low_val = lows[p]
+            if high_val == high_val:
+                last_high = high_val
+            if low_val == low_val:
+                last_low = low_val
+            close = closes[p]
+
+            if trend == 'up':
+                if last_high and close > last_high:
+                    labels[p] = ('bos', 'bullish')
+                    last_high = close
+                elif last_low and close < last_low:
+                    labels[p] = ('choch', 'bearish')
+                    trend = 'down'
+                    last_low = close
+            elif trend == 'down':
+                if last_low and close < last_low:
+                    labels[p] = ('bos', 'bearish')
+                    last_low = close
+                elif last_high and close > last_high:
+                    labels[p] = ('choch', 'bullish')
+                    trend = 'up'
+                    last_high = close
+
+            state = (trend, last_high, last_low)
+            states[p] = state
+
+            absolute = abs_start + p
+            if shared_from - 1 <= absolute < shared_to:
+                q = absolute - cache[0]
+                if cache[2][q] == state:
+                    count = shared_to - absolute
+                    labels[p + 1:p + 1 + count] = cache[3][q + 1:q + 1 + count]
+                    states[p + 1:p + 1 + count] = cache[2][q + 1:q + 1 + count]
+                    trend, last_high, last_low = states[p + count]
+                    shared_to = -1
+                    p += count + 1
+                    continue
+            p += 1
+
+        self._structure_cache = (abs_start, self._offset + stop - 1, states, labels)
+        return labels
+
+    def bias(self, length: int | None = None) -> str:
+        """
+        Bias hiện tại như get_current_bias(detect_bos_choch(find_swings(cửa sổ))),
+        tức hướng của sự kiện BOS/CHOCH cuối cùng trong cửa sổ.
+        """
+        start, stop = self._window_bounds(length)
+        if stop - start == 0:
+            return 'neutral'
+        swing_high, swing_low = self._window_swings(start, stop)
+        labels = self._structure(start, stop, swing_high, swing_low)
+        for label in reversed(labels):
+            if label is not None:
+                return 'long' if label[1] == 'bullish' else 'short'
+        return 'neutral'
+
+    def frame(self, length: int | None = None) -> pd.DataFrame:
+        """
+        DataFrame đã phân tích của `length` nến cuối (mặc định `window`),
+        giống hệt analyze_dataframe(df.iloc[-length:], is_ltf=self.is_ltf).
+        """
+        start, stop = self._window_bounds(length)
+        n = stop - start
+        index = self._build_index(start, stop)
+        data = {col: buffer.view(start, stop).copy() for col, buffer in self._columns.items()}
+        self.last_poi_index = None
+        self.last_open_gaps = None
+        if n == 0:
+            return pd.DataFrame(data, index=index)
+
+        # --- FVG: nến đầu cửa sổ không có nến trước nên không có FVG ---
+        for col, buffer in (('fvg_bullish_high', self._fvg_bullish_high),
+                            ('fvg_bullish_low', self._fvg_bullish_low),
+                            ('fvg_bearish_high', self._fvg_bearish_high),
+                            ('fvg_bearish_low', self._fvg_bearish_low)):
+            values = buffer.view(start, stop).copy()
+            values[0] = np.nan
+            data[col] = values
+        data.update(self._fvg_mitigation(start, data))
+        self.last_open_gaps = OpenGaps.from_registry(self.fvg_registry, self._offset + start, n)
+
+        # --- Swings + BOS/CHOCH ---
+        swing_high, swing_low = self._window_swings(start, stop)
+        data['swing_high'] = swing_high
+        data['swing_low'] = swing_low
+
+        labels = self._structure(start, stop, swing_high, swing_low)
+        bos = np.full(n, -1, dtype=np.int8)
+        choch = np.full(n, -1, dtype=np.int8)
+        for p, label in enumerate(labels):
+            if label is not None:
+                (bos if label[0] == 'bos' else choch)[p] = STRUCTURE_CATEGORIES.index(label[1])
+        data['bos'] = structure_labels(bos)
+        data['choch'] = structure_labels(choch)
+        data.update(structure_state_arrays(data['close'], swing_high, swing_low, bos, choch))
+        data.update(displacement_arrays(data['open'], data['high'], data['low'], data['close']))
+
+        if not self.is_ltf:
+            self._order_blocks(data, bos, index)
+            self.last_poi_index = PoiIndex.from_arrays(data, index)
+        return pd.DataFrame(data, index=index)
+
+    def _fvg_mitigation(self, start: int, data: dict) -> dict:
+        """
+        Cột mức lấp gap như detect_fvg, lấy từ registry: gap còn mở dùng giá sâu nhất đã ghi nhận,
+        gap trong cửa sổ không còn trong registry là đã bị lấp hoàn toàn.
+        """
+        registry = self.fvg_registry
+        columns = {}
+        for direction in ('bullish', 'bearish'):
+            high, low = data[f'fvg_{direction}_high'], data[f'fvg_{direction}_low']
+            deepest = np.full(len(high), np.nan)
+            for p in np.flatnonzero(~np.isnan(high)):
+                gap = registry.get(self._offset + start + p, direction)
+                deepest[p] = gap.deepest if gap is not None else (low[p] if direction == 'bullish' else high[p])
+            columns[f'fvg_{direction}_mitigation'] = np.where(
+                np.isnan(high), np.nan, fvg_fill_ratio(high, low, deepest, direction == 'bullish'))
+        return columns
+
+    @staticmethod
+    def _order_blocks(data: dict, bos: np.ndarray, index: pd.DatetimeIndex) -> None:
+        """
+        Tương đương detect_order_block + detect_breaker_block trên cửa sổ.
+        `bos` là mã BOS (0 = bullish, 1 = bearish) như structure_codes.
+        """
+        close = data['close']
+        data.update(order_block_arrays(
+            data['open'], data['high'], data['low'], close,
+            data['swing_high'], data['swing_low'], bos == 0, bos == 1,
+            ~np.isnan(data['fvg_bullish_high']), ~np.isnan(data['fvg_bearish_high']), data))
+        ob_bullish, ob_bearish = data['ob_bullish'], data['ob_bearish']
+        zone_high, zone_low = data['ob_zone_high'], data['ob_zone_low']
+
+        data['bb_bullish'], data['bb_bearish'], break_pos = breaker_arrays(
+            close, ob_bullish, ob_bearish, zone_high, zone_low)
+        data['bb_break_time'] = breaker_break_times(index, break_pos)
+
@@ -0,0 +1,189 @@
+import re
+import threading
+import numpy as np
+import pandas as pd
+
+from .ohlcv_store import load_ohlcv
+from .time_filter import kill_zone_mask
+from .timeframes import timeframe_delta
+
+from typing import TYPE_CHECKING
+if TYPE_CHECKING:
+    from .connectors.base_connector import BaseConnector
+
+# Số nến D1/W1 cần cho PDH/PDL và PWH/PWL (nến cuối có thể còn đang hình thành)
+LEVEL_LIMITS = {'D1': 5, 'W1': 2}
+ONE_DAY = pd.Timedelta(days=1)
+ONE_WEEK = pd.Timedelta(weeks=1)
+
+
+def session_key(name: str) -> str:
+    """Tên phiên -> tiền tố khóa mức thanh khoản, vd. 'New York' -> 'new_york' ('new_york_high', 'new_york_low')."""
+    return re.sub(r'[^a-z0-9]+', '_', str(name).lower()).strip('_')
+
+
+class _Periods:
+    """High/low của các giai đoạn (ngày, tuần, phiên) sắp theo thời điểm kết thúc, tra cứu bằng tìm kiếm nhị phân."""
+
+    def __init__(self, ends: np.ndarray, highs: np.ndarray, lows: np.ndarray):
+        order = np.argsort(ends, kind='stable')
+        self.ends = ends[order]
+        self.highs = highs[order]
+        self.lows = lows[order]
+
+    @classmethod
+    def from_groups(cls, bars: pd.DataFrame, keys: np.ndarray, ends: np.ndarray) -> '_Periods':
+        """Gộp các nến cùng khóa (ngày/tuần/lần xuất hiện phiên); `ends` là thời điểm kết thúc của từng nến theo khóa."""
+        grouped = pd.DataFrame({'key': keys, 'end': ends, 'high': bars['high'].to_numpy(dtype=np.float64),
+                                'low': bars['low'].to_numpy(dtype=np.float64)}).groupby('key', sort=False)
+        agg = grouped.agg(end=('end', 'max'), high=('high', 'max'), low=('low', 'min'))
+        return cls(agg['end'].to_numpy(dtype='datetime64[ns]'), agg['high'].to_numpy(), agg['low'].to_numpy())
+
+    def last_completed(self, timestamp: np.datetime64) -> tuple[float, float] | None:
+        """(high, low) của giai đoạn gần nhất đã kết thúc tại `timestamp` (kết thúc <= timestamp)."""
+        pos = int(np.searchsorted(self.ends, timestamp, side='right')) - 1
+        if pos < 0:
+            return None
+        return float(self.highs[pos]), float(self.lows[pos])
+
+
+def _week_start(index: pd.DatetimeIndex) -> pd.DatetimeIndex:
+    days = index.normalize()
+    return days - pd.to_timedelta(days.dayofweek, unit='D')
+
+
+class LiquidityLevels:
+    """
+    Các mức thanh khoản HTF tại một thời điểm bất kỳ (point-in-time, không nhìn trước):
+    PDH/PDL/PD mid (ngày gần nhất đã đóng), PWH/PWL (tuần gần nhất đã đóng) và high/low
+    của lần gần nhất mỗi Kill Zone đã kết thúc ('<phiên>_high', '<phiên>_low').
+
+    `bars` là nến khung bất kỳ (<= D1). Ngày/tuần được gộp từ `bars` theo ngày giao dịch (ngày của index),
+    trừ khi truyền sẵn nến `daily`/`weekly` của sàn (derive_htf=False: không gộp từ `bars`, vd. khi `bars`
+    chỉ là cửa sổ vài giờ gần nhất). Phiên chỉ tính khi `bars` là khung trong ngày.
+    Tính một lần cho cả chuỗi nến; mỗi lần tra cứu `at()` chỉ là vài tìm kiếm nhị phân.
+    """
+
+    def __init__(self, bars: pd.DataFrame | None, daily: pd.DataFrame | None = None, weekly: pd.DataFrame | None = None,
+                 derive_htf: bool = True):
+        self.daily = self.weekly = None
+        self.sessions: dict[str, _Periods] = {}
+        if bars is not None and bars.empty:
+            bars = None
+        htf_bars = bars if derive_htf else None
+
+        if daily is not None and not daily.empty:
+            days = pd.DatetimeIndex(daily.index).normalize()
+            self.daily = _Periods.from_groups(daily, days.asi8, (days + ONE_DAY).values)
+        elif htf_bars is not None:
+            days = pd.DatetimeIndex(htf_bars.index).normalize()
+            self.daily = _Periods.from_groups(htf_bars, days.asi8, (days + ONE_DAY).values)
+
+        if weekly is not None and not weekly.empty:
+            # Nến W1 của sàn: tuần bắt đầu từ lúc mở nến (MT5 mở tuần vào Chủ nhật)
+            weeks = pd.DatetimeIndex(weekly.index).normalize()
+            self.weekly = _Periods.from_groups(weekly, weeks.asi8, (weeks + ONE_WEEK).values)
+        else:
+            source = daily if daily is not None and not daily.empty else htf_bars
+            if source is not None:
+                weeks = _week_start(pd.DatetimeIndex(source.index))
+                self.weekly = _Periods.from_groups(source, weeks.asi8, (weeks + ONE_WEEK).values)
+
+        if bars is not None and len(bars) > 1:
+            index = pd.DatetimeIndex(bars.index)
+            bar_delta = timeframe_delta('', index)
+            if bar_delta < ONE_DAY:
+                _, names = kill_zone_mask(index)
+                # Mỗi đoạn nến liên tiếp cùng phiên là một lần xuất hiện; kết thúc khi nến cuối của đoạn đóng cửa
+                run_ids = np.cumsum(np.r_[True, names[1:] != names[:-1]])
+                ends = (index + bar_delta).values
+                for name in dict.fromkeys(n for n in names if n is not None):
+                    selected = names == name
+                    self.sessions[session_key(name)] = _Periods.from_groups(
+                        bars.iloc[np.flatnonzero(selected)], run_ids[selected], ends[selected])
+
+    def at(self, timestamp) -> dict:
+        """
+        Các mức tại `timestamp` (thời điểm đánh giá, vd. lúc nến cuối đóng cửa).
+        Chỉ gồm các mức đã có dữ liệu, cùng khóa với get_htf_liquidity_levels ('pdh', 'pdl', 'pd_mid', 'pwh', 'pwl').
+        """
+        ts = pd.Timestamp(timestamp)
+        ts = (ts.tz_convert('UTC').tz_localize(None) if ts.tzinfo is not None else ts).to_datetime64()
+        levels = {}
+        day = self.daily.last_completed(ts) if self.daily is not None else None
+        if day is not None:
+            levels['pdh'], levels['pdl'] = day
+            levels['pd_mid'] = (day[0] + day[1]) / 2
+        week = self.weekly.last_completed(ts) if self.weekly is not None else None
+        if week is not None:
+            levels['pwh'], levels['pwl'] = week
+        for key, periods in self.sessions.items():
+            session = periods.last_completed(ts)
+            if session is not None:
+                levels[f'{key}_high'], levels[f'{key}_low'] = session
+        return levels
+
+
+def bar_close_time(bars: pd.DataFrame) -> pd.Timestamp:
+    """Thời điểm nến cuối của `bars` đóng cửa (index là thời điểm mở nến)."""
+    index = pd.DatetimeIndex(bars.index)
+    return index[-1] + (timeframe_delta('', index) if len(index) > 1 else pd.Timedelta(0))
+
+
+class LiquidityLevelService:
+    """
+    Mức thanh khoản HTF cho bot live, cache theo (symbol, ngày giao dịch): nến D1/W1 chỉ được tải lại
+    khi sang ngày mới thay vì ở mỗi lần evaluate_signal. High/low các phiên tính từ nến khung chính
+    đã có trong bộ nhớ, cache theo nến cuối. An toàn khi gọi từ nhiều thread.
+    """
+
+    def __init__(self):
+        self._daily: dict[str, tuple[pd.Timestamp, pd.DataFrame | None, pd.DataFrame | None]] = {}
+        self._levels: dict[str, tuple[tuple, LiquidityLevels]] = {}
+        self._lock = threading.Lock()
+
+    def _htf_frames(self, connector: 'BaseConnector', trading_date: pd.Timestamp) -> tuple[pd.DataFrame | None, pd.DataFrame | None]:
+        symbol = connector.get_symbol()
+        with self._lock:
+            cached = self._daily.get(symbol)
+        if cached is not None and cached[0] == trading_date:
+            return cached[1], cached[2]
+        daily = load_ohlcv(connector, 'D1', limit=LEVEL_LIMITS['D1'])
+        weekly = load_ohlcv(connector, 'W1', limit=LEVEL_LIMITS['W1'])
+        if daily is not None and weekly is not None:
+            with self._lock:
+                self._daily[symbol] = (trading_date, daily, weekly)
+        return daily, weekly
+
+    def get(self, connector: 'BaseConnector', bars: pd.DataFrame | None = None, timestamp=None) -> dict:
+        """
+        Các mức tại `timestamp` (mặc định: lúc nến cuối của `bars` đóng, hoặc hiện tại nếu không có `bars`).
+        Trả về dict rỗng nếu có lỗi khi tải/tính dữ liệu.
+        """
+        try:
+            if timestamp is None:
+                timestamp = bar_close_time(bars) if bars is not None and not bars.empty else pd.Timestamp.now('UTC').tz_localize(None)
+            timestamp = pd.Timestamp(timestamp)
+            daily, weekly = self._htf_frames(connector, timestamp.normalize())
+            key = (timestamp.normalize(), None if bars is None or bars.empty else bars.index[-1], daily is None, weekly is None)
+            symbol = connector.get_symbol()
+            with self._lock:
+                cached = self._levels.get(symbol)
+            if cached is None or cached[0] != key:
+                cached = (key, LiquidityLevels(bars, daily=daily, weekly=weekly, derive_htf=False))
+                with self._lock:
+                    self._levels[symbol] = cached
+            return cached[1].at(timestamp)
+        except Exception:
+            return {}
+
+    def invalidate(self, symbol: str | None = None) -> None:
+        """Xóa cache của symbol (None = mọi symbol)."""
+        with self._lock:
+            for cache in (self._daily, self._levels):
+                for key in [key for key in cache if symbol is None or key == symbol]:
+                    del cache[key]
+
+
+# Tạo một instance duy nhất để sử dụng trong toàn bộ ứng dụng
+liquidity_levels = LiquidityLevelService()
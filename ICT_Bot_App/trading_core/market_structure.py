@@ -5,6 +5,11 @@ from typing import cast, Any, TYPE_CHECKING
 if TYPE_CHECKING:
     from pandas import DataFrame
 
+try:
+    from numba import njit
+except ImportError:  # numba là tùy chọn, không có thì chạy vòng lặp Python
+    njit = None
+
 # OTE Fibonacci Levels (Optimal Trade Entry)
 OTE_FIB_LEVELS = {
     'shallow': 0.62,
@@ -12,6 +17,11 @@ OTE_FIB_LEVELS = {
     'deep': 0.79
 }
 
+# Nhãn của cột categorical 'bos' / 'choch' (mã 0 và 1, mã -1 = không có sự kiện)
+STRUCTURE_CATEGORIES = ['bullish', 'bearish']
+# Nhãn của cột 'last_structure': sự kiện cấu trúc gần nhất tính tới mỗi nến (mã = mã bos, choch + 2)
+STRUCTURE_EVENTS = ['bos_bullish', 'bos_bearish', 'choch_bullish', 'choch_bearish']
+
 
 def calculate_ote_levels(swing_high: float, swing_low: float, direction: str) -> dict:
     range_size = swing_high - swing_low
@@ -97,33 +107,42 @@ def get_htf_bias(df_htf: pd.DataFrame, htf_label: str = "H4") -> str:
     
     return get_current_bias(df)
 
+def _swing_points(values: np.ndarray, swing_length: int, reducer) -> np.ndarray:
+    """
+    Giá trị swing cho từng nến: nến ở giữa cửa sổ (2*swing_length+1) có giá trị
+    bằng max (hoặc min) của cả cửa sổ. Tương đương rolling(center=True).apply:
+    nến ở hai đầu (không đủ cửa sổ) và cửa sổ chứa NaN đều cho NaN, trường hợp
+    bằng nhau (tie) vẫn được tính là swing.
+    """
+    values = np.asarray(values, dtype='float64')
+    window = swing_length * 2 + 1
+    result = np.full(len(values), np.nan)
+    if len(values) < window:
+        return result
+
+    extreme = reducer(np.lib.stride_tricks.sliding_window_view(values, window), axis=1)
+    center = values[swing_length:len(values) - swing_length]
+    result[swing_length:len(values) - swing_length] = np.where(center == extreme, center, np.nan)
+    return result
+
 def find_swings(df, swing_length=10):
-    df['swing_high'] = df['high'].rolling(window=swing_length*2+1, center=True).apply(lambda x: x.iloc[swing_length] if x.iloc[swing_length] == x.max() else np.nan)
-    df['swing_low'] = df['low'].rolling(window=swing_length*2+1, center=True).apply(lambda x: x.iloc[swing_length] if x.iloc[swing_length] == x.min() else np.nan)
+    df['swing_high'] = _swing_points(df['high'].to_numpy(), swing_length, np.max)
+    df['swing_low'] = _swing_points(df['low'].to_numpy(), swing_length, np.min)
     return df
 
 def get_current_bias(df, signals=None):
-    if 'bos' not in df.columns or 'choch' not in df.columns:
+    if 'last_structure' in df.columns:
+        # Cột đã tính sẵn khi phân tích (structure_state_arrays trong detect_bos_choch/IncrementalAnalyzer): chỉ đọc nến cuối
+        latest = df['last_structure'].iloc[-1] if len(df) else np.nan
+    elif 'bos' in df.columns and 'choch' in df.columns:
+        codes = last_structure_codes(_structure_column_codes(df['bos']), _structure_column_codes(df['choch']))
+        latest = STRUCTURE_EVENTS[codes[-1]] if len(codes) and codes[-1] >= 0 else np.nan
+    else:
         return 'neutral'
 
-    last_bos_bullish_idx = df[df['bos'] == 'bullish'].index.max()
-    last_bos_bearish_idx = df[df['bos'] == 'bearish'].index.max()
-    last_choch_bullish_idx = df[df['choch'] == 'bullish'].index.max()
-    last_choch_bearish_idx = df[df['choch'] == 'bearish'].index.max()
-
-    events = {
-        'bos_bullish': last_bos_bullish_idx,
-        'bos_bearish': last_bos_bearish_idx,
-        'choch_bullish': last_choch_bullish_idx,
-        'choch_bearish': last_choch_bearish_idx,
-    }
-
-    valid_events = {name: time for name, time in events.items() if pd.notna(time)}
-
-    if not valid_events:
+    if pd.isna(latest):
         return 'neutral'
-
-    latest_event_name = max(valid_events, key=lambda k: cast(Any, valid_events.get(k)))
+    latest_event_name = str(latest)
 
     if 'bullish' in latest_event_name:
         msg = f"Market Bias: LONG (based on {latest_event_name.replace('_', ' ').upper()})"
@@ -144,29 +163,132 @@ def get_current_bias(df, signals=None):
 
 def get_dealing_range(df):
     if df.empty: return None, None
-    latest_price = df['close'].iloc[-1]
-    
+
+    if 'dealing_range_low' in df.columns and 'dealing_range_high' in df.columns:
+        # Cột đã tính sẵn khi phân tích (structure_state_arrays trong detect_bos_choch/IncrementalAnalyzer): chỉ đọc nến cuối
+        low, high = df['dealing_range_low'].iloc[-1], df['dealing_range_high'].iloc[-1]
+        return (None if pd.isna(low) else float(low)), (None if pd.isna(high) else float(high))
+
     if 'swing_high' not in df.columns or 'swing_low' not in df.columns:
         df = find_swings(df)
-        
-    swing_highs = df[df['swing_high'].notna()]
-    swing_lows = df[df['swing_low'].notna()]
-    
-    swing_highs = cast(pd.DataFrame, swing_highs)
-    swing_lows = cast(pd.DataFrame, swing_lows)
-    
-    if swing_highs.empty or swing_lows.empty: return None, None
 
-    higher_highs = swing_highs[swing_highs['swing_high'] > latest_price]
-    higher_highs = cast(pd.DataFrame, higher_highs)
-    dealing_range_high = higher_highs.iloc[-1]['swing_high'] if not higher_highs.empty else None
+    latest_price = float(df['close'].iloc[-1])
+    swing_highs = df['swing_high'].to_numpy(dtype='float64')
+    swing_lows = df['swing_low'].to_numpy(dtype='float64')
+    swing_highs = swing_highs[~np.isnan(swing_highs)]
+    swing_lows = swing_lows[~np.isnan(swing_lows)]
+    if not len(swing_highs) or not len(swing_lows): return None, None
+
+    higher_highs = swing_highs[swing_highs > latest_price]
+    dealing_range_high = float(higher_highs[-1]) if len(higher_highs) else None
 
-    lower_lows = swing_lows[swing_lows['swing_low'] < latest_price]
-    lower_lows = cast(pd.DataFrame, lower_lows)
-    dealing_range_low = lower_lows.iloc[-1]['swing_low'] if not lower_lows.empty else None
+    lower_lows = swing_lows[swing_lows < latest_price]
+    dealing_range_low = float(lower_lows[-1]) if len(lower_lows) else None
 
     return dealing_range_low, dealing_range_high
 
+def _structure_column_codes(column: pd.Series) -> np.ndarray:
+    """Mã của cột 'bos'/'choch' (0 = bullish, 1 = bearish, -1 = không có), cho cả cột categorical lẫn chuỗi."""
+    if isinstance(column.dtype, pd.CategoricalDtype) and list(column.cat.categories) == STRUCTURE_CATEGORIES:
+        return column.cat.codes.to_numpy(dtype=np.int8)
+    values = column.to_numpy(dtype=object)
+    return np.where(values == 'bullish', 0, np.where(values == 'bearish', 1, -1)).astype(np.int8)
+
+def last_structure_codes(bos: np.ndarray, choch: np.ndarray) -> np.ndarray:
+    """
+    Mã sự kiện BOS/CHOCH gần nhất tính tới từng nến (chỉ số trong STRUCTURE_EVENTS, -1 = chưa có),
+    tức get_current_bias(df.iloc[:i + 1]) cho mọi i cùng lúc (forward-fill theo vị trí).
+    """
+    events = np.where(bos >= 0, bos, np.where(choch >= 0, choch + 2, -1)).astype(np.int8)
+    last = np.where(events >= 0, np.arange(len(events)), -1)
+    np.maximum.accumulate(last, out=last)
+    return np.where(last >= 0, events[np.maximum(last, 0)], -1).astype(np.int8)
+
+
+def _dealing_range_kernel(close, swing_high, swing_low, range_low, range_high):
+    """
+    Dealing range của mọi tiền tố df.iloc[:i + 1] trong một lượt.
+    Giữ ngăn xếp swing high giảm dần (swing cũ thấp hơn/bằng swing mới không bao giờ là đáp án nữa)
+    và swing low tăng dần; swing gần nhất trên/dưới giá đóng cửa tìm bằng tìm kiếm nhị phân trên ngăn xếp.
+    """
+    n = len(close)
+    highs = np.empty(n)
+    lows = np.empty(n)
+    high_size = 0
+    low_size = 0
+    seen_high = False
+    seen_low = False
+    for i in range(n):
+        value = swing_high[i]
+        if value == value:
+            seen_high = True
+            while high_size > 0 and highs[high_size - 1] <= value:
+                high_size -= 1
+            highs[high_size] = value
+            high_size += 1
+        value = swing_low[i]
+        if value == value:
+            seen_low = True
+            while low_size > 0 and lows[low_size - 1] >= value:
+                low_size -= 1
+            lows[low_size] = value
+            low_size += 1
+        if not (seen_high and seen_low):
+            continue
+
+        price = close[i]
+        lo, hi = 0, high_size
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if highs[mid] > price:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo > 0:
+            range_high[i] = highs[lo - 1]
+        lo, hi = 0, low_size
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if lows[mid] < price:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo > 0:
+            range_low[i] = lows[lo - 1]
+
+
+if njit is not None:
+    _dealing_range_kernel_jit = njit(cache=True, nogil=True)(_dealing_range_kernel)
+else:
+    _dealing_range_kernel_jit = None
+
+
+def dealing_range_arrays(close: np.ndarray, swing_high: np.ndarray, swing_low: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """(dealing_range_low, dealing_range_high) cho từng nến, tức get_dealing_range(df.iloc[:i + 1]); NaN = None."""
+    n = len(close)
+    range_low = np.full(n, np.nan)
+    range_high = np.full(n, np.nan)
+    if _dealing_range_kernel_jit is not None:
+        _dealing_range_kernel_jit(close, swing_high, swing_low, range_low, range_high)
+    else:
+        _dealing_range_kernel(close.tolist(), swing_high.tolist(), swing_low.tolist(), range_low, range_high)
+    return range_low, range_high
+
+
+def structure_state_arrays(close: np.ndarray, swing_high: np.ndarray, swing_low: np.ndarray,
+                           bos: np.ndarray, choch: np.ndarray) -> dict:
+    """
+    Các cột trạng thái cấu trúc cho từng nến từ mã BOS/CHOCH (như structure_codes):
+    'last_structure' (sự kiện BOS/CHOCH gần nhất), 'dealing_range_low', 'dealing_range_high'.
+    get_current_bias/get_dealing_range khi đó chỉ đọc nến cuối thay vì lọc lại cả DataFrame.
+    """
+    range_low, range_high = dealing_range_arrays(close, swing_high, swing_low)
+    return {
+        'last_structure': pd.Categorical.from_codes(last_structure_codes(bos, choch), categories=STRUCTURE_EVENTS),
+        'dealing_range_low': range_low,
+        'dealing_range_high': range_high,
+    }
+
 def is_in_premium_or_discount(price, dealing_range_low, dealing_range_high):
     if dealing_range_low is None or dealing_range_high is None or dealing_range_high == dealing_range_low:
         return None 
@@ -175,110 +297,157 @@ def is_in_premium_or_discount(price, dealing_range_low, dealing_range_high):
     elif price < equilibrium: return 'discount'
     else: return 'equilibrium'
 
+def liquidity_sweep_labels(high: np.ndarray, low: np.ndarray, swing_high: np.ndarray,
+                           swing_low: np.ndarray, lookback: int = 20) -> np.ndarray:
+    """
+    Liquidity sweep của mọi nến cùng lúc: 'bullish' khi low phá swing low thấp nhất, 'bearish' khi high phá
+    swing high cao nhất trong `lookback` nến trước (min/max trượt bỏ qua NaN), ngược lại 'none'.
+    `lookback` nến đầu luôn là 'none', giống detect_liquidity_sweep.
+    """
+    n = len(low)
+    labels = np.full(n, 'none', dtype=object)
+    if n <= lookback or lookback <= 0:
+        return labels
+
+    # Hàng r của cửa sổ trượt là `lookback` nến ngay trước nến r + lookback
+    with np.errstate(invalid='ignore'):
+        min_low = np.fmin.reduce(np.lib.stride_tricks.sliding_window_view(swing_low[:-1], lookback), axis=1)
+        max_high = np.fmax.reduce(np.lib.stride_tricks.sliding_window_view(swing_high[:-1], lookback), axis=1)
+    bullish = low[lookback:] < min_low
+    bearish = ~bullish & (high[lookback:] > max_high)
+    labels[lookback:][bullish] = 'bullish'
+    labels[lookback:][bearish] = 'bearish'
+    return labels
+
+def detect_liquidity_sweeps(df, lookback=20) -> pd.Series:
+    """Cột liquidity sweep ('bullish' / 'bearish' / 'none') cho mọi nến của df (cần cột swing_high/swing_low)."""
+    labels = liquidity_sweep_labels(df['high'].to_numpy(dtype='float64'), df['low'].to_numpy(dtype='float64'),
+                                    df['swing_high'].to_numpy(dtype='float64'), df['swing_low'].to_numpy(dtype='float64'),
+                                    lookback)
+    return pd.Series(labels, index=df.index, name='liquidity_sweep')
+
 def detect_liquidity_sweep(df, index, lookback=20):
     if index < lookback: return 'none'
-    candle = df.iloc[index]
-    lookback_df = df.iloc[max(0, index - lookback):index]
-
-    recent_swing_lows = lookback_df[lookback_df['swing_low'].notna()]
-    recent_swing_lows = cast(pd.DataFrame, recent_swing_lows)
-    if not recent_swing_lows.empty:
-        min_swing_low = recent_swing_lows['swing_low'].min()
-        if candle['low'] < min_swing_low:
-             return 'bullish'
-    
-    recent_swing_highs = lookback_df[lookback_df['swing_high'].notna()]
-    recent_swing_highs = cast(pd.DataFrame, recent_swing_highs)
-    if not recent_swing_highs.empty:
-        max_swing_high = recent_swing_highs['swing_high'].max()
-        if candle['high'] > max_swing_high:
-            return 'bearish'
-
-    return 'none'
+    # Chỉ cần `lookback` nến trước và chính nến index
+    window = df.iloc[index - lookback:index + 1]
+    return liquidity_sweep_labels(window['high'].to_numpy(dtype='float64'), window['low'].to_numpy(dtype='float64'),
+                                  window['swing_high'].to_numpy(dtype='float64'),
+                                  window['swing_low'].to_numpy(dtype='float64'), lookback)[-1]
 
 
-def detect_equal_highs_lows(df, threshold_percent=0.0005, lookback=50):
+def cluster_equal_levels(levels: np.ndarray, threshold_percent: float) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Gom các mức giá bằng nhau (EQH/EQL) thành cụm thanh khoản trong O(n log n).
+    Sau khi sắp xếp, hai mức liền kề thuộc cùng cụm nếu chênh lệch <= trung bình
+    của chúng * threshold_percent (cùng điều kiện so sánh từng cặp như trước).
+
+    Returns:
+        (cluster_id, touches, level) theo thứ tự của `levels`. Mức không bằng mức
+        nào khác có cluster_id = -1, touches = 0, level = NaN. Cluster id được
+        đánh số theo giá tăng dần, level là giá trung bình của cụm.
+    """
+    levels = np.asarray(levels, dtype='float64')
+    n = len(levels)
+    cluster_id = np.full(n, -1, dtype=np.int64)
+    touches = np.zeros(n, dtype=np.int64)
+    level = np.full(n, np.nan)
+    if n < 2:
+        return cluster_id, touches, level
+
+    order = np.argsort(levels, kind='stable')
+    sorted_levels = levels[order]
+    linked = np.diff(sorted_levels) <= (sorted_levels[:-1] + sorted_levels[1:]) / 2 * threshold_percent
+
+    group = np.concatenate(([0], np.cumsum(~linked)))
+    sizes = np.bincount(group)
+    means = np.bincount(group, weights=sorted_levels) / sizes
+    is_cluster = sizes >= 2
+    group_cluster = np.where(is_cluster, np.cumsum(is_cluster) - 1, -1)
+
+    in_cluster = is_cluster[group]
+    cluster_id[order] = group_cluster[group]
+    touches[order] = np.where(in_cluster, sizes[group], 0)
+    level[order] = np.where(in_cluster, means[group], np.nan)
+    return cluster_id, touches, level
+
+
+def detect_equal_highs_lows(df, threshold_percent=0.0005, lookback: int | None = 50):
     """
     Phát hiện Equal Highs (EQH) và Equal Lows (EQL).
     EQH/EQL là các vùng thanh khoản quan trọng (Double Tops/Bottoms).
+
+    Các swing high (swing low) trong `lookback` nến gần nhất (None = toàn bộ
+    lịch sử) được gom cụm bằng cluster_equal_levels. Ngoài 'eqh', 'eql' và
+    'liquidity_level' (giá trung bình của cụm), các cột 'eqh_cluster' /
+    'eql_cluster' (-1 = không thuộc cụm) và 'eqh_touches' / 'eql_touches'
+    cho biết cụm và số lần chạm của mức thanh khoản.
     """
-    df['eqh'] = False
-    df['eql'] = False
-    df['liquidity_level'] = np.nan
-    
-    if 'swing_high' not in df.columns or 'swing_low' not in df.columns:
-        return df
-        
-    # Lấy subset gần nhất để tính toán
-    recent_indices = df.index[-lookback:]
-    
-    swing_highs = df.loc[recent_indices][df.loc[recent_indices, 'swing_high'].notna()]
-    if len(swing_highs) >= 2:
-        for i in range(len(swing_highs)):
-            for j in range(i + 1, len(swing_highs)):
-                h1 = swing_highs.iloc[i]['swing_high']
-                h2 = swing_highs.iloc[j]['swing_high']
-                idx1 = swing_highs.index[i]
-                idx2 = swing_highs.index[j]
-                
-                diff = abs(h1 - h2)
-                avg = (h1 + h2) / 2
-                
-                if diff <= avg * threshold_percent:
-                    df.loc[idx1, 'eqh'] = True
-                    df.loc[idx2, 'eqh'] = True
-                    df.loc[idx1, 'liquidity_level'] = avg
-                    df.loc[idx2, 'liquidity_level'] = avg
-                    
-    swing_lows = df.loc[recent_indices][df.loc[recent_indices, 'swing_low'].notna()]
-    if len(swing_lows) >= 2:
-        for i in range(len(swing_lows)):
-            for j in range(i + 1, len(swing_lows)):
-                l1 = swing_lows.iloc[i]['swing_low']
-                l2 = swing_lows.iloc[j]['swing_low']
-                idx1 = swing_lows.index[i]
-                idx2 = swing_lows.index[j]
-                
-                diff = abs(l1 - l2)
-                avg = (l1 + l2) / 2
-                
-                if diff <= avg * threshold_percent:
-                    df.loc[idx1, 'eql'] = True
-                    df.loc[idx2, 'eql'] = True
-                    df.loc[idx1, 'liquidity_level'] = avg
-                    df.loc[idx2, 'liquidity_level'] = avg
-                
+    n = len(df)
+    start = 0 if lookback is None else max(0, n - lookback)
+    liquidity_level = np.full(n, np.nan)
+    columns = {}
+
+    for side, swing_col in (('eqh', 'swing_high'), ('eql', 'swing_low')):
+        cluster_id = np.full(n, -1, dtype=np.int64)
+        touches = np.zeros(n, dtype=np.int64)
+        if swing_col in df.columns:
+            values = df[swing_col].to_numpy(dtype='float64')[start:]
+            positions = start + np.flatnonzero(~np.isnan(values))
+            ids, counts, levels = cluster_equal_levels(values[positions - start], threshold_percent)
+            cluster_id[positions] = ids
+            touches[positions] = counts
+            # EQL ghi sau EQH nên được ưu tiên khi một nến vừa là swing high vừa là swing low
+            clustered = positions[ids >= 0]
+            liquidity_level[clustered] = levels[ids >= 0]
+        columns[side] = cluster_id >= 0
+        columns[f'{side}_cluster'] = cluster_id
+        columns[f'{side}_touches'] = touches
+
+    df['eqh'] = columns['eqh']
+    df['eql'] = columns['eql']
+    df['liquidity_level'] = liquidity_level
+    for col in ('eqh_cluster', 'eql_cluster', 'eqh_touches', 'eql_touches'):
+        df[col] = columns[col]
     return df
 
 
-def get_htf_liquidity_levels(connector: Any) -> dict:
+def get_equal_liquidity_levels(df: pd.DataFrame, threshold_percent: float = 0.0005,
+                               lookbacks: tuple = (50, 200, None)) -> pd.DataFrame:
     """
-    Lấy các mức thanh khoản quan trọng từ HTF: PDH, PDL, PWH, PWL.
+    Bảng các mức thanh khoản EQH/EQL cho nhiều lookback (None = toàn bộ lịch sử).
+    Mỗi dòng là một cụm: lookback, side ('eqh'/'eql'), cluster, level, touches,
+    first_time, last_time (thời điểm swing đầu tiên và cuối cùng của cụm).
     """
-    levels = {}
-    
-    try:
-        # 1. Previous Day High/Low (PDH/PDL)
-        df_daily = connector.fetch_ohlcv('D1', limit=5)
-        if df_daily is not None and len(df_daily) >= 2:
-            prev_day = df_daily.iloc[-2]  # Nến ngày hôm qua
-            levels['pdh'] = prev_day['high']
-            levels['pdl'] = prev_day['low']
-            levels['pd_mid'] = (prev_day['high'] + prev_day['low']) / 2
-            
-        # 2. Previous Week High/Low (PWH/PWL)
-        # Lưu ý: MT5 có thể không hỗ trợ W1 trực tiếp qua map đơn giản, 
-        # nhưng thường là TIMEFRAME_W1
-        df_weekly = connector.fetch_ohlcv('W1', limit=2)
-        if df_weekly is not None and len(df_weekly) >= 2:
-            prev_week = df_weekly.iloc[-2]
-            levels['pwh'] = prev_week['high']
-            levels['pwl'] = prev_week['low']
-            
-    except Exception:
-        pass
-        
-    return levels
+    columns = ['lookback', 'side', 'cluster', 'level', 'touches', 'first_time', 'last_time']
+    frames = []
+    for lookback in lookbacks:
+        recent_df = df if lookback is None else df.iloc[-lookback:]
+        for side, swing_col in (('eqh', 'swing_high'), ('eql', 'swing_low')):
+            if swing_col not in recent_df.columns:
+                continue
+            swings = recent_df[swing_col].dropna()
+            ids, counts, levels = cluster_equal_levels(swings.to_numpy(), threshold_percent)
+            members = pd.DataFrame({'cluster': ids, 'level': levels, 'touches': counts, 'time': swings.index})
+            clusters = members[members['cluster'] >= 0].groupby('cluster', as_index=False).agg(
+                level=('level', 'first'), touches=('touches', 'first'),
+                first_time=('time', 'min'), last_time=('time', 'max'))
+            clusters.insert(0, 'side', side)
+            clusters.insert(0, 'lookback', lookback)
+            frames.append(clusters)
+
+    frames = [frame for frame in frames if not frame.empty]
+    if not frames:
+        return pd.DataFrame(columns=columns)
+    return pd.concat(frames, ignore_index=True)[columns]
+
+
+def get_htf_liquidity_levels(connector: Any, bars: pd.DataFrame | None = None) -> dict:
+    """
+    Lấy các mức thanh khoản quan trọng từ HTF: PDH, PDL, PWH, PWL (và high/low các Kill Zone nếu có `bars`).
+    Nến D1/W1 chỉ được tải lại khi sang ngày giao dịch mới (xem liquidity_levels.LiquidityLevelService).
+    """
+    from .liquidity_levels import liquidity_levels
+    return liquidity_levels.get(connector, bars)
 
 
 def get_draw_on_liquidity(df: pd.DataFrame, bias: str, htf_levels: dict) -> tuple[float | None, str]:
@@ -352,69 +521,94 @@ def get_draw_on_liquidity(df: pd.DataFrame, bias: str, htf_levels: dict) -> tupl
     return dol_price, dol_type
 
 
-def detect_bos_choch(df):
-    df['bos'] = None
-    df['choch'] = None
-    
-    if 'swing_high' not in df.columns or 'swing_low' not in df.columns:
-        df = find_swings(df)
+def _bos_choch_kernel(close, swing_high, swing_low, trend, last_high, last_low, bos, choch):
+    """
+    Máy trạng thái BOS/CHOCH trên mảng, chạy từ nến thứ 1.
+    trend: 1 = up, -1 = down. last_high/last_low = NaN nghĩa là chưa có giá trị
+    (như None ở bản cũ); giá trị 0.0 cũng bị bỏ qua như phép kiểm tra truthiness cũ.
+    Ghi mã nhãn (0 = bullish, 1 = bearish) vào `bos` / `choch`.
+    """
+    for i in range(1, len(close)):
+        high_val = swing_high[i]
+        if high_val == high_val:
+            last_high = high_val
+        low_val = swing_low[i]
+        if low_val == low_val:
+            last_low = low_val
+
+        price = close[i]
+        has_high = last_high == last_high and last_high != 0.0
+        has_low = last_low == last_low and last_low != 0.0
+
+        if trend == 1:
+            if has_high and price > last_high:
+                bos[i] = 0
+                last_high = price
+            elif has_low and price < last_low:
+                choch[i] = 1
+                trend = -1
+                last_low = price
+        else:
+            if has_low and price < last_low:
+                bos[i] = 1
+                last_low = price
+            elif has_high and price > last_high:
+                choch[i] = 0
+                trend = 1
+                last_high = price
+
+
+if njit is not None:
+    _bos_choch_kernel_jit = njit(cache=True, nogil=True)(_bos_choch_kernel)
+else:
+    _bos_choch_kernel_jit = None
+
+
+def structure_codes(close: np.ndarray, swing_high: np.ndarray,
+                    swing_low: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Mã BOS/CHOCH (int8: -1 = không có, 0 = bullish, 1 = bearish) theo đúng
+    logic detect_bos_choch. Trend khởi tạo từ swing đầu tiên của cả mảng.
+    """
+    n = len(close)
+    bos = np.full(n, -1, dtype=np.int8)
+    choch = np.full(n, -1, dtype=np.int8)
 
-    swing_highs = df[df['swing_high'].notna()]
-    swing_lows = df[df['swing_low'].notna()]
+    high_pos = np.flatnonzero(~np.isnan(swing_high))
+    low_pos = np.flatnonzero(~np.isnan(swing_low))
+    if not len(high_pos) or not len(low_pos):
+        return bos, choch
 
-    swing_highs = cast(pd.DataFrame, swing_highs)
-    swing_lows = cast(pd.DataFrame, swing_lows)
-    
-    if swing_highs.empty or swing_lows.empty: return df
-    
-    current_trend = None
-    last_high_val = None
-    last_low_val = None
-    
-    first_high_idx = swing_highs.index[0]
-    first_low_idx = swing_lows.index[0]
-    
-    if first_high_idx < first_low_idx:
-        current_trend = 'down'
-        last_high_val = swing_highs.loc[first_high_idx, 'swing_high']
+    if high_pos[0] < low_pos[0]:
+        trend, last_high, last_low = -1, float(swing_high[high_pos[0]]), np.nan
     else:
-        current_trend = 'up'
-        last_low_val = swing_lows.loc[first_low_idx, 'swing_low']
+        trend, last_high, last_low = 1, np.nan, float(swing_low[low_pos[0]])
 
-    for i in range(1, len(df)):
-        current_idx = df.index[i]
-        current_close = df['close'].iloc[i]
-        
-        if pd.notna(df.loc[current_idx, 'swing_high']):
-            last_high_val = df.loc[current_idx, 'swing_high']
-        
-        if pd.notna(df.loc[current_idx, 'swing_low']):
-            last_low_val = df.loc[current_idx, 'swing_low']
-            
-        if current_trend == 'up':
-            if last_high_val and current_close > last_high_val:
-                df.loc[current_idx, 'bos'] = 'bullish'
-                last_high_val = current_close
-            
-            elif last_low_val and current_close < last_low_val:
-                df.loc[current_idx, 'choch'] = 'bearish'
-                current_trend = 'down'
-                last_low_val = current_close
-
-        elif current_trend == 'down':
-            if last_low_val and current_close < last_low_val:
-                df.loc[current_idx, 'bos'] = 'bearish'
-                last_low_val = current_close
-
-            elif last_high_val and current_close > last_high_val:
-                df.loc[current_idx, 'choch'] = 'bullish'
-                current_trend = 'up'
-                last_high_val = current_close
-
-        elif current_trend is None:
-             if last_high_val and current_close > last_high_val:
-                 current_trend = 'up'
-             elif last_low_val and current_close < last_low_val:
-                 current_trend = 'down'
-                 
+    if _bos_choch_kernel_jit is not None:
+        _bos_choch_kernel_jit(close, swing_high, swing_low, trend, last_high, last_low, bos, choch)
+    else:
+        # Vòng lặp Python nhanh hơn nhiều trên list so với trên phần tử NumPy
+        _bos_choch_kernel(close.tolist(), swing_high.tolist(), swing_low.tolist(),
+                          trend, last_high, last_low, bos, choch)
+    return bos, choch
+
+
+def structure_labels(codes: np.ndarray) -> pd.Categorical:
+    """Chuyển mã BOS/CHOCH sang cột categorical ('bullish' / 'bearish' / NaN)."""
+    return pd.Categorical.from_codes(codes, categories=STRUCTURE_CATEGORIES)
+
+
+def detect_bos_choch(df):
+    if 'swing_high' not in df.columns or 'swing_low' not in df.columns:
+        df = find_swings(df)
+
+    bos, choch = structure_codes(df['close'].to_numpy(dtype='float64'),
+                                 df['swing_high'].to_numpy(dtype='float64'),
+                                 df['swing_low'].to_numpy(dtype='float64'))
+    df['bos'] = structure_labels(bos)
+    df['choch'] = structure_labels(choch)
+    for col, values in structure_state_arrays(df['close'].to_numpy(dtype='float64'),
+                                              df['swing_high'].to_numpy(dtype='float64'),
+                                              df['swing_low'].to_numpy(dtype='float64'), bos, choch).items():
+        df[col] = values
     return df
@@ -0,0 +1,192 @@
+import os
+import re
+import threading
+import numpy as np
+import pandas as pd
+
+from app.config_manager import config_manager
+
+from typing import TYPE_CHECKING
+if TYPE_CHECKING:
+    from .connectors.base_connector import BaseConnector
+
+OHLCV_COLUMNS = ['open', 'high', 'low', 'close', 'volume']
+# Mỗi nến là một bản ghi 48 byte cố định: ghi thêm/cập nhật phần đuôi chỉ cần seek tới đúng vị trí
+OHLCV_DTYPE = np.dtype([('timestamp', '<i8')] + [(col, '<f8') for col in OHLCV_COLUMNS])
+
+
+def ohlcv_records(df: pd.DataFrame) -> np.ndarray:
+    """Chuyển DataFrame OHLCV (index thời gian) sang mảng bản ghi OHLCV_DTYPE."""
+    index = pd.DatetimeIndex(df.index)
+    if index.tz is not None:
+        index = index.tz_localize(None)
+    records = np.empty(len(df), dtype=OHLCV_DTYPE)
+    records['timestamp'] = index.as_unit('ns').asi8
+    for col in OHLCV_COLUMNS:
+        records[col] = df[col].to_numpy(dtype=np.float64) if col in df.columns else np.nan
+    return records
+
+
+def records_frame(records: np.ndarray) -> pd.DataFrame:
+    """Ngược lại của ohlcv_records: DataFrame cùng định dạng với `connector.fetch_ohlcv`."""
+    index = pd.DatetimeIndex(records['timestamp'].astype('datetime64[ns]'), name='timestamp')
+    return pd.DataFrame({col: np.array(records[col]) for col in OHLCV_COLUMNS}, index=index)
+
+
+class OHLCVStore:
+    """
+    Kho nến OHLCV trên đĩa, mỗi symbol/timeframe là một file bản ghi nhị phân (memory-mapped).
+
+    Lần đầu lấy đủ `limit` nến từ connector; các lần sau chỉ tải các nến mới hơn
+    timestamp cuối đã lưu (kèm nến cuối đó, vì lúc lưu nó có thể còn đang hình thành).
+    Khi đọc, chỉ các bản ghi trong khoảng thời gian/số lượng yêu cầu được copy ra DataFrame.
+    An toàn khi gọi từ nhiều thread (worker live và backtest).
+    """
+
+    def __init__(self, directory: str = 'data_store'):
+        self.directory = directory
+        self._lock = threading.Lock()
+        # (symbol, timeframe) -> limit lớn nhất đã tải đầy đủ trong phiên này
+        self._backfilled: dict[tuple[str, str], int] = {}
+
+    def path(self, symbol: str, timeframe: str) -> str:
+        name = re.sub(r'[^A-Za-z0-9._-]', '_', f"{symbol}_{timeframe}")
+        return os.path.join(self.directory, f"{name}.ohlcv")
+
+    def _records(self, path: str) -> np.ndarray | None:
+        """Memmap chỉ đọc toàn bộ file, None nếu chưa có dữ liệu. Chỉ gọi khi đang giữ lock."""
+        size = os.path.getsize(path) if os.path.exists(path) else 0
+        count = size // OHLCV_DTYPE.itemsize
+        if count == 0:
+            return None
+        return np.memmap(path, dtype=OHLCV_DTYPE, mode='r', shape=(count,))
+
+    def count(self, symbol: str, timeframe: str) -> int:
+        """Số nến đang lưu."""
+        path = self.path(symbol, timeframe)
+        return os.path.getsize(path) // OHLCV_DTYPE.itemsize if os.path.exists(path) else 0
+
+    def last_timestamp(self, symbol: str, timeframe: str) -> pd.Timestamp | None:
+        """Timestamp của nến cuối cùng đã lưu."""
+        with self._lock:
+            records = self._records(self.path(symbol, timeframe))
+            if records is None:
+                return None
+            return pd.Timestamp(int(records['timestamp'][-1]))
+
+    def load(self, symbol: str, timeframe: str, limit: int | None = None, start=None, end=None, warmup: int = 0) -> pd.DataFrame | None:
+        """
+        Đọc các nến trong [start, end] (None = không giới hạn) cộng `warmup` nến trước start, tối đa `limit` nến cuối.
+        Khoảng thời gian được tìm bằng binary search trên memmap nên chỉ phần cần dùng được đọc từ đĩa.
+        """
+        with self._lock:
+            records = self._records(self.path(symbol, timeframe))
+            if records is None:
+                return None
+            stamps = records['timestamp']
+            lo = int(np.searchsorted(stamps, pd.Timestamp(start).value, side='left')) if start is not None else 0
+            hi = int(np.searchsorted(stamps, pd.Timestamp(end).value, side='right')) if end is not None else len(records)
+            lo = max(0, lo - warmup)
+            if limit is not None:
+                lo = max(lo, hi - limit)
+            chunk = np.array(records[lo:hi])
+            del records, stamps
+
+        return records_frame(chunk)
+
+    def write(self, symbol: str, timeframe: str, df: pd.DataFrame | None, replace: bool = False) -> int:
+        """
+        Gộp df vào store theo timestamp: các nến đã lưu trong khoảng thời gian của df bị thay thế
+        (nến đang hình thành của lần trước được cập nhật), phần còn lại giữ nguyên.
+        replace=True thay toàn bộ dữ liệu đã lưu bằng df (khi df không nối liền được với phần đã lưu).
+        Trả về số nến tăng thêm.
+        """
+        if df is None or df.empty:
+            return 0
+        new = ohlcv_records(df)
+        if not (np.diff(new['timestamp']) > 0).all():
+            # Sắp xếp và bỏ trùng lặp, giữ bản ghi xuất hiện sau cùng
+            new = new[::-1][np.unique(new['timestamp'][::-1], return_index=True)[1]]
+
+        path = self.path(symbol, timeframe)
+        with self._lock:
+            os.makedirs(self.directory, exist_ok=True)
+            records = self._records(path)
+            old_count = 0 if records is None else len(records)
+            keep = tail = old_count
+            tail_records = None
+            if replace:
+                keep = 0
+            elif records is not None:
+                keep = int(np.searchsorted(records['timestamp'], new['timestamp'][0], side='left'))
+                tail = int(np.searchsorted(records['timestamp'], new['timestamp'][-1], side='right'))
+                if tail < old_count:
+                    tail_records = np.array(records[tail:])
+            # Phải giải phóng memmap trước khi ghi/cắt file (bắt buộc trên Windows)
+            del records
+
+            with open(path, 'r+b' if old_count else 'wb') as f:
+                f.seek(keep * OHLCV_DTYPE.itemsize)
+                f.write(new.tobytes())
+                if tail_records is not None:
+                    f.write(tail_records.tobytes())
+                f.truncate()
+        return keep + len(new) - tail
+
+    def fetch(self, connector: 'BaseConnector', timeframe: str, limit: int) -> pd.DataFrame | None:
+        """
+        Đồng bộ store với connector rồi trả về `limit` nến cuối, cùng định dạng với `connector.fetch_ohlcv`.
+        Trả về None nếu connector không lấy được dữ liệu mới (tránh phân tích trên dữ liệu cũ).
+        """
+        symbol = connector.get_symbol()
+        key = (symbol, timeframe)
+        last = self.last_timestamp(symbol, timeframe)
+
+        backfill = last is None or (self.count(symbol, timeframe) < limit and self._backfilled.get(key, 0) < limit)
+        if not backfill:
+            since = last
+            while True:
+                fetched = connector.fetch_ohlcv_since(timeframe, since, limit)
+                if fetched is None:
+                    return None
+                if not self._continues(fetched, since):
+                    # Store bị tụt lại quá xa: trang này không nối liền với nến cuối đã lưu
+                    backfill = True
+                    break
+                self.write(symbol, timeframe, fetched)
+                # Connector trả đủ `limit` nến: có thể còn nến mới hơn, lấy tiếp trang sau
+                if len(fetched) < limit or fetched.index[-1] <= since:
+                    break
+                since = fetched.index[-1]
+
+        if backfill:
+            # Store trống, chưa đủ lịch sử hoặc có khoảng trống: tải đầy đủ `limit` nến cuối
+            fetched = connector.fetch_ohlcv(timeframe, limit)
+            if fetched is None:
+                return None
+            last = self.last_timestamp(symbol, timeframe)
+            # Vẫn không chạm tới nến cuối đã lưu thì ghi đè toàn bộ, không để lỗ hổng giữa lịch sử cũ và mới
+            self.write(symbol, timeframe, fetched, replace=last is not None and not self._continues(fetched, last))
+            self._backfilled[key] = max(self._backfilled.get(key, 0), limit)
+
+        return self.load(symbol, timeframe, limit=limit)
+
+    @staticmethod
+    def _continues(fetched: pd.DataFrame, last: pd.Timestamp) -> bool:
+        """Dữ liệu vừa tải có nối liền với nến cuối đã lưu `last` không (nến đầu không mới hơn `last`)."""
+        if fetched.attrs.get('incomplete'):
+            return False
+        if fetched.empty:
+            return True
+        return int(ohlcv_records(fetched.iloc[:1])['timestamp'][0]) <= pd.Timestamp(last).value
+
+
+# Tạo một instance duy nhất để sử dụng trong toàn bộ ứng dụng
+ohlcv_store = OHLCVStore(str(config_manager.get('data_store.directory', 'data_store') or 'data_store'))
+
+
+def load_ohlcv(connector: 'BaseConnector', timeframe: str, limit: int) -> pd.DataFrame | None:
+    """Lấy OHLCV qua kho nến cục bộ nếu `data_store.enabled` được bật, ngược lại gọi thẳng connector."""
+    if bool(config_manager.get('data_store.enabled', False)):
+        return ohlcv_store.fetch(connector, timeframe, limit)
+    return connector.fetch_ohlcv(timeframe, limit)
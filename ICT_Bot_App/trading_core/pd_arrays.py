@@ -1,31 +1,72 @@
 import pandas as pd
 import numpy as np
-from .market_structure import find_swings, detect_liquidity_sweep
+from .market_structure import _swing_points, liquidity_sweep_labels
+from .fvg_registry import fvg_mitigation_arrays
 
 # Displacement threshold: % of average candle range để xác định "strong move"
 DISPLACEMENT_THRESHOLD = 1.5  # 150% of average range = displacement
+DISPLACEMENT_LOOKBACK = 20   # Average range của 20 nến trước
+DISPLACEMENT_LOOKFORWARD = 3 # Số nến sau OB được kiểm tra displacement
+DISPLACEMENT_COLUMNS = ('displacement_bullish', 'displacement_bearish', 'displacement_strength')
+FVG_COLUMNS = ('fvg_bullish_high', 'fvg_bullish_low', 'fvg_bearish_high', 'fvg_bearish_low',
+               'fvg_bullish_mitigation', 'fvg_bearish_mitigation')
 
+# Tham số của detect_order_block
+OB_START_INDEX = 15          # Bắt đầu từ nến thứ 15
+OB_TAIL_SKIP = 5             # ... và bỏ qua 5 nến cuối
+OB_BOS_LOOKFORWARD = 5       # BOS trong 5 nến tiếp theo
+OB_FVG_LOOKFORWARD = 3       # FVG trong 3 nến tiếp theo
+OB_SWING_LENGTH = 10         # Swing dùng cho liquidity sweep
+SWEEP_LOOKBACK = 20          # Lookback của detect_liquidity_sweep
 
-def detect_fvg(df):
+
+def detect_fvg(df, min_gap_points: float = 0.0, point_value: float = 1.0):
     """
     Phát hiện Fair Value Gap (FVG).
+    FVG được ghi vào nến giữa (i-1) của bộ 3 nến (i-2, i-1, i). Cột 'fvg_bullish_mitigation' /
+    'fvg_bearish_mitigation' cho biết gap đã bị các nến sau lấp bao nhiêu tính tới nến cuối (1 = lấp hoàn toàn).
+
+    Args:
+        df: DataFrame
+        min_gap_points: Độ rộng gap tối thiểu (points). Gap nhỏ hơn bị bỏ qua.
+            Mặc định 0 = giữ mọi gap.
+        point_value: Giá trị 1 point của symbol (symbol_info.point)
     """
-    df['fvg_bullish_high'] = np.nan
-    df['fvg_bullish_low'] = np.nan
-    df['fvg_bearish_high'] = np.nan
-    df['fvg_bearish_low'] = np.nan
+    high = df['high'].to_numpy(dtype='float64')
+    low = df['low'].to_numpy(dtype='float64')
+    n = len(df)
+    min_gap = min_gap_points * point_value
 
-    for i in range(2, len(df)):
-        # Bullish FVG
-        if df['high'].iloc[i-2] < df['low'].iloc[i]:
-            df.loc[df.index[i-1], 'fvg_bullish_high'] = df['low'].iloc[i]
-            df.loc[df.index[i-1], 'fvg_bullish_low'] = df['high'].iloc[i-2]
+    bullish_high = np.full(n, np.nan)
+    bullish_low = np.full(n, np.nan)
+    bearish_high = np.full(n, np.nan)
+    bearish_low = np.full(n, np.nan)
 
-        # Bearish FVG
-        if df['low'].iloc[i-2] > df['high'].iloc[i]:
-            df.loc[df.index[i-1], 'fvg_bearish_high'] = df['low'].iloc[i-2]
-            df.loc[df.index[i-1], 'fvg_bearish_low'] = df['high'].iloc[i]
+    if n >= 3:
+        # Phần tử k của các mảng dưới ứng với bộ 3 nến (k, k+1, k+2)
+        first_high, first_low = high[:-2], low[:-2]
+        third_high, third_low = high[2:], low[2:]
 
+        # Bullish FVG: high nến 1 < low nến 3
+        bullish = first_high < third_low
+        if min_gap > 0:
+            bullish &= third_low - first_high >= min_gap
+        bullish_high[1:-1] = np.where(bullish, third_low, np.nan)
+        bullish_low[1:-1] = np.where(bullish, first_high, np.nan)
+
+        # Bearish FVG: low nến 1 > high nến 3
+        bearish = first_low > third_high
+        if min_gap > 0:
+            bearish &= first_low - third_high >= min_gap
+        bearish_high[1:-1] = np.where(bearish, first_low, np.nan)
+        bearish_low[1:-1] = np.where(bearish, third_high, np.nan)
+
+    df['fvg_bullish_high'] = bullish_high
+    df['fvg_bullish_low'] = bullish_low
+    df['fvg_bearish_high'] = bearish_high
+    df['fvg_bearish_low'] = bearish_low
+    for col, values in fvg_mitigation_arrays(high, low, bullish_high, bullish_low, bearish_high, bearish_low).items():
+        df[col] = values
     return df
 
 
@@ -82,6 +123,141 @@ def check_displacement(df, start_idx: int, direction: str, lookforward: int = 3)
     
     return False
 
+def _forward_any(mask: np.ndarray, positions: np.ndarray, length: int) -> np.ndarray:
+    """Có phần tử True trong `length` nến ngay sau mỗi vị trí hay không (đếm bằng cumsum)."""
+    counts = np.concatenate(([0], np.cumsum(mask)))
+    end = np.minimum(positions + length + 1, len(mask))
+    return counts[end] - counts[positions + 1] > 0
+
+
+def displacement_arrays(open_: np.ndarray, high: np.ndarray, low: np.ndarray, close: np.ndarray) -> dict:
+    """
+    Displacement cho mọi nến của frame trong một lượt (mảng dịch chuyển thay vì kiểm tra từng ứng viên):
+    - displacement_bullish / displacement_bearish[p]: check_displacement(df, p, hướng), tức trong
+      DISPLACEMENT_LOOKFORWARD nến sau p có nến cùng hướng với range hoặc body > DISPLACEMENT_THRESHOLD lần
+      average range của DISPLACEMENT_LOOKBACK nến trước p (luôn True khi chưa đủ 5 nến hoặc average range <= 0).
+    - displacement_strength[p]: max(range, body) lớn nhất của các nến đó chia cho average range (NaN nếu không tính được).
+    Average range bỏ qua NaN và giữ nguyên thứ tự cộng của Series.mean() trên từng đoạn nên kết quả giống hệt bản cũ.
+    """
+    n = len(close)
+    bullish = np.zeros(n, dtype=bool)
+    bearish = np.zeros(n, dtype=bool)
+    strength = np.full(n, np.nan)
+    positions = np.arange(max(0, n - DISPLACEMENT_LOOKFORWARD))
+    if not len(positions):
+        return {'displacement_bullish': bullish, 'displacement_bearish': bearish, 'displacement_strength': strength}
+
+    # Average range của min(DISPLACEMENT_LOOKBACK, p) nến trước (bỏ qua NaN như Series.mean)
+    candle_range = high - low
+    valid_range = ~np.isnan(candle_range)
+    filled_range = np.where(valid_range, candle_range, 0.0)
+    valid_count = np.concatenate(([0], np.cumsum(valid_range)))
+    lookback = np.minimum(positions, DISPLACEMENT_LOOKBACK)
+    range_sum = np.zeros(len(positions))
+    full = positions >= DISPLACEMENT_LOOKBACK
+    if full.any():
+        rolling_sum = np.lib.stride_tricks.sliding_window_view(filled_range, DISPLACEMENT_LOOKBACK).sum(axis=1)
+        range_sum[full] = rolling_sum[positions[full] - DISPLACEMENT_LOOKBACK]
+    for k in np.flatnonzero(~full & (positions >= 5)):
+        range_sum[k] = filled_range[:positions[k]].sum()
+    count = valid_count[positions] - valid_count[positions - lookback]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        avg_range = np.where(count > 0, range_sum / count, np.nan)
+
+    # Nến j "đủ mạnh" khi range hoặc body vượt ngưỡng: so sánh max(range, body) (fmax bỏ qua NaN như phép `or`)
+    threshold = avg_range * DISPLACEMENT_THRESHOLD
+    size = np.fmax(candle_range, np.abs(close - open_))
+    up = close > open_
+    down = close < open_
+    moved_up = np.zeros(len(positions), dtype=bool)
+    moved_down = np.zeros(len(positions), dtype=bool)
+    largest = np.full(len(positions), np.nan)
+    for offset in range(1, DISPLACEMENT_LOOKFORWARD + 1):
+        j = positions + offset
+        strong = size[j] > threshold
+        moved_up |= up[j] & strong
+        moved_down |= down[j] & strong
+        largest = np.fmax(largest, size[j])
+
+    # Không đủ data (lookback < 5) hoặc average range <= 0 thì bỏ qua kiểm tra
+    skip = (lookback < 5) | (avg_range <= 0)
+    bullish[positions] = skip | moved_up
+    bearish[positions] = skip | moved_down
+    with np.errstate(invalid='ignore', divide='ignore'):
+        strength[positions] = np.where(avg_range > 0, largest / avg_range, np.nan)
+    return {'displacement_bullish': bullish, 'displacement_bearish': bearish, 'displacement_strength': strength}
+
+
+def detect_displacement(df):
+    """Thêm các cột displacement_bullish, displacement_bearish, displacement_strength (xem displacement_arrays)."""
+    columns = displacement_arrays(df['open'].to_numpy(dtype='float64'), df['high'].to_numpy(dtype='float64'),
+                                  df['low'].to_numpy(dtype='float64'), df['close'].to_numpy(dtype='float64'))
+    for col, values in columns.items():
+        df[col] = values
+    return df
+
+
+def order_block_arrays(open_: np.ndarray, high: np.ndarray, low: np.ndarray, close: np.ndarray,
+                       swing_high: np.ndarray, swing_low: np.ndarray,
+                       bos_bullish: np.ndarray, bos_bearish: np.ndarray,
+                       fvg_bullish: np.ndarray, fvg_bearish: np.ndarray,
+                       displacement: dict | None = None) -> dict:
+    """
+    Engine Order Block trên mảng NumPy: các mask "BOS trong N nến tới",
+    "FVG trong N nến tới", liquidity sweep và displacement được tính một lần
+    cho mọi nến rồi kết hợp lại. `displacement` là kết quả displacement_arrays
+    nếu frame đã có (None = tính tại đây).
+
+    Returns:
+        dict các cột ob_bullish, ob_bearish, ob_zone_high, ob_zone_low,
+        liquidity_sweep, has_displacement (giống detect_order_block).
+    """
+    n = len(close)
+    ob_bullish = np.zeros(n, dtype=bool)
+    ob_bearish = np.zeros(n, dtype=bool)
+    zone_high = np.full(n, np.nan)
+    zone_low = np.full(n, np.nan)
+    sweep = np.full(n, 'none', dtype=object)
+    has_displacement = np.zeros(n, dtype=bool)
+
+    positions = np.arange(OB_START_INDEX, n - OB_TAIL_SKIP)
+    if len(positions):
+        # 1. Liquidity sweep (optional, chỉ để tracking)
+        sweep[positions] = liquidity_sweep_labels(high, low, swing_high, swing_low, SWEEP_LOOKBACK)[positions]
+
+        # 2. Nến ngược chiều + BOS + Imbalance (FVG)
+        down_candle = close[positions] < open_[positions]
+        up_candle = close[positions] > open_[positions]
+        bull_candidates = down_candle & _forward_any(bos_bullish, positions, OB_BOS_LOOKFORWARD) \
+            & _forward_any(fvg_bullish, positions, OB_FVG_LOOKFORWARD)
+        bear_candidates = up_candle & _forward_any(bos_bearish, positions, OB_BOS_LOOKFORWARD) \
+            & _forward_any(fvg_bearish, positions, OB_FVG_LOOKFORWARD)
+
+        # 3. Displacement: chỉ tra cứu cột đã tính cho các ứng viên
+        if displacement is None:
+            displacement = displacement_arrays(open_, high, low, close)
+        candidates = bull_candidates | bear_candidates
+        ob_pos = positions[candidates]
+        displaced = np.where(bull_candidates[candidates], displacement['displacement_bullish'][ob_pos],
+                             displacement['displacement_bearish'][ob_pos])
+        ob_pos = ob_pos[displaced]
+
+        ob_bullish[ob_pos] = bull_candidates[candidates][displaced]
+        ob_bearish[ob_pos] = bear_candidates[candidates][displaced]
+        zone_high[ob_pos] = high[ob_pos]
+        zone_low[ob_pos] = low[ob_pos]
+        has_displacement[ob_pos] = True
+
+    return {
+        'ob_bullish': ob_bullish,
+        'ob_bearish': ob_bearish,
+        'ob_zone_high': zone_high,
+        'ob_zone_low': zone_low,
+        'liquidity_sweep': sweep,
+        'has_displacement': has_displacement,
+    }
+
+
 def detect_order_block(df):
     """
     Phát hiện Order Block (OB) với các điều kiện ICT nâng cao.
@@ -95,110 +271,91 @@ def detect_order_block(df):
     Optional (đã bỏ requirement bắt buộc):
     - Liquidity Sweep: Quét thanh khoản đỉnh/đáy trước
     """
-    df['ob_bullish'] = False
-    df['ob_bearish'] = False
-    df['ob_zone_high'] = np.nan
-    df['ob_zone_low'] = np.nan
-    df['liquidity_sweep'] = 'none'
-    df['has_displacement'] = False
-
     # Đảm bảo đã có FVG
     if 'fvg_bullish_high' not in df.columns:
         df = detect_fvg(df)
 
-    df_with_swings = find_swings(df.copy())
+    high = df['high'].to_numpy(dtype='float64')
+    low = df['low'].to_numpy(dtype='float64')
+    if 'bos' in df.columns:
+        bos_bullish = (df['bos'] == 'bullish').to_numpy()
+        bos_bearish = (df['bos'] == 'bearish').to_numpy()
+    else:
+        bos_bullish = bos_bearish = np.zeros(len(df), dtype=bool)
 
-    for i in range(15, len(df_with_swings)-5): 
-        
-        # 1. KIỂM TRA LIQUIDITY SWEEP (optional, chỉ để tracking)
-        sweep_type = detect_liquidity_sweep(df_with_swings, i)
-        df.loc[df.index[i], 'liquidity_sweep'] = sweep_type
-
-        # 2. XÁC ĐỊNH OB VÀ KIỂM TRA BOS + IMBALANCE + DISPLACEMENT
-        
-        # --- Bullish OB ---
-        # Phải là nến giảm (down candle) trước đợt tăng mạnh
-        if df_with_swings['close'].iloc[i] < df_with_swings['open'].iloc[i]:
-            # Điều kiện a: Có BOS Bullish trong 5 nến tới?
-            bos_found = False
-            for j in range(i + 1, min(i + 6, len(df_with_swings))):
-                if 'bos' in df_with_swings.columns and df_with_swings['bos'].iloc[j] == 'bullish':
-                    bos_found = True
-                    break
-            
-            # Điều kiện b: Có FVG Bullish trong 3 nến tới?
-            fvg_found = False
-            for k in range(i + 1, min(i + 4, len(df_with_swings))):
-                if pd.notna(df_with_swings['fvg_bullish_high'].iloc[k]):
-                    fvg_found = True
-                    break
-
-            # Điều kiện c: Có Displacement (sự dịch chuyển mạnh)?
-            has_displacement = check_displacement(df_with_swings, i, 'bullish')
-
-            # Logic: BOS + FVG + Displacement = Valid OB
-            if bos_found and fvg_found and has_displacement:
-                df.loc[df.index[i], 'ob_bullish'] = True
-                df.loc[df.index[i], 'ob_zone_high'] = df_with_swings['high'].iloc[i]
-                df.loc[df.index[i], 'ob_zone_low'] = df_with_swings['low'].iloc[i]
-                df.loc[df.index[i], 'has_displacement'] = True
-
-        # --- Bearish OB ---
-        # Phải là nến tăng (up candle) trước đợt giảm mạnh
-        elif df_with_swings['close'].iloc[i] > df_with_swings['open'].iloc[i]:
-            # Điều kiện a: Có BOS Bearish trong 5 nến tới?
-            bos_found = False
-            for j in range(i + 1, min(i + 6, len(df_with_swings))):
-                if 'bos' in df_with_swings.columns and df_with_swings['bos'].iloc[j] == 'bearish':
-                    bos_found = True
-                    break
-            
-            # Điều kiện b: Có FVG Bearish trong 3 nến tới?
-            fvg_found = False
-            for k in range(i + 1, min(i + 4, len(df_with_swings))):
-                if pd.notna(df_with_swings['fvg_bearish_high'].iloc[k]):
-                    fvg_found = True
-                    break
-
-            # Điều kiện c: Có Displacement?
-            has_displacement = check_displacement(df_with_swings, i, 'bearish')
-
-            # Logic: BOS + FVG + Displacement = Valid OB
-            if bos_found and fvg_found and has_displacement:
-                df.loc[df.index[i], 'ob_bearish'] = True
-                df.loc[df.index[i], 'ob_zone_high'] = df_with_swings['high'].iloc[i]
-                df.loc[df.index[i], 'ob_zone_low'] = df_with_swings['low'].iloc[i]
-                df.loc[df.index[i], 'has_displacement'] = True
-                
+    columns = order_block_arrays(
+        df['open'].to_numpy(dtype='float64'), high, low, df['close'].to_numpy(dtype='float64'),
+        _swing_points(high, OB_SWING_LENGTH, np.max), _swing_points(low, OB_SWING_LENGTH, np.min),
+        bos_bullish, bos_bearish,
+        df['fvg_bullish_high'].notna().to_numpy(), df['fvg_bearish_high'].notna().to_numpy(),
+        {col: df[col].to_numpy() for col in DISPLACEMENT_COLUMNS} if set(DISPLACEMENT_COLUMNS) <= set(df.columns) else None)
+    for col, values in columns.items():
+        df[col] = values
     return df
 
-def detect_breaker_block(df):
+def _first_cross(close: np.ndarray, start: int, level: float, below: bool) -> int:
     """
-    Phát hiện Breaker Block (BB).
-    Là một OB đã bị phá vỡ.
+    Vị trí đầu tiên từ `start` có close < level (below) hoặc > level.
+    Tìm theo khối có kích thước tăng gấp đôi nên chi phí tỉ lệ với khoảng cách tới nến phá.
     """
-    df['bb_bullish'] = False
-    df['bb_bearish'] = False
+    size = 16
+    while start < len(close):
+        block = close[start:start + size]
+        crossed = block < level if below else block > level
+        if crossed.any():
+            return start + int(crossed.argmax())
+        start += size
+        size *= 2
+    return -1
 
-    ob_indices = [i for i in range(len(df)) if df['ob_bullish'].iloc[i] or df['ob_bearish'].iloc[i]]
 
-    for i in ob_indices:
-        ob_row = df.iloc[i]
-        zone_high = ob_row['ob_zone_high']
-        zone_low = ob_row['ob_zone_low']
+def breaker_arrays(close: np.ndarray, ob_bullish: np.ndarray, ob_bearish: np.ndarray,
+                   zone_high: np.ndarray, zone_low: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Breaker Block trên mảng NumPy.
+    OB có bị phá hay không được xác định bằng min/max của close phía sau (cumulative
+    ngược, bỏ qua NaN), sau đó chỉ tìm nến phá đầu tiên cho các OB đã bị phá.
 
-        if i + 1 >= len(df): continue
-            
-        subset_after_ob = df.iloc[i+1:]
-        
-        if ob_row['ob_bullish']: 
-            broken = subset_after_ob[subset_after_ob['close'] < zone_low]
-            if not broken.empty:
-                df.loc[df.index[i], 'bb_bearish'] = True 
-        
-        elif ob_row['ob_bearish']: 
-            broken = subset_after_ob[subset_after_ob['close'] > zone_high]
-            if not broken.empty:
-                df.loc[df.index[i], 'bb_bullish'] = True 
-    
+    Returns:
+        (bb_bullish, bb_bearish, break_pos) - break_pos là vị trí nến đầu tiên
+        đóng cửa phá qua OB, -1 nếu OB chưa bị phá.
+    """
+    n = len(close)
+    break_pos = np.full(n, -1, dtype=np.int64)
+    if n == 0:
+        return np.zeros(0, dtype=bool), np.zeros(0, dtype=bool), break_pos
+
+    future_min = np.append(np.fmin.accumulate(close[::-1])[::-1][1:], np.nan)
+    future_max = np.append(np.fmax.accumulate(close[::-1])[::-1][1:], np.nan)
+
+    # Bullish OB bị phá xuống thành Bearish BB và ngược lại
+    bb_bearish = ob_bullish & (future_min < zone_low)
+    bb_bullish = ob_bearish & ~ob_bullish & (future_max > zone_high)
+
+    for p in np.flatnonzero(bb_bearish):
+        break_pos[p] = _first_cross(close, p + 1, zone_low[p], below=True)
+    for p in np.flatnonzero(bb_bullish):
+        break_pos[p] = _first_cross(close, p + 1, zone_high[p], below=False)
+    return bb_bullish, bb_bearish, break_pos
+
+
+def breaker_break_times(index: pd.Index, break_pos: np.ndarray) -> pd.Index:
+    """Thời điểm nến phá OB theo `break_pos` (NaT nếu chưa bị phá)."""
+    broken = break_pos >= 0
+    return index[np.where(broken, break_pos, 0)].where(broken)
+
+
+def detect_breaker_block(df):
+    """
+    Phát hiện Breaker Block (BB).
+    Là một OB đã bị phá vỡ. Cột 'bb_break_time' lưu thời điểm nến đầu tiên
+    đóng cửa phá qua OB (NaT nếu chưa bị phá) để tính tuổi của breaker.
+    """
+    bb_bullish, bb_bearish, break_pos = breaker_arrays(
+        df['close'].to_numpy(dtype='float64'),
+        df['ob_bullish'].to_numpy(dtype=bool), df['ob_bearish'].to_numpy(dtype=bool),
+        df['ob_zone_high'].to_numpy(dtype='float64'), df['ob_zone_low'].to_numpy(dtype='float64'))
+    df['bb_bullish'] = bb_bullish
+    df['bb_bearish'] = bb_bearish
+    df['bb_break_time'] = breaker_break_times(df.index, break_pos)
     return df
@@ -0,0 +1,149 @@
+import numpy as np
+import pandas as pd
+
+# Loại POI theo thứ tự evaluate_signal xét (mã `type` là vị trí trong tuple)
+POI_TYPES = ('OB', 'FVG', 'BB')
+DIRECTIONS = {'bullish': 1, 'bearish': -1}
+
+POI_DTYPE = np.dtype([
+    ('type', np.int8),              # Vị trí trong POI_TYPES
+    ('direction', np.int8),         # 1 = bullish, -1 = bearish
+    ('high', np.float64),
+    ('low', np.float64),
+    ('stop', np.float64),           # Mức tham chiếu đặt SL (mép xa của zone, FVG ưu tiên OB cùng nến)
+    ('time', 'datetime64[ns]'),     # Thời điểm mở nến tạo zone (UTC, không tz)
+    ('mitigated', np.bool_),        # OB đã bị close phá qua (đã thành breaker), FVG đã bị lấp hoàn toàn
+    ('break_time', 'datetime64[ns]'),
+    ('sweep', 'U7'),                # liquidity_sweep của nến tạo zone
+])
+
+
+def _utc_ns(values) -> np.ndarray:
+    """Index/cột thời gian -> datetime64[ns] UTC không tz (NaT giữ nguyên)."""
+    if getattr(values, 'dtype', None) == object:
+        values = pd.DatetimeIndex(values)
+    if getattr(values, 'tz', None) is not None:
+        values = values.tz_convert('UTC').tz_localize(None)
+    return np.asarray(values, dtype='datetime64[ns]')
+
+
+# Các cột của frame đã phân tích mà chỉ mục cần
+POI_COLUMNS = ('ob_bullish', 'ob_bearish', 'bb_bullish', 'bb_bearish', 'ob_zone_high', 'ob_zone_low', 'bb_break_time',
+               'liquidity_sweep', 'fvg_bullish_high', 'fvg_bullish_low', 'fvg_bearish_high', 'fvg_bearish_low',
+               'fvg_bullish_mitigation', 'fvg_bearish_mitigation')
+
+
+def poi_zones(columns: dict, index) -> np.ndarray:
+    """
+    Mảng có cấu trúc (POI_DTYPE) của mọi OB/FVG/BB trong một frame đã phân tích, cũ trước mới sau trong từng nhóm.
+    `columns` là dict cột (như IncrementalAnalyzer.frame() dựng); cột thiếu thì loại zone tương ứng bị bỏ qua.
+    """
+    n = len(index)
+    nan = np.full(n, np.nan)
+    ob_high = np.asarray(columns.get('ob_zone_high', nan), dtype=np.float64)
+    ob_low = np.asarray(columns.get('ob_zone_low', nan), dtype=np.float64)
+
+    # OB bị phá theo bb_break_time; BB không đánh dấu; FVG theo cột mức lấp gap (1 = lấp hoàn toàn)
+    no_flag = np.zeros(n, dtype=bool)
+    if 'bb_break_time' in columns:
+        broken = ~np.isnat(_utc_ns(columns['bb_break_time']))
+    else:
+        broken = no_flag
+
+    # Mỗi nhóm: (loại, hướng, mask, high, low, stop, mitigated)
+    groups = []
+    if 'ob_bullish' in columns:
+        groups.append(('OB', 'bullish', columns['ob_bullish'], ob_high, ob_low, ob_low, broken))
+        groups.append(('OB', 'bearish', columns['ob_bearish'], ob_high, ob_low, ob_high, broken))
+    if 'bb_bullish' in columns:
+        groups.append(('BB', 'bullish', columns['bb_bullish'], ob_high, ob_low, ob_low, no_flag))
+        groups.append(('BB', 'bearish', columns['bb_bearish'], ob_high, ob_low, ob_high, no_flag))
+    for direction in ('bullish', 'bearish'):
+        if f'fvg_{direction}_high' not in columns:
+            continue
+        fvg_high = np.asarray(columns[f'fvg_{direction}_high'], dtype=np.float64)
+        fvg_low = np.asarray(columns[f'fvg_{direction}_low'], dtype=np.float64)
+        # SL theo FVG dùng mép của OB cùng nến nếu có (như khi đọc dòng của df_main)
+        ob_edge, fvg_edge = (ob_low, fvg_low) if direction == 'bullish' else (ob_high, fvg_high)
+        stop = np.where(np.isnan(ob_edge), fvg_edge, ob_edge)
+        mitigation = columns.get(f'fvg_{direction}_mitigation')
+        filled = no_flag if mitigation is None else np.asarray(mitigation, dtype=np.float64) >= 1.0
+        groups.append(('FVG', direction, ~np.isnan(fvg_high), fvg_high, fvg_low, stop, filled))
+
+    positions = [np.flatnonzero(np.asarray(mask, dtype=bool)) for _, _, mask, *_ in groups]
+    if not positions:
+        return np.zeros(0, dtype=POI_DTYPE)
+    zones = np.zeros(sum(len(p) for p in positions), dtype=POI_DTYPE)
+    rows = np.concatenate(positions)
+    zones['type'] = np.repeat([POI_TYPES.index(g[0]) for g in groups], [len(p) for p in positions])
+    zones['direction'] = np.repeat([DIRECTIONS[g[1]] for g in groups], [len(p) for p in positions])
+    zones['high'] = np.concatenate([g[3][p] for g, p in zip(groups, positions)])
+    zones['low'] = np.concatenate([g[4][p] for g, p in zip(groups, positions)])
+    zones['stop'] = np.concatenate([g[5][p] for g, p in zip(groups, positions)])
+    zones['time'] = _utc_ns(index)[rows]
+    zones['mitigated'] = np.concatenate([g[6][p] for g, p in zip(groups, positions)])
+
+    # OB/BB mang thời điểm nến phá OB
+    has_break = np.repeat([g[0] != 'FVG' for g in groups], [len(p) for p in positions])
+    if 'bb_break_time' in columns and has_break.any():
+        zones['break_time'] = np.where(has_break, _utc_ns(columns['bb_break_time'])[rows], np.datetime64('NaT', 'ns'))
+    else:
+        zones['break_time'] = np.datetime64('NaT', 'ns')
+    sweep = columns.get('liquidity_sweep')
+    zones['sweep'] = 'none' if sweep is None else np.asarray(sweep, dtype=object)[rows].astype(str)
+    return zones
+
+
+class PoiIndex:
+    """
+    Chỉ mục các vùng POI (OB, FVG, BB) của một frame, sắp theo (loại, hướng, thời gian).
+
+    Mỗi nhóm (loại, hướng) giữ thêm min trượt về phía sau của low (bullish) hoặc của -high (bearish):
+    dãy này không giảm nên "zone mới nhất có low < X" (hay high > X) là một lần tìm kiếm nhị phân,
+    evaluate_signal không phải lọc cả DataFrame cho từng loại POI và từng hướng.
+    """
+
+    def __init__(self, zones: np.ndarray):
+        order = np.lexsort((zones['time'], zones['direction'], zones['type']))
+        self.zones = zones[order]
+        self._groups: dict[tuple, tuple[np.ndarray, np.ndarray]] = {}
+
+    @classmethod
+    def from_arrays(cls, columns, index) -> 'PoiIndex':
+        return cls(poi_zones(columns, index))
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame) -> 'PoiIndex':
+        return cls(poi_zones({col: df[col].to_numpy() for col in POI_COLUMNS if col in df.columns}, df.index))
+
+    def __len__(self) -> int:
+        return len(self.zones)
+
+    def _group(self, kind: str, direction: str, unmitigated: bool) -> tuple[np.ndarray, np.ndarray]:
+        key = (kind, direction, unmitigated)
+        group = self._groups.get(key)
+        if group is None:
+            zones = self.zones
+            selected = (zones['type'] == POI_TYPES.index(kind)) & (zones['direction'] == DIRECTIONS[direction])
+            if unmitigated:
+                selected &= ~zones['mitigated']
+            zones = zones[selected]
+            edge = zones['low'] if direction == 'bullish' else -zones['high']
+            # fmin bỏ qua NaN: zone có mép NaN không bao giờ thỏa điều kiện
+            group = (zones, np.fmin.accumulate(edge[::-1])[::-1])
+            self._groups[key] = group
+        return group
+
+    def select(self, kind: str, direction: str, unmitigated: bool = False) -> np.ndarray:
+        """Các zone loại `kind` ('OB'/'FVG'/'BB') hướng `direction` ('bullish'/'bearish'), cũ trước mới sau."""
+        return self._group(kind, direction, unmitigated)[0]
+
+    def latest(self, kind: str, direction: str, level: float, unmitigated: bool = False) -> np.void | None:
+        """
+        Zone mới nhất loại `kind` hướng `direction` nằm về phía `level`: bullish cần low < level,
+        bearish cần high > level. unmitigated=True bỏ qua các zone đã bị phá. None nếu không có.
+        """
+        zones, suffix_min = self._group(kind, direction, unmitigated)
+        target = level if direction == 'bullish' else -level
+        pos = int(np.searchsorted(suffix_min, target, side='left')) - 1
+        return zones[pos] if pos >= 0 else None
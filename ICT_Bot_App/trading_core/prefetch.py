@@ -0,0 +1,92 @@
+import asyncio
+import pandas as pd
+
+from app.config_manager import config_manager
+from .connectors.async_connector import AsyncBaseConnector
+from .data_source import FrameConnector
+from .strategy import execute_strategy
+
+# Số nến mỗi chu kỳ chiến lược cần cho execute_strategy (khung chính/nhỏ/HTF). D1/W1 không tải trước:
+# liquidity_levels chỉ cần chúng khi sang ngày giao dịch mới (PrefetchedConnector tải khi được hỏi).
+STRATEGY_LIMITS = {'main': 201, 'small': 101, 'htf': 201}
+
+
+def strategy_limits() -> dict[str, int]:
+    """timeframe -> số nến cần tải cho một chu kỳ theo cấu hình hiện tại (gộp các khung trùng nhau)."""
+    timeframes = {
+        'main': config_manager.get('trading.timeframe', 'H1') or 'H1',
+        'small': config_manager.get('trading.timeframe_smaller', 'M15') or 'M15',
+        'htf': config_manager.get('trading.htf_timeframe', 'H4') or 'H4',
+    }
+    if str(config_manager.get('trading.trading_mode', 'ICT')).upper() == 'QUANT':
+        timeframes = {'main': config_manager.get('trading.timeframe', '1h') or '1h'}
+    limits = {}
+    for role, timeframe in timeframes.items():
+        limits[timeframe] = max(limits.get(timeframe, 0), STRATEGY_LIMITS[role])
+    return limits
+
+
+class PrefetchedConnector(FrameConnector):
+    """
+    Connector đồng bộ trả về dữ liệu đã tải sẵn cho một chu kỳ (nến, symbol info, số dư, vị thế),
+    để execute_strategy chạy không cần round trip nào; chỉ place_order và nến của khung không được tải trước
+    (D1/W1 khi liquidity_levels sang ngày mới) được gửi tới sàn qua connector async.
+    """
+
+    def __init__(self, connector: AsyncBaseConnector, loop: asyncio.AbstractEventLoop, data: dict):
+        super().__init__(connector.get_symbol(), data['frames'], data['symbol_info'])
+        self.connector = connector
+        self.loop = loop
+        self.balance = data['balance']
+        self.positions = data['positions']
+
+    def get_account_balance(self) -> float | None:
+        return self.balance
+
+    def get_open_positions(self) -> list | None:
+        return self.positions
+
+    def fetch_ohlcv(self, timeframe: str, limit: int) -> pd.DataFrame | None:
+        if timeframe in self.frames:
+            return super().fetch_ohlcv(timeframe, limit)
+        future = asyncio.run_coroutine_threadsafe(self.connector.fetch_ohlcv(timeframe, limit), self.loop)
+        return future.result()
+
+    def place_order(self, order_type: str, quantity: float, sl_price: float, tp_price: float, comment: str = "") -> str | int | None:
+        # Gọi từ thread chạy execute_strategy: gửi coroutine về event loop và chờ kết quả
+        future = asyncio.run_coroutine_threadsafe(
+            self.connector.place_order(order_type, quantity, sl_price, tp_price, comment=comment), self.loop)
+        return future.result()
+
+
+async def prefetch_strategy_data(connector: AsyncBaseConnector, limits: dict[str, int] | None = None) -> dict:
+    """
+    Gửi đồng thời (asyncio.gather) mọi request một chu kỳ chiến lược cần: nến của từng khung,
+    symbol info, số dư và vị thế. Thời gian chờ xấp xỉ một round trip thay vì tổng các round trip.
+    """
+    limits = strategy_limits() if limits is None else limits
+    timeframes = list(limits)
+    results = await asyncio.gather(
+        *(connector.fetch_ohlcv(timeframe, limits[timeframe]) for timeframe in timeframes),
+        connector.get_symbol_info(),
+        connector.get_account_balance(),
+        connector.get_open_positions(),
+    )
+    frames = {timeframe: df for timeframe, df in zip(timeframes, results) if df is not None}
+    symbol_info, balance, positions = results[len(timeframes):]
+    return {'frames': frames, 'symbol_info': symbol_info, 'balance': balance, 'positions': positions}
+
+
+async def execute_strategy_async(connector: AsyncBaseConnector, signals=None) -> None:
+    """
+    Một chu kỳ execute_strategy với dữ liệu tải trước bằng prefetch_strategy_data.
+    Phần phân tích chạy trên thread riêng để không chặn event loop (lệnh đặt được gửi ngược về loop).
+    """
+    data = await prefetch_strategy_data(connector)
+    if data['positions'] is None:
+        if signals:
+            signals.log_message.emit("Không lấy được vị thế, bỏ qua chu kỳ.")
+        return
+    prefetched = PrefetchedConnector(connector, asyncio.get_running_loop(), data)
+    await asyncio.to_thread(execute_strategy, prefetched, signals)
+
@@ -0,0 +1,216 @@
+import copy
+import multiprocessing
+import time
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor, as_completed, wait
+import numpy as np
+import pandas as pd
+
+from app.config_manager import config_manager
+from .backtest_sweep import snapshot_symbol_info
+from .connectors.caching_connector import CachingConnector, cached_connector
+from .data_source import FrameConnector
+from .liquidity_levels import liquidity_levels
+from .strategy import analyze_strategy_data, execute_quant_strategy, fetch_strategy_data, place_strategy_orders, reset_live_analysis
+
+from typing import TYPE_CHECKING
+if TYPE_CHECKING:
+    from .connectors.base_connector import BaseConnector
+
+
+
+def analyze_symbol(symbol: str, frames: dict[str, pd.DataFrame], symbol_info: object | None,
+                   htf_levels: dict | None = None, config: tuple[int, dict] | None = None) -> tuple[tuple, float]:
+    """
+    Phân tích một symbol trên dữ liệu đã tải (chạy được trong tiến trình con).
+    `htf_levels` là các mức thanh khoản HTF đã tính ở tiến trình chính (liquidity_levels),
+    `config` là config_manager.snapshot() của tiến trình chính: khi version đổi, tiến trình con
+    dùng cấu hình mới và bỏ các analyzer/kết quả phân tích đã cache theo cấu hình cũ.
+    Trả về (kết quả evaluate_signal, thời gian phân tích tính bằng giây).
+    """
+    started = time.perf_counter()
+    if config is not None and config_manager.apply_snapshot(config):
+        reset_live_analysis()
+    connector = FrameConnector(symbol, frames, symbol_info)
+    result = analyze_strategy_data(symbol, frames, connector, htf_levels=htf_levels)
+    return result, time.perf_counter() - started
+
+
+class SymbolState:
+    """Trạng thái live của một symbol: số lệnh đang mở, hạ nhiệt sau khi đóng lệnh, độ trễ của chu kỳ gần nhất."""
+
+    def __init__(self, symbol: str, connector: 'BaseConnector'):
+        self.symbol = symbol
+        self.connector = connector
+        self.previous_position_count = 0
+        self.last_trade_close_time: float | None = None
+        self.last_report: dict = {}
+
+
+class MultiSymbolScanner:
+    """
+    Quét đồng thời một danh sách symbol mỗi chu kỳ:
+    thread pool cho I/O với sàn (vị thế, nến, đặt lệnh), process pool cho phân tích ICT.
+
+    Mỗi symbol luôn được phân tích trong cùng một tiến trình con (chọn cố định theo tên symbol)
+    để các IncrementalAnalyzer/analysis_cache trong tiến trình đó được dùng lại giữa các chu kỳ.
+    analysis_workers = 0 thì phân tích ngay trong thread I/O; place_orders = False chỉ ghi log tín hiệu (đo độ trễ).
+    """
+
+    def __init__(self, connector: 'BaseConnector', symbols: list[str], io_workers: int = 8, analysis_workers: int | None = None,
+                 cooldown_period: float = 1800, place_orders: bool = True, signals=None):
+        self.signals = signals
+        self.place_orders = place_orders
+        self.cooldown_period = cooldown_period
+        # Connector đã kết nối được sao chép cho từng symbol (cùng phiên với sàn, chỉ khác symbol),
+        # mỗi symbol có cache metadata riêng (connector_cache)
+        self.states: dict[str, SymbolState] = {}
+        for symbol in dict.fromkeys(symbols):
+            symbol_connector = copy.copy(connector)
+            symbol_connector.symbol = symbol
+            self.states[symbol] = SymbolState(symbol, cached_connector(symbol_connector))
+
+        self._io_pool = ThreadPoolExecutor(max_workers=max(1, io_workers), thread_name_prefix='scanner-io')
+        if analysis_workers is None:
+            analysis_workers = min(multiprocessing.cpu_count(), len(self.states))
+        context = multiprocessing.get_context('spawn')
+        self._analysis_pools = [ProcessPoolExecutor(max_workers=1, mp_context=context) for _ in range(max(0, analysis_workers))]
+        self.last_cycle_seconds = 0.0
+
+    def log(self, message: str) -> None:
+        if self.signals:
+            self.signals.log_message.emit(message)
+        else:
+            print(message)
+
+    def _analysis_pool(self, symbol: str) -> ProcessPoolExecutor | None:
+        if not self._analysis_pools:
+            return None
+        return self._analysis_pools[sum(symbol.encode('utf-8')) % len(self._analysis_pools)]
+
+    def _prepare(self, state: SymbolState) -> dict | None:
+        """
+        I/O của symbol trước khi phân tích: cập nhật số lệnh/hạ nhiệt, tải nến và symbol info.
+        Trả về None nếu symbol không cần phân tích ở chu kỳ này (lý do ghi vào state.last_report).
+        """
+        connector = state.connector
+        positions = connector.get_open_positions()
+        if positions is None:
+            state.last_report['status'] = 'Lỗi kết nối'
+            return None
+
+        if len(positions) < state.previous_position_count:
+            state.last_trade_close_time = time.time()
+            self.log(f"[{state.symbol}] Phát hiện lệnh vừa đóng. Kích hoạt hạ nhiệt {self.cooldown_period/60} phút.")
+        state.previous_position_count = len(positions)
+
+        if positions:
+            state.last_report['status'] = 'Đang có lệnh'
+            return None
+        if state.last_trade_close_time:
+            if time.time() - state.last_trade_close_time < self.cooldown_period:
+                state.last_report['status'] = 'Đang hạ nhiệt'
+                return None
+            state.last_trade_close_time = None
+
+        if str(config_manager.get('trading.trading_mode', 'ICT')).upper() == 'QUANT':
+            # Chiến lược Quant chỉ tính vài chỉ báo, chạy trọn trong thread I/O
+            if self.place_orders:
+                execute_quant_strategy(connector, self.signals)
+            state.last_report['status'] = 'Đã quét (Quant)'
+            return None
+
+        frames = fetch_strategy_data(connector)
+        if frames is None:
+            state.last_report['status'] = 'Không có dữ liệu'
+            return None
+        # Mức PDH/PDL/PWH/PWL cache theo ngày giao dịch: D1/W1 chỉ được tải khi sang ngày mới
+        htf_levels = liquidity_levels.get(connector, frames['main'])
+        return {'frames': frames, 'symbol_info': snapshot_symbol_info(connector.get_symbol_info()), 'htf_levels': htf_levels}
+
+    def _scan_symbol(self, state: SymbolState) -> Future | None:
+        """Chạy phần I/O và gửi phần phân tích sang tiến trình của symbol. Ghi độ trễ vào state.last_report."""
+        started = time.perf_counter()
+        state.last_report = {'symbol': state.symbol, 'status': 'Đã quét', 'signal': 'none',
+                             'fetch_ms': np.nan, 'analysis_ms': np.nan, 'order_ms': np.nan, 'total_ms': np.nan,
+                             'round_trips': np.nan}
+        if isinstance(state.connector, CachingConnector):
+            state.connector.begin_cycle()
+        payload = self._prepare(state)
+        state.last_report['fetch_ms'] = (time.perf_counter() - started) * 1000
+        if payload is None:
+            return None
+        pool = self._analysis_pool(state.symbol)
+        if pool is None:
+            future: Future = Future()
+            future.set_result(analyze_symbol(state.symbol, payload['frames'], payload['symbol_info'], payload['htf_levels']))
+            return future
+        # Tiến trình con giữ bản cấu hình riêng: gửi kèm cấu hình hiện tại để nó biết khi cấu hình được lưu lại
+        return pool.submit(analyze_symbol, state.symbol, payload['frames'], payload['symbol_info'], payload['htf_levels'],
+                           config_manager.snapshot())
+
+    def _place(self, state: SymbolState, analysis: Future, cycle_start: float, done: Future) -> None:
+        """Đặt lệnh theo kết quả phân tích (chạy trên thread I/O ngay khi symbol phân tích xong)."""
+        try:
+            (signal, entry_price, sl_price, reason), analysis_seconds = analysis.result()
+            state.last_report['analysis_ms'] = analysis_seconds * 1000
+            state.last_report['signal'] = signal
+            started = time.perf_counter()
+            if signal != 'none' and entry_price is not None and sl_price is not None:
+                self.log(f"[{state.symbol}] Tín hiệu {signal.upper()} @ {entry_price:.5f} | {reason}")
+                if self.place_orders:
+                    place_strategy_orders(state.connector, signal, entry_price, sl_price, reason, self.signals)
+            state.last_report['order_ms'] = (time.perf_counter() - started) * 1000
+        except Exception as e:
+            state.last_report['status'] = f"Lỗi: {e}"
+        finally:
+            self._finish(state, cycle_start)
+            done.set_result(None)
+
+    def _finish(self, state: SymbolState, cycle_start: float) -> None:
+        """Ghi thời gian từ đầu chu kỳ và số round trip tới sàn của symbol trong chu kỳ."""
+        state.last_report['total_ms'] = (time.perf_counter() - cycle_start) * 1000
+        if isinstance(state.connector, CachingConnector):
+            state.last_report['round_trips'] = sum(state.connector.cycle_round_trips.values())
+
+    def run_cycle(self) -> pd.DataFrame:
+        """
+        Quét mọi symbol một lần. Trả về bảng độ trễ theo symbol
+        (fetch_ms, analysis_ms, order_ms; total_ms tính từ đầu chu kỳ tới khi symbol xong), số round trip tới sàn
+        và trạng thái/tín hiệu.
+        """
+        cycle_start = time.perf_counter()
+        io_futures = {self._io_pool.submit(self._scan_symbol, state): state for state in self.states.values()}
+        pending = []
+
+        for future in as_completed(io_futures):
+            state = io_futures[future]
+            try:
+                analysis = future.result()
+            except Exception as e:
+                state.last_report['status'] = f"Lỗi: {e}"
+                analysis = None
+            if analysis is None:
+                self._finish(state, cycle_start)
+                continue
+            # Symbol phân tích xong thì đặt lệnh ngay, không chờ các symbol khác
+            done: Future = Future()
+            pending.append(done)
+            analysis.add_done_callback(
+                lambda analysis, state=state, done=done: self._io_pool.submit(self._place, state, analysis, cycle_start, done))
+
+        wait(pending)
+        self.last_cycle_seconds = time.perf_counter() - cycle_start
+        return pd.DataFrame([state.last_report for state in self.states.values()])
+
+    def stats_message(self, report: pd.DataFrame, interval_seconds: float) -> str:
+        """Tóm tắt một chu kỳ: thời gian cả chu kỳ, độ trễ trung vị/lớn nhất và chu kỳ có theo kịp nhịp quét hay không."""
+        total = report['total_ms'].dropna() if 'total_ms' in report else pd.Series(dtype=float)
+        slowest = report.loc[report['total_ms'].idxmax(), 'symbol'] if len(total) else '-'
+        status = "OK" if self.last_cycle_seconds <= interval_seconds else "CHẬM HƠN NHỊP QUÉT"
+        return (f"[Scanner] {len(report)} symbol | chu kỳ {self.last_cycle_seconds:.2f}s / {interval_seconds:.0f}s ({status}) | "
+                f"trễ trung vị {total.median() if len(total) else 0:.0f}ms, lớn nhất {total.max() if len(total) else 0:.0f}ms ({slowest})")
+
+    def close(self) -> None:
+        self._io_pool.shutdown(wait=True)
+        for pool in self._analysis_pools:
+            pool.shutdown(wait=True, cancel_futures=True)
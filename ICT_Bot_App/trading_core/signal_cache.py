@@ -0,0 +1,68 @@
+import hashlib
+import json
+import os
+import threading
+import pandas as pd
+
+from app.config_manager import config_manager
+from .ohlcv_store import ohlcv_records
+
+# Tăng khi logic tìm tín hiệu (strategy/market_structure/pd_arrays...) thay đổi để bỏ các bảng cũ
+SIGNAL_CACHE_VERSION = 3
+SIGNAL_COLUMNS = ['side', 'entry', 'sl', 'reason']
+# Các key cấu hình ảnh hưởng tới tín hiệu; TP, chốt lời từng phần, số lệnh, kill zone chỉ dùng khi mô phỏng lệnh
+SIGNAL_CONFIG_KEYS = (
+    'trading.trading_mode', 'trading.sl_buffer_points', 'trading.min_fvg_gap_points', 'trading.fvg_skip_filled',
+    'trading.ote_enabled', 'trading.ote_level_primary',
+    'trading.quant_sma_fast', 'trading.quant_sma_slow', 'trading.quant_rsi_period',
+)
+
+
+def empty_signals() -> pd.DataFrame:
+    return pd.DataFrame(columns=SIGNAL_COLUMNS, index=pd.DatetimeIndex([], name='timestamp'))
+
+
+def signal_cache_key(frames: list[pd.DataFrame], params: dict) -> str:
+    """Khóa của bảng tín hiệu: hash dữ liệu OHLCV của các khung + tham số chiến lược (params và SIGNAL_CONFIG_KEYS)."""
+    digest = hashlib.blake2b(digest_size=16)
+    settings = {key: config_manager.get(key) for key in SIGNAL_CONFIG_KEYS}
+    digest.update(json.dumps({'version': SIGNAL_CACHE_VERSION, 'params': params, 'config': settings},
+                             sort_keys=True, default=str).encode('utf-8'))
+    for df in frames:
+        digest.update(ohlcv_records(df).tobytes())
+    return digest.hexdigest()
+
+
+class SignalCache:
+    """
+    Bảng tín hiệu ứng viên của backtest (timestamp, side, entry, sl, reason) lưu trên đĩa theo khóa.
+    Bước tìm tín hiệu chỉ chạy lại khi dữ liệu hoặc tham số chiến lược đổi; đổi TP/quản lý lệnh chỉ cần mô phỏng lại.
+    """
+
+    def __init__(self, directory: str = 'signal_cache'):
+        self.directory = directory
+        self._lock = threading.Lock()
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.pkl")
+
+    def load(self, key: str) -> pd.DataFrame | None:
+        path = self.path(key)
+        if not os.path.exists(path):
+            return None
+        try:
+            return pd.read_pickle(path)
+        except Exception:
+            return None
+
+    def save(self, key: str, candidates: pd.DataFrame) -> None:
+        # Ghi ra file tạm rồi đổi tên: các tiến trình sweep có thể ghi cùng một khóa cùng lúc
+        with self._lock:
+            os.makedirs(self.directory, exist_ok=True)
+            tmp_path = f"{self.path(key)}.{os.getpid()}.{threading.get_ident()}.tmp"
+            candidates.to_pickle(tmp_path)
+            os.replace(tmp_path, self.path(key))
+
+
+# Tạo một instance duy nhất để sử dụng trong toàn bộ ứng dụng
+signal_cache = SignalCache(str(config_manager.get('signal_cache.directory', 'signal_cache') or 'signal_cache'))
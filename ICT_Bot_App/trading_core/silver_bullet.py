@@ -1,30 +1,13 @@
-from datetime import datetime
 import pandas as pd
-import pytz
 from .pd_arrays import detect_fvg
-
-# Khung giờ Silver Bullet (EST)
-SILVER_BULLET_WINDOWS = [
-    {'name': 'London Open', 'start': 3, 'end': 4},      # 03:00 - 04:00
-    {'name': 'NY AM Session', 'start': 10, 'end': 11},  # 10:00 - 11:00
-    {'name': 'NY PM Session', 'start': 14, 'end': 15}   # 14:00 - 15:00
-]
+from .time_filter import silver_bullet_mask
 
 def is_silver_bullet_time(timestamp):
     """
     Kiểm tra xem thời gian hiện tại có nằm trong khung Silver Bullet không.
     """
-    if timestamp.tzinfo is None:
-        timestamp = pytz.utc.localize(timestamp)
-        
-    ny_tz = pytz.timezone('America/New_York')
-    ny_time = timestamp.astimezone(ny_tz)
-    
-    for window in SILVER_BULLET_WINDOWS:
-        if window['start'] <= ny_time.hour < window['end']:
-            return True, window['name']
-            
-    return False, None
+    in_window, names = silver_bullet_mask([timestamp])
+    return bool(in_window[0]), names[0]
 
 def detect_silver_bullet_setup(df, current_price, bias, signals=None):
     """
@@ -40,7 +23,12 @@ def detect_silver_bullet_setup(df, current_price, bias, signals=None):
     last_candle = df.iloc[-1]
     current_time = last_candle.name # Timestamp index
     
-    in_window, window_name = is_silver_bullet_time(current_time)
+    if 'silver_bullet' in df.columns:
+        # Khung Silver Bullet đã tính sẵn cho cả frame bằng silver_bullet_mask
+        window_name = df['silver_bullet'].iloc[-1]
+        in_window = window_name is not None and not pd.isna(window_name)
+    else:
+        in_window, window_name = is_silver_bullet_time(current_time)
     
     if not in_window:
         return False, None, None
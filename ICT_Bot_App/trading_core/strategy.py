@@ -1,11 +1,16 @@
 from .market_structure import (
     get_current_bias, detect_bos_choch, find_swings, get_dealing_range, 
     is_in_premium_or_discount, calculate_ote_levels, is_price_in_ote_zone, 
-    get_recent_swing_range, detect_equal_highs_lows, detect_liquidity_sweep,
-    get_htf_bias, get_htf_liquidity_levels, get_draw_on_liquidity
+    get_recent_swing_range, detect_equal_highs_lows, detect_liquidity_sweeps,
+    get_htf_liquidity_levels, get_draw_on_liquidity
 )
-from .pd_arrays import detect_fvg, detect_order_block, detect_breaker_block
+from .pd_arrays import FVG_COLUMNS, detect_fvg, detect_displacement, detect_order_block, detect_breaker_block
+from .fvg_registry import OpenGaps
+from .poi_index import POI_TYPES, PoiIndex
 from .silver_bullet import detect_silver_bullet_setup
+from .incremental_analyzer import IncrementalAnalyzer
+from .analysis_cache import analysis_cache
+from .ohlcv_store import load_ohlcv
 # Xóa import tĩnh tĩnh config_loader
 # Các tham số cấu hình sẽ được đọc động từ config_manager
 
@@ -88,7 +93,8 @@ def calculate_partial_orders(
 ) -> list[dict]:
     if not bool(config_manager.get('trading.partial_profits_enabled', False)):
         sl_distance = abs(entry_price - sl_price)
-        tp = entry_price + (sl_distance * TAKE_PROFIT_RR) if signal == 'long' else entry_price - (sl_distance * TAKE_PROFIT_RR)
+        take_profit_rr = _safe_float(config_manager.get('trading.take_profit_rr', 2.0), 2.0)
+        tp = entry_price + (sl_distance * take_profit_rr) if signal == 'long' else entry_price - (sl_distance * take_profit_rr)
         return [{'quantity': total_quantity, 'tp': tp, 'label': 'FULL'}]
     
     symbol_info = connector.get_symbol_info()
@@ -126,7 +132,8 @@ def calculate_partial_orders(
         orders.append({'quantity': qty3, 'tp': tp3, 'label': f'TP3 (Rest@{_safe_float(config_manager.get('trading.partial_tp3_rr', 3.0), 3.0)}:1)'})
     
     if not orders:
-        tp = entry_price + (sl_distance * TAKE_PROFIT_RR) if signal == 'long' else entry_price - (sl_distance * TAKE_PROFIT_RR)
+        take_profit_rr = _safe_float(config_manager.get('trading.take_profit_rr', 2.0), 2.0)
+        tp = entry_price + (sl_distance * take_profit_rr) if signal == 'long' else entry_price - (sl_distance * take_profit_rr)
         orders = [{'quantity': total_quantity, 'tp': tp, 'label': 'FULL (min qty)'}]
     
     return orders
@@ -147,14 +154,18 @@ def check_ote_confluence(df: pd.DataFrame, current_price: float, bias: str, sign
     
     return in_ote, ote_levels
 
-def evaluate_signal(df_main: pd.DataFrame, df_small: pd.DataFrame, daily_bias: str, connector: 'BaseConnector', signals=None) -> tuple[str, float | None, float | None, str]:
+def evaluate_signal(df_main: pd.DataFrame, df_small: pd.DataFrame, daily_bias: str, connector: 'BaseConnector', signals=None,
+                    htf_levels: dict | None = None, poi_index: PoiIndex | None = None,
+                    open_gaps: OpenGaps | None = None) -> tuple[str, float | None, float | None, str]:
     reason_parts = [f"HTF BIAS: {daily_bias.upper()}"]
 
     if daily_bias == 'neutral':
         return 'none', None, None, "HTF Bias is Neutral"
     
     # --- Advanced Liquidity Detection ---
-    htf_levels = get_htf_liquidity_levels(connector)
+    # Backtest truyền sẵn các mức tại nến đang xét; live dùng cache theo ngày giao dịch
+    if htf_levels is None:
+        htf_levels = get_htf_liquidity_levels(connector, df_main)
     df_main = detect_equal_highs_lows(df_main)
     dol_price, dol_type = get_draw_on_liquidity(df_main, daily_bias, htf_levels)
     if dol_price:
@@ -168,18 +179,28 @@ def evaluate_signal(df_main: pd.DataFrame, df_small: pd.DataFrame, daily_bias: s
         return 'none', None, None, f"Signal ({ltf_bias}) against HTF Bias ({daily_bias})"
 
     bias = ltf_bias
-    df_small_with_fvg = detect_fvg(df_small.copy())
+    # Frame của analyzer đã có sẵn cột FVG và mức lấp gap (cùng bộ lọc độ rộng gap)
+    if set(FVG_COLUMNS) <= set(df_small.columns):
+        df_small_with_fvg = df_small
+    else:
+        df_small_with_fvg = detect_fvg(df_small.copy(), *get_fvg_gap_filter(connector))
+        open_gaps = None
     dr_low, dr_high = get_dealing_range(df_main)
     
     if dr_low is None or dr_high is None:
         return 'none', None, None, "No Dealing Range"
 
+    # OB/FVG/BB của df_main: analyzer truyền sẵn chỉ mục đã dựng khi phân tích, nếu không thì dựng một lần tại đây
+    if poi_index is None:
+        poi_index = PoiIndex.from_frame(df_main)
     equilibrium = (dr_high + dr_low) / 2
     latest_close = df_main['close'].iloc[-1]
     latest_high = df_main['high'].iloc[-1]
     latest_low = df_main['low'].iloc[-1]
     point_value = getattr(connector.get_symbol_info(), 'point', 0.00001)
     sl_buffer_value = _safe_float(config_manager.get('trading.sl_buffer_points', 50.0), 50.0) * point_value
+    # FVG đã bị lấp hoàn toàn không còn là POI/điểm vào lệnh
+    skip_filled_fvg = bool(config_manager.get('trading.fvg_skip_filled', True))
 
     zone = "PREMIUM" if latest_close > equilibrium else "DISCOUNT"
     reason_parts.append(f"Zone: {zone}")
@@ -194,32 +215,15 @@ def evaluate_signal(df_main: pd.DataFrame, df_small: pd.DataFrame, daily_bias: s
             if not in_ote:
                 return 'none', None, None, "Price not in OTE zone"
 
-        for poi_type in ["OB", "FVG", "BB"]:
-            found_poi = False
-            poi_data = None
-            if poi_type == "OB":
-                poi_list = df_main[(df_main['ob_bullish']) & (df_main['ob_zone_low'] < equilibrium)]
-                if not poi_list.empty:
-                    poi_data = poi_list.iloc[-1]
-                    if latest_low <= poi_data['ob_zone_high']: found_poi = True
-            elif poi_type == "FVG":
-                poi_list = df_main[(df_main['fvg_bullish_high'].notna()) & (df_main['fvg_bullish_low'] < equilibrium)]
-                if not poi_list.empty:
-                    poi_data = poi_list.iloc[-1]
-                    if latest_low <= poi_data['fvg_bullish_high']: found_poi = True
-            elif poi_type == "BB":
-                poi_list = df_main[(df_main['bb_bullish']) & (df_main['ob_zone_low'] < equilibrium)]
-                if not poi_list.empty:
-                    poi_data = poi_list.iloc[-1]
-                    if latest_low <= poi_data['ob_zone_high']: found_poi = True
-            
-            if found_poi and poi_data is not None:
-                sweep_info = f" (Sweep: {poi_data['liquidity_sweep']})" if 'liquidity_sweep' in poi_data and poi_data['liquidity_sweep'] != 'none' else ""
+        for poi_type in POI_TYPES:
+            poi_data = poi_index.latest(poi_type, 'bullish', equilibrium, unmitigated=skip_filled_fvg and poi_type == 'FVG')
+            if poi_data is not None and latest_low <= poi_data['high']:
+                sweep_info = f" (Sweep: {poi_data['sweep']})" if poi_data['sweep'] != 'none' else ""
                 reason_parts.append(f"POI: Bullish {poi_type}{sweep_info}")
-                found_ltf, entry, ltf_reason = check_ltf_confirmation(df_small_with_fvg, 'bullish', signals)
+                found_ltf, entry, ltf_reason = check_ltf_confirmation(df_small_with_fvg, 'bullish', signals, skip_filled_fvg, open_gaps)
                 if found_ltf:
                     reason_parts.append(f"Confirm: {ltf_reason}")
-                    sl_price = (poi_data['ob_zone_low'] if 'ob_zone_low' in poi_data and not pd.isna(poi_data['ob_zone_low']) else poi_data.get('fvg_bullish_low', latest_low)) - sl_buffer_value
+                    sl_price = poi_data['stop'] - sl_buffer_value
                     if entry is not None and entry > sl_price:
                         return 'long', entry, sl_price, ' -> '.join(reason_parts)
 
@@ -233,32 +237,15 @@ def evaluate_signal(df_main: pd.DataFrame, df_small: pd.DataFrame, daily_bias: s
             if not in_ote:
                 return 'none', None, None, "Price not in OTE zone"
 
-        for poi_type in ["OB", "FVG", "BB"]:
-            found_poi = False
-            poi_data = None
-            if poi_type == "OB":
-                poi_list = df_main[(df_main['ob_bearish']) & (df_main['ob_zone_high'] > equilibrium)]
-                if not poi_list.empty:
-                    poi_data = poi_list.iloc[-1]
-                    if latest_high >= poi_data['ob_zone_low']: found_poi = True
-            elif poi_type == "FVG":
-                poi_list = df_main[(df_main['fvg_bearish_high'].notna()) & (df_main['fvg_bearish_high'] > equilibrium)]
-                if not poi_list.empty:
-                    poi_data = poi_list.iloc[-1]
-                    if latest_high >= poi_data['fvg_bearish_low']: found_poi = True
-            elif poi_type == "BB":
-                poi_list = df_main[(df_main['bb_bearish']) & (df_main['ob_zone_high'] > equilibrium)]
-                if not poi_list.empty:
-                    poi_data = poi_list.iloc[-1]
-                    if latest_high >= poi_data['ob_zone_low']: found_poi = True
-            
-            if found_poi and poi_data is not None:
-                sweep_info = f" (Sweep: {poi_data['liquidity_sweep']})" if 'liquidity_sweep' in poi_data and poi_data['liquidity_sweep'] != 'none' else ""
+        for poi_type in POI_TYPES:
+            poi_data = poi_index.latest(poi_type, 'bearish', equilibrium, unmitigated=skip_filled_fvg and poi_type == 'FVG')
+            if poi_data is not None and latest_high >= poi_data['low']:
+                sweep_info = f" (Sweep: {poi_data['sweep']})" if poi_data['sweep'] != 'none' else ""
                 reason_parts.append(f"POI: Bearish {poi_type}{sweep_info}")
-                found_ltf, entry, ltf_reason = check_ltf_confirmation(df_small_with_fvg, 'bearish', signals)
+                found_ltf, entry, ltf_reason = check_ltf_confirmation(df_small_with_fvg, 'bearish', signals, skip_filled_fvg, open_gaps)
                 if found_ltf:
                     reason_parts.append(f"Confirm: {ltf_reason}")
-                    sl_price = (poi_data['ob_zone_high'] if 'ob_zone_high' in poi_data and not pd.isna(poi_data['ob_zone_high']) else poi_data.get('fvg_bearish_high', latest_high)) + sl_buffer_value
+                    sl_price = poi_data['stop'] + sl_buffer_value
                     if entry is not None and entry < sl_price:
                         return 'short', entry, sl_price, ' -> '.join(reason_parts)
 
@@ -276,7 +263,8 @@ def evaluate_signal(df_main: pd.DataFrame, df_small: pd.DataFrame, daily_bias: s
 
     return 'none', None, None, ' -> '.join(reason_parts)
 
-def check_ltf_confirmation(df_small: pd.DataFrame, trend: str, signals=None) -> tuple[bool, float | None, str | None]:
+def check_ltf_confirmation(df_small: pd.DataFrame, trend: str, signals=None, skip_filled_fvg: bool = False,
+                           open_gaps: OpenGaps | None = None) -> tuple[bool, float | None, str | None]:
     recent_choch = df_small[df_small['choch'] == trend].tail(1)
     recent_bos = df_small[df_small['bos'] == trend].tail(1)
     
@@ -293,8 +281,12 @@ def check_ltf_confirmation(df_small: pd.DataFrame, trend: str, signals=None) ->
                 confirm_idx = loc
                 reason = "LTF CHOCH"
                 
-                for k in range(max(0, confirm_idx - 10), confirm_idx):
-                    sweep_type = detect_liquidity_sweep(df_small, k, lookback=20)
+                # Sweep của 10 nến trước CHOCH, tính một lần cho cả đoạn
+                sweep_start = max(0, confirm_idx - 10)
+                sweep_offset = max(0, sweep_start - 20)
+                sweeps = detect_liquidity_sweeps(df_small.iloc[sweep_offset:confirm_idx], lookback=20).to_numpy()
+                for k in range(sweep_start, confirm_idx):
+                    sweep_type = sweeps[k - sweep_offset]
                     if sweep_type:
                         reason = f"ICT 2022 Model ({sweep_type})"
                         break
@@ -309,13 +301,24 @@ def check_ltf_confirmation(df_small: pd.DataFrame, trend: str, signals=None) ->
 
         if confirmation_found and confirm_idx is not None:
             entry_price = df_small['close'].iloc[-1]
-            fvg_col = 'fvg_bullish_high' if trend == 'bullish' else 'fvg_bearish_low'
-            ltf_slice = df_small.iloc[confirm_idx:]
-            ltf_fvgs = ltf_slice[ltf_slice[fvg_col].notna()]
+            fvg_entry = None
+            if skip_filled_fvg and open_gaps is not None:
+                # Registry của analyzer chỉ giữ các gap chưa bị lấp hoàn toàn: không phải lọc lại frame
+                gap = open_gaps.latest(trend, confirm_idx)
+                if gap is not None:
+                    fvg_entry = gap[1] if trend == 'bullish' else gap[2]
+            else:
+                fvg_col = 'fvg_bullish_high' if trend == 'bullish' else 'fvg_bearish_low'
+                ltf_slice = df_small.iloc[confirm_idx:]
+                ltf_fvgs = ltf_slice[ltf_slice[fvg_col].notna()]
+                mitigation_col = f'fvg_{trend}_mitigation'
+                if skip_filled_fvg and mitigation_col in ltf_fvgs.columns:
+                    ltf_fvgs = ltf_fvgs[ltf_fvgs[mitigation_col] < 1.0]
+                if not ltf_fvgs.empty:
+                    fvg_entry = ltf_fvgs[fvg_col].iloc[-1]
             
-            if not ltf_fvgs.empty:
-                best_fvg = ltf_fvgs.iloc[-1]
-                entry_price = best_fvg['fvg_bullish_high'] if trend == 'bullish' else best_fvg['fvg_bearish_low']
+            if fvg_entry is not None:
+                entry_price = fvg_entry
                 reason += " w/ FVG Entry"
             else:
                 reason += " w/ Market Entry"
@@ -329,10 +332,33 @@ def check_ltf_confirmation(df_small: pd.DataFrame, trend: str, signals=None) ->
 
     return False, None, None
 
-def analyze_dataframe(df: pd.DataFrame, is_ltf=False) -> pd.DataFrame:
-    df_fvg = detect_fvg(df.copy())
+# Engine phân tích tăng dần cho live trading, giữ trạng thái giữa các chu kỳ
+# theo (symbol, timeframe, vai trò) để mỗi chu kỳ chỉ phải nạp các nến mới.
+_live_analyzers: dict[tuple, IncrementalAnalyzer] = {}
+
+def get_live_analyzer(symbol: str, timeframe: str, role: str, window: int = 200, is_ltf: bool = False, swing_length: int = 10, min_fvg_gap: float = 0.0) -> IncrementalAnalyzer:
+    key = (symbol, timeframe, role, window, is_ltf, swing_length, min_fvg_gap)
+    analyzer = _live_analyzers.get(key)
+    if analyzer is None:
+        analyzer = IncrementalAnalyzer(window=window, swing_length=swing_length, is_ltf=is_ltf, min_fvg_gap=min_fvg_gap)
+        _live_analyzers[key] = analyzer
+    return analyzer
+
+def reset_live_analysis() -> None:
+    """Bỏ các analyzer live và kết quả phân tích đã cache (khi cấu hình thay đổi)."""
+    _live_analyzers.clear()
+    analysis_cache.invalidate()
+
+def get_fvg_gap_filter(connector: 'BaseConnector | None') -> tuple[float, float]:
+    """(min_gap_points, point_value) cho detect_fvg, đọc từ 'trading.min_fvg_gap_points'."""
+    min_gap_points = _safe_float(config_manager.get('trading.min_fvg_gap_points', 0.0), 0.0)
+    point_value = getattr(connector.get_symbol_info(), 'point', 0.00001) if connector else 0.00001
+    return min_gap_points, point_value
+
+def analyze_dataframe(df: pd.DataFrame, is_ltf=False, min_fvg_gap_points: float = 0.0, point_value: float = 1.0) -> pd.DataFrame:
+    df_fvg = detect_fvg(df.copy(), min_fvg_gap_points, point_value)
     df_swings = find_swings(df_fvg)
-    df_bos = detect_bos_choch(df_swings)
+    df_bos = detect_displacement(detect_bos_choch(df_swings))
     if not is_ltf:
         df_ob = detect_order_block(df_bos)
         return detect_breaker_block(df_ob)
@@ -340,7 +366,7 @@ def analyze_dataframe(df: pd.DataFrame, is_ltf=False) -> pd.DataFrame:
 
 def execute_quant_strategy(connector: 'BaseConnector', signals=None) -> None:
     main_timeframe = config_manager.get('trading.timeframe', '1h') or '1h'
-    df_main = connector.fetch_ohlcv(main_timeframe, limit=200)
+    df_main = load_ohlcv(connector, main_timeframe, limit=200)
     if df_main is None or df_main.empty:
         return
         
@@ -389,6 +415,84 @@ def execute_quant_strategy(connector: 'BaseConnector', signals=None) -> None:
             tp_price = entry_price + (sl_distance * rr) if signal_type == 'long' else entry_price - (sl_distance * rr)
             connector.place_order(signal_type, quantity, sl_price, tp_price, comment=reason)
 
+def fetch_strategy_data(connector: 'BaseConnector') -> dict[str, pd.DataFrame] | None:
+    """Các nến đã đóng của khung chính/nhỏ/HTF ('main', 'small', 'htf') mà execute_strategy phân tích."""
+    main_timeframe = config_manager.get('trading.timeframe', 'H1') or 'H1'
+    small_timeframe = config_manager.get('trading.timeframe_smaller', 'M15') or 'M15'
+    htf_timeframe = config_manager.get('trading.htf_timeframe', 'H4') or 'H4'
+
+    # Nến cuối cùng connector trả về là nến đang hình thành: lấy thêm 1 nến và
+    # chỉ phân tích các nến đã đóng, giống backtester đánh giá tại lúc đóng nến.
+    df_main = load_ohlcv(connector, main_timeframe, limit=201)
+    df_small = load_ohlcv(connector, small_timeframe, limit=101)
+    df_htf = load_ohlcv(connector, htf_timeframe, limit=201)
+
+    if df_main is None or df_small is None or df_htf is None:
+        return None
+    df_main, df_small, df_htf = df_main.iloc[:-1], df_small.iloc[:-1], df_htf.iloc[:-1]
+    if df_main.empty or df_small.empty or df_htf.empty:
+        return None
+    return {'main': df_main, 'small': df_small, 'htf': df_htf}
+
+def analyze_strategy_data(symbol: str, frames: dict[str, pd.DataFrame], connector: 'BaseConnector', signals=None,
+                          htf_levels: dict | None = None) -> tuple[str, float | None, float | None, str]:
+    """
+    Phân tích dữ liệu của fetch_strategy_data và trả về tín hiệu (signal, entry, sl, reason) của evaluate_signal.
+    `htf_levels` (nếu có) là các mức thanh khoản HTF đã tính sẵn, nếu không evaluate_signal lấy qua liquidity_levels.
+    """
+    main_timeframe = config_manager.get('trading.timeframe', 'H1') or 'H1'
+    small_timeframe = config_manager.get('trading.timeframe_smaller', 'M15') or 'M15'
+    htf_timeframe = config_manager.get('trading.htf_timeframe', 'H4') or 'H4'
+    df_main, df_small, df_htf = frames['main'], frames['small'], frames['htf']
+
+    min_gap_points, point_value = get_fvg_gap_filter(connector)
+    min_fvg_gap = min_gap_points * point_value
+    htf_analyzer = get_live_analyzer(symbol, htf_timeframe, 'htf', swing_length=5 if htf_timeframe.upper() == 'D1' else 10, min_fvg_gap=min_fvg_gap)
+    main_analyzer = get_live_analyzer(symbol, main_timeframe, 'main', min_fvg_gap=min_fvg_gap)
+    small_analyzer = get_live_analyzer(symbol, small_timeframe, 'small', window=100, is_ltf=True, min_fvg_gap=min_fvg_gap)
+
+    # Chỉ phân tích lại khi khung tương ứng có nến mới đóng cửa
+    def analyze_htf():
+        htf_analyzer.update(df_htf)
+        return htf_analyzer.bias(len(df_htf))
+
+    def analyze_main():
+        main_analyzer.update(df_main)
+        return main_analyzer.frame(len(df_main)), main_analyzer.last_poi_index
+
+    def analyze_small():
+        small_analyzer.update(df_small)
+        return small_analyzer.frame(len(df_small)), small_analyzer.last_open_gaps
+
+    htf_bias = analysis_cache.get(symbol, htf_timeframe, 'htf_bias', df_htf.index[-1], analyze_htf)
+    # evaluate_signal thêm cột vào df_main nên dùng bản sao, giữ nguyên bản trong cache
+    df_main_analyzed, poi_index = analysis_cache.get(symbol, main_timeframe, 'main', df_main.index[-1], analyze_main)
+    df_main_analyzed = df_main_analyzed.copy()
+    df_small_analyzed, open_gaps = analysis_cache.get(symbol, small_timeframe, 'small', df_small.index[-1], analyze_small)
+    df_small_analyzed = df_small_analyzed.copy()
+    if signals:
+        signals.log_message.emit(analysis_cache.stats_message())
+
+    return evaluate_signal(df_main_analyzed, df_small_analyzed, htf_bias, connector, signals, poi_index=poi_index,
+                           open_gaps=open_gaps, htf_levels=htf_levels)
+
+def place_strategy_orders(connector: 'BaseConnector', signal: str, entry_price: float, sl_price: float, reason: str, signals=None) -> None:
+    """Tính khối lượng và đặt lệnh (chốt lời từng phần nếu được bật) cho một tín hiệu."""
+    quantity = calculate_position_size(connector, sl_price, entry_price, signals)
+    
+    if quantity is not None and quantity > 0:
+        partial_orders = calculate_partial_orders(quantity, entry_price, sl_price, signal, connector)
+        
+        if bool(config_manager.get('trading.partial_profits_enabled', False)):
+            for i, order in enumerate(partial_orders):
+                connector.place_order(signal, order['quantity'], sl_price, order['tp'], comment=reason)
+        else:
+            rr = _safe_float(config_manager.get('trading.take_profit_rr', 2.0), 2.0)
+            sl_distance = abs(entry_price - sl_price)
+            tp_price = entry_price + (sl_distance * rr) if signal == 'long' else entry_price - (sl_distance * rr)
+            
+            connector.place_order(signal, quantity, sl_price, tp_price, comment=reason)
+
 def execute_strategy(connector: 'BaseConnector', signals=None) -> None:
     if connector.get_open_positions():
         return
@@ -397,37 +501,11 @@ def execute_strategy(connector: 'BaseConnector', signals=None) -> None:
         execute_quant_strategy(connector, signals)
         return
 
-
-    main_timeframe = config_manager.get('trading.timeframe', 'H1') or 'H1'
-    small_timeframe = config_manager.get('trading.timeframe_smaller', 'M15') or 'M15'
-    htf_timeframe = config_manager.get('trading.htf_timeframe', 'H4') or 'H4'
-
-    df_main = connector.fetch_ohlcv(main_timeframe, limit=200)
-    df_small = connector.fetch_ohlcv(small_timeframe, limit=100)
-    df_htf = connector.fetch_ohlcv(htf_timeframe, limit=200)
-
-    if df_main is None or df_small is None or df_htf is None:
+    frames = fetch_strategy_data(connector)
+    if frames is None:
         return
-        
-    htf_bias = get_htf_bias(df_htf, htf_label=htf_timeframe)
-        
-    df_main_analyzed = analyze_dataframe(df_main.copy())
-    df_small_analyzed = analyze_dataframe(df_small.copy(), is_ltf=True)
 
-    signal, entry_price, sl_price, reason = evaluate_signal(df_main_analyzed, df_small_analyzed, htf_bias, connector, signals)
+    signal, entry_price, sl_price, reason = analyze_strategy_data(connector.get_symbol(), frames, connector, signals)
 
     if signal != 'none' and entry_price is not None and sl_price is not None:
-        quantity = calculate_position_size(connector, sl_price, entry_price, signals)
-        
-        if quantity is not None and quantity > 0:
-            partial_orders = calculate_partial_orders(quantity, entry_price, sl_price, signal, connector)
-            
-            if bool(config_manager.get('trading.partial_profits_enabled', False)):
-                for i, order in enumerate(partial_orders):
-                    connector.place_order(signal, order['quantity'], sl_price, order['tp'], comment=reason)
-            else:
-                rr = _safe_float(config_manager.get('trading.take_profit_rr', 2.0), 2.0)
-                sl_distance = abs(entry_price - sl_price)
-                tp_price = entry_price + (sl_distance * rr) if signal == 'long' else entry_price - (sl_distance * rr)
-                
-                connector.place_order(signal, quantity, sl_price, tp_price, comment=reason)
+        place_strategy_orders(connector, signal, entry_price, sl_price, reason, signals)
@@ -1,11 +1,64 @@
 from datetime import datetime, timedelta
+import numpy as np
+import pandas as pd
 import pytz
 from .config_loader import KILL_ZONES
+from app.config_manager import config_manager
 
 # Múi giờ
 NY_TZ = pytz.timezone('America/New_York')
 UTC_PLUS_7 = pytz.timezone('Asia/Bangkok')  # UTC+7 (Vietnam, Thailand, etc.)
 
+# Khung giờ Silver Bullet (EST)
+SILVER_BULLET_WINDOWS = [
+    {'name': 'London Open', 'start': 3, 'end': 4},      # 03:00 - 04:00
+    {'name': 'NY AM Session', 'start': 10, 'end': 11},  # 10:00 - 11:00
+    {'name': 'NY PM Session', 'start': 14, 'end': 15}   # 14:00 - 15:00
+]
+
+
+def ny_minutes(index) -> np.ndarray:
+    """
+    Phút trong ngày theo giờ New York (0..1439) của mọi timestamp trong index.
+    Index không có múi giờ được coi là UTC; chuyển đổi theo từng nến nên đúng cả khi đổi giờ mùa hè (DST).
+    """
+    index = pd.DatetimeIndex(index)
+    index = index.tz_localize('UTC') if index.tz is None else index.tz_convert('UTC')
+    ny = index.tz_convert('America/New_York')
+    return np.asarray(ny.hour, dtype=np.int64) * 60 + np.asarray(ny.minute, dtype=np.int64)
+
+
+def session_mask(index, sessions: list[tuple[str, int, int]]) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Mặt nạ phiên cho cả index một lần: sessions là [(tên, phút bắt đầu, phút kết thúc), ...] theo giờ New York,
+    nến thuộc phiên khi bắt đầu <= phút < kết thúc. Trả về (mảng bool, mảng tên phiên; None nếu ngoài phiên).
+    Nến nằm trong nhiều phiên lấy phiên đứng trước trong danh sách.
+    """
+    minutes = ny_minutes(index)
+    names = np.full(len(minutes), None, dtype=object)
+    mask = np.zeros(len(minutes), dtype=bool)
+    for name, start, end in sessions:
+        hit = (minutes >= start) & (minutes < end) & ~mask
+        names[hit] = name
+        mask |= hit
+    return mask, names
+
+
+def _kill_zone_sessions() -> list[tuple[str, int, int]]:
+    kill_zones = config_manager.get('kill_zones', KILL_ZONES) or []
+    return [(zone.get('name', 'Unknown'), zone['start'][0] * 60 + zone['start'][1], zone['end'][0] * 60 + zone['end'][1])
+            for zone in kill_zones if zone.get('enabled', True)]
+
+
+def kill_zone_mask(index) -> tuple[np.ndarray, np.ndarray]:
+    """Kill Zone (theo cấu hình hiện tại) của mọi nến trong index: (mảng bool, mảng tên Kill Zone)."""
+    return session_mask(index, _kill_zone_sessions())
+
+
+def silver_bullet_mask(index) -> tuple[np.ndarray, np.ndarray]:
+    """Khung Silver Bullet của mọi nến trong index: (mảng bool, mảng tên khung)."""
+    return session_mask(index, [(window['name'], window['start'] * 60, window['end'] * 60) for window in SILVER_BULLET_WINDOWS])
+
 def get_kill_zone_status(timestamp=None):
     """
     Kiểm tra trạng thái Kill Zone và trả về chuỗi mô tả.
@@ -23,7 +76,7 @@ def get_kill_zone_status(timestamp=None):
         ny_now = utc_now.astimezone(NY_TZ)
         current_time_tuple = (ny_now.hour, ny_now.minute)
 
-        kill_zones = KILL_ZONES
+        kill_zones = config_manager.get('kill_zones', KILL_ZONES)
         if kill_zones is None:
             kill_zones = []
 
@@ -61,7 +114,7 @@ def get_all_kill_zones_with_utc7():
         }
     """
     result = []
-    kill_zones = KILL_ZONES if KILL_ZONES else []
+    kill_zones = config_manager.get('kill_zones', KILL_ZONES) or []
     
     # Tạo một ngày tham chiếu để convert timezone
     # Dùng ngày hôm nay ở NY để tính đúng DST
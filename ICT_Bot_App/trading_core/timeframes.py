@@ -0,0 +1,42 @@
+import numpy as np
+import pandas as pd
+
+# Độ dài một nến theo tên khung thời gian (cùng các tên mà connector MT5/Binance nhận)
+TIMEFRAME_DELTAS = {
+    'M1': pd.Timedelta(minutes=1), 'M5': pd.Timedelta(minutes=5), 'M15': pd.Timedelta(minutes=15),
+    'M30': pd.Timedelta(minutes=30), 'H1': pd.Timedelta(hours=1), 'H4': pd.Timedelta(hours=4),
+    'D1': pd.Timedelta(days=1), 'W1': pd.Timedelta(weeks=1),
+    '1m': pd.Timedelta(minutes=1), '5m': pd.Timedelta(minutes=5), '15m': pd.Timedelta(minutes=15),
+    '30m': pd.Timedelta(minutes=30), '1h': pd.Timedelta(hours=1), '4h': pd.Timedelta(hours=4),
+    '1d': pd.Timedelta(days=1), '1w': pd.Timedelta(weeks=1),
+}
+
+
+def timeframe_delta(timeframe: str, index: pd.DatetimeIndex | None = None) -> pd.Timedelta:
+    """
+    Độ dài một nến của khung thời gian. Với tên không có trong bảng, suy ra từ
+    khoảng cách nhỏ nhất giữa hai nến liên tiếp của `index`.
+    """
+    delta = TIMEFRAME_DELTAS.get(timeframe)
+    if delta is not None:
+        return delta
+    if index is not None and len(index) > 1:
+        gaps = np.diff(index.values)
+        gaps = gaps[gaps > np.timedelta64(0)]
+        if len(gaps):
+            return pd.Timedelta(gaps.min())
+    raise ValueError(f"Không xác định được độ dài nến của khung '{timeframe}'")
+
+
+def closed_bar_positions(main_index: pd.DatetimeIndex, main_timeframe: str,
+                         other_index: pd.DatetimeIndex, other_timeframe: str) -> np.ndarray:
+    """
+    Với mỗi nến i của khung chính: số nến của khung kia đã đóng cửa khi nến i đóng cửa,
+    tức `other.iloc[:positions[i]]` là dữ liệu dùng được tại nến i.
+
+    Index là thời điểm mở nến; nến đóng tại (mở + độ dài khung). Nến HTF còn đang hình thành
+    tại nến i bị loại, tránh dùng high/low/close của tương lai trong backtest.
+    """
+    main_close = main_index + timeframe_delta(main_timeframe, main_index)
+    other_close = other_index + timeframe_delta(other_timeframe, other_index)
+    return other_close.searchsorted(main_close, side='right')
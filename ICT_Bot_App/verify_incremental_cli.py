@@ -0,0 +1,73 @@
+import sys
+import os
+import argparse
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__))))
+
+import pandas as pd
+from trading_core.strategy import analyze_dataframe
+from trading_core.market_structure import get_htf_bias
+from trading_core.incremental_analyzer import IncrementalAnalyzer
+
+
+def load_csv(path: str) -> pd.DataFrame:
+    """Đọc file CSV có cột 'timestamp' (cùng định dạng với MockConnector)."""
+    df = pd.read_csv(path)
+    df['timestamp'] = pd.to_datetime(df['timestamp'])
+    df.set_index('timestamp', inplace=True)
+    return df[[col for col in ['open', 'high', 'low', 'close', 'volume'] if col in df.columns]]
+
+
+def verify(df: pd.DataFrame, window: int, is_ltf: bool, step: int, min_fvg_gap: float = 0.0) -> tuple[int, int, float, float]:
+    """
+    So sánh IncrementalAnalyzer với pipeline cửa sổ (analyze_dataframe + get_htf_bias)
+    trên từng nến. Trả về (số lần so sánh, số lần sai khác, thời gian incremental, thời gian pipeline cũ).
+    """
+    analyzer = IncrementalAnalyzer(window=window, is_ltf=is_ltf, min_fvg_gap=min_fvg_gap)
+    checks = mismatches = 0
+    t_incremental = t_windowed = 0.0
+
+    for i in range(len(df)):
+        analyzer.extend(df, i, i + 1)
+        if i + 1 < window or (i + 1 - window) % step:
+            continue
+
+        t0 = time.perf_counter()
+        incremental = analyzer.frame()
+        incremental_bias = analyzer.bias()
+        t1 = time.perf_counter()
+        window_df = df.iloc[i + 1 - window:i + 1]
+        windowed = analyze_dataframe(window_df.copy(), is_ltf=is_ltf, min_fvg_gap_points=min_fvg_gap)
+        windowed_bias = get_htf_bias(window_df)
+        t2 = time.perf_counter()
+
+        t_incremental += t1 - t0
+        t_windowed += t2 - t1
+        checks += 1
+        try:
+            pd.testing.assert_frame_equal(incremental, windowed, check_freq=False)
+            if incremental_bias != windowed_bias:
+                raise AssertionError(f"bias {incremental_bias} != {windowed_bias}")
+        except AssertionError as e:
+            mismatches += 1
+            print(f"[MISMATCH] {df.index[i]}: {str(e).splitlines()[0]}")
+
+    return checks, mismatches, t_incremental, t_windowed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Kiểm tra IncrementalAnalyzer cho kết quả giống pipeline phân tích theo cửa sổ.")
+    parser.add_argument('csv', help="File CSV dữ liệu OHLCV (cột timestamp, open, high, low, close, volume)")
+    parser.add_argument('--window', type=int, default=201, help="Độ dài cửa sổ (backtest dùng 201 nến)")
+    parser.add_argument('--ltf', action='store_true', help="Chỉ phân tích như khung nhỏ (FVG, swing, BOS/CHOCH)")
+    parser.add_argument('--step', type=int, default=1, help="Chỉ so sánh mỗi N nến để chạy nhanh hơn")
+    parser.add_argument('--min-fvg-gap', type=float, default=0.0, help="Độ rộng FVG tối thiểu (theo giá)")
+    args = parser.parse_args()
+
+    data = load_csv(args.csv)
+    checks, mismatches, t_inc, t_win = verify(data, args.window, args.ltf, max(1, args.step), args.min_fvg_gap)
+
+    print(f"Số lần so sánh: {checks}, sai khác: {mismatches}")
+    print(f"Incremental: {t_inc:.2f}s | Pipeline cửa sổ: {t_win:.2f}s")
+    sys.exit(1 if mismatches else 0)